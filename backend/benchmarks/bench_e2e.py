@@ -0,0 +1,481 @@
+"""
+端到端基准：Mock 模型 + 临时 SQLite，离线压测主要链路，输出 p50/p95/p99、吞吐与内存，并可与保存的基线对比。
+
+覆盖场景：
+- chat_stream：并发 SSE 对话（/api/chat/stream）；
+- interview_turn：并发模拟面试轮次（/api/interview-sim/stream，带题单会话）；
+- questionnaire@N：岗位专属题库为 N 道时的题单抽样；
+- export_{pdf,word}@xN：不同长度简历的 PDF / Word 导出（每次换版式参数，避开渲染缓存）；
+- extract_pdf@Np / extract_image：上传抽字（样例 PDF 现场生成；图片 OCR 需安装 Tesseract，否则跳过）；
+- list_*：各列表接口在预置 --rows 条数据（默认 1 万）下的延迟。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_e2e [--requests 40] [--concurrency 8] [--only chat,export]
+    python -m benchmarks.bench_e2e --save-baseline bench_baseline.json
+    python -m benchmarks.bench_e2e --baseline bench_baseline.json [--tolerance 0.2]
+
+对比基线时 p50/p95/p99 变慢或吞吐下降超过 tolerance（且绝对差超过 --min-delta-ms）记为回退，退出码 1。
+Mock 模型的首 token 延迟与输出速度固定（--mock-ttft-ms / --mock-tps），mock Provider 的在途上限放开到并发数，
+测的是服务端自身开销而非调度排队；需要观察调度效果时可用 --mock-max-in-flight 收紧。
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks._common import SAMPLE_RESUME, percentile, setup_app
+
+METRICS = ("p50", "p95", "p99")
+
+
+def rss_mb() -> float:
+    """当前常驻内存（Linux 读 /proc，其它平台退回峰值）。"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _summarize(samples: List[float], errors: int, wall_s: float) -> dict:
+    samples.sort()
+    done = len(samples)
+    return {
+        "requests": done + errors,
+        "errors": errors,
+        "p50": round(percentile(samples, 0.5), 2),
+        "p95": round(percentile(samples, 0.95), 2),
+        "p99": round(percentile(samples, 0.99), 2),
+        "max": round(samples[-1], 2) if samples else 0.0,
+        "throughput": round(done / wall_s, 2) if wall_s > 0 else 0.0,
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+
+async def run_load(
+    call: Callable[[int], Awaitable[bool]], requests: int, concurrency: int
+) -> dict:
+    """以固定并发执行 requests 次 call(i)；call 返回 False 或抛异常记为错误，不计入延迟分布。"""
+    samples: List[float] = []
+    errors = 0
+    next_i = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_i
+        while next_i < requests:
+            i = next_i
+            next_i += 1
+            t0 = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            if ok:
+                samples.append((time.perf_counter() - t0) * 1000)
+            else:
+                errors += 1
+
+    # 预热一次（首个请求的导入、连接、编译开销不计入分布）；序号取 requests，不与正式请求的参数重复
+    try:
+        await call(requests)
+    except Exception:
+        pass
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+    return _summarize(samples, errors, time.perf_counter() - t0)
+
+
+# ---------- 数据准备 ----------
+
+def _seed_base() -> dict:
+    import models
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        job = models.Job(title="后端工程师", company="示例公司", content="岗位职责：负责 Python 服务开发\n任职要求：熟悉 FastAPI、SQL")
+        db.add(job)
+        db.flush()
+        bg = models.UserBackground(name="bench", content="5 年后端经验")
+        db.add(bg)
+        db.flush()
+        resume = models.Resume(job_id=job.id, title="bench-resume", content=SAMPLE_RESUME, background_profile_id=bg.id)
+        db.add(resume)
+        db.commit()
+        return {"job_id": job.id, "resume_id": resume.id, "background_profile_id": bg.id}
+    finally:
+        db.close()
+
+
+def _seed_resume(job_id: int, content: str, title: str) -> int:
+    import models
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        resume = models.Resume(job_id=job_id, title=title, content=content)
+        db.add(resume)
+        db.commit()
+        return resume.id
+    finally:
+        db.close()
+
+
+def _seed_bank(job_id: int, resume_id: int, size: int) -> None:
+    from sqlalchemy import insert
+
+    import models
+    from database import SessionLocal
+    from interview_question_bank import QUESTION_CATEGORIES
+
+    rows = [
+        {
+            "job_id": job_id,
+            "resume_id": resume_id,
+            "category": QUESTION_CATEGORIES[i % len(QUESTION_CATEGORIES)],
+            "text": f"请结合简历谈谈你在第 {i + 1} 个项目中遇到的关键挑战，以及你是如何权衡取舍的？",
+        }
+        for i in range(size)
+    ]
+    db = SessionLocal()
+    try:
+        if rows:
+            db.execute(insert(models.JobInterviewQuestion), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _seed_rows(job_id: int, n: int) -> None:
+    """批量写入 n 条岗位、简历与报告记录，供列表接口基准使用。"""
+    from sqlalchemy import insert
+
+    import models
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.Job), [
+            {"title": f"岗位 {i}", "company": f"公司 {i % 200}", "content": "岗位职责：……\n任职要求：……" * 5}
+            for i in range(n)
+        ])
+        db.execute(insert(models.Resume), [
+            {"job_id": job_id, "title": f"简历 {i}", "content": SAMPLE_RESUME} for i in range(n)
+        ])
+        db.execute(insert(models.EvaluationReport), [
+            {
+                "job_id": job_id,
+                "report_type": "scorecard" if i % 2 == 0 else "interview_report",
+                "content_json": json.dumps({"overall_score": 70 + i % 30}, ensure_ascii=False),
+            }
+            for i in range(n)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _sample_pdf(pages: int) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    for p in range(pages):
+        y = 800
+        for line in range(45):
+            c.drawString(50, y, f"Page {p + 1} line {line + 1}: Python FastAPI SQL Redis Kafka performance tuning")
+            y -= 17
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def _sample_image(i: int) -> bytes:
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (1200, 600), "white")
+    draw = ImageDraw.Draw(img)
+    for line in range(12):
+        # 每张图带序号，避免 OCR 结果缓存命中
+        draw.text((40, 30 + line * 45), f"Sample {i} line {line}: Python FastAPI SQL", fill="black")
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+# ---------- 场景 ----------
+
+def _sse_ok(body: str) -> bool:
+    return '"type": "done"' in body or '"done"' in body
+
+
+async def run_suite(app, args) -> Dict[str, dict]:
+    import httpx
+
+    only = [s.strip() for s in (args.only or "").split(",") if s.strip()]
+
+    def wanted(name: str) -> bool:
+        return not only or any(name.startswith(o) for o in only)
+
+    base = _seed_base()
+    results: Dict[str, dict] = {}
+    n, conc = args.requests, args.concurrency
+
+    async def record(name: str, call, requests: int = n, concurrency: int = conc) -> None:
+        if not wanted(name):
+            return
+        results[name] = await run_load(call, requests, concurrency)
+        r = results[name]
+        print(
+            f"  {name:<28} p50={r['p50']:>8.1f} p95={r['p95']:>8.1f} p99={r['p99']:>8.1f} ms  "
+            f"{r['throughput']:>7.1f} req/s  err={r['errors']}  rss={r['rss_mb']:.0f}MB",
+            flush=True,
+        )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        chat_body = {
+            "job_id": base["job_id"],
+            "resume_id": base["resume_id"],
+            "messages": [{"role": "user", "content": "请根据岗位要求帮我优化简历"}],
+        }
+
+        async def chat(i: int) -> bool:
+            resp = await client.post("/api/chat/stream", json=chat_body)
+            return resp.status_code == 200 and _sse_ok(resp.text)
+
+        await record("chat_stream", chat)
+
+        q = await client.get("/api/interview-sim/questionnaire", params={
+            "job_id": base["job_id"], "resume_id": base["resume_id"], "total": 7, "seed": 1,
+        })
+        questionnaire = q.json()
+
+        async def interview(i: int) -> bool:
+            resp = await client.post("/api/interview-sim/stream", json={
+                "job_id": base["job_id"],
+                "resume_id": base["resume_id"],
+                "messages": [{"role": "user", "content": "你好，我准备好了"}],
+                "questionnaire_markdown": questionnaire.get("questionnaire_markdown"),
+                "session_id": questionnaire.get("session_id"),
+            })
+            return resp.status_code == 200 and _sse_ok(resp.text)
+
+        await record("interview_turn", interview)
+
+        for size in args.bank_sizes:
+            name = f"questionnaire@{size}"
+            if not wanted(name):
+                continue
+            resume_id = _seed_resume(base["job_id"], SAMPLE_RESUME, f"bank-{size}")
+            _seed_bank(base["job_id"], resume_id, size)
+
+            async def sample(i: int, resume_id=resume_id) -> bool:
+                resp = await client.get("/api/interview-sim/questionnaire", params={
+                    "job_id": base["job_id"], "resume_id": resume_id, "total": 7, "seed": i,
+                })
+                return resp.status_code == 200
+
+            await record(name, sample)
+
+        for repeat in args.resume_lengths:
+            resume_id = None
+            for fmt, path in (("pdf", "pdf"), ("word", "word")):
+                name = f"export_{fmt}@x{repeat}"
+                if not wanted(name):
+                    continue
+                if resume_id is None:
+                    resume_id = _seed_resume(base["job_id"], "\n\n".join([SAMPLE_RESUME] * repeat), f"export-x{repeat}")
+
+                async def export(i: int, path=path, resume_id=resume_id) -> bool:
+                    # 字号与页边距组合逐次变化，保证渲染缓存不命中
+                    resp = await client.get(f"/api/export/{path}/{resume_id}", params={
+                        "font_size": 9 + i % 4, "margin_cm": round(1.0 + (i // 4) * 0.01, 2),
+                    })
+                    return resp.status_code == 200
+
+                await record(name, export, requests=max(4, n // 2), concurrency=min(conc, 4))
+
+        for pages in args.pdf_pages:
+            name = f"extract_pdf@{pages}p"
+            if not wanted(name):
+                continue
+            pdf = _sample_pdf(pages)
+
+            async def extract(i: int, pdf=pdf) -> bool:
+                resp = await client.post("/api/uploads/extract", files={"file": ("sample.pdf", pdf, "application/pdf")})
+                return resp.status_code == 200
+
+            await record(name, extract, requests=max(4, n // 2), concurrency=min(conc, 4))
+
+        if wanted("extract_image"):
+            if shutil.which("tesseract"):
+                images = [_sample_image(i) for i in range(max(4, n // 4) + 1)]
+
+                async def extract_image(i: int) -> bool:
+                    resp = await client.post("/api/uploads/extract", files={"file": ("shot.png", images[i], "image/png")})
+                    return resp.status_code == 200
+
+                await record("extract_image", extract_image, requests=len(images) - 1, concurrency=min(conc, 4))
+            else:
+                print("  extract_image                skipped (tesseract not installed)")
+
+        if any(wanted(x) for x in ("list_jobs", "list_resumes", "list_scorecards", "list_reports")):
+            t0 = time.perf_counter()
+            _seed_rows(base["job_id"], args.rows)
+            print(f"  seeded {args.rows} rows per table in {time.perf_counter() - t0:.1f}s")
+
+        list_cases = {
+            "list_jobs": ("/api/jobs", {}),
+            "list_resumes": ("/api/resumes", {}),
+            "list_resumes_by_job": ("/api/resumes", {"job_id": base["job_id"]}),
+            "list_scorecards": ("/api/evaluation/scorecard-history", {"job_id": base["job_id"], "limit": 100}),
+            "list_reports": ("/api/interview-sim/reports", {"job_id": base["job_id"], "limit": 100}),
+        }
+        for name, (url, params) in list_cases.items():
+            async def listing(i: int, url=url, params=params) -> bool:
+                resp = await client.get(url, params=params)
+                return resp.status_code == 200
+
+            await record(name, listing, requests=max(4, n // 2), concurrency=min(conc, 4))
+
+    return results
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], tolerance: float, min_delta_ms: float) -> List[str]:
+    """返回回退描述列表；只比较两边都有的场景。"""
+    regressions: List[str] = []
+    print(f"\n{'scenario':<28}{'metric':>11}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in METRICS + ("throughput",):
+            old, new = base.get(metric), cur.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            flag = ""
+            if metric == "throughput":
+                if change < -tolerance:
+                    flag = "  REGRESSION"
+            elif change > tolerance and new - old > min_delta_ms:
+                flag = "  REGRESSION"
+            if flag:
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.0%})")
+            print(f"{name:<28}{metric:>11}{old:>12.1f}{new:>12.1f}{change:>+10.0%}{flag}")
+    return regressions
+
+
+async def _main(app, args) -> Dict[str, dict]:
+    await app.router.startup()
+    try:
+        return await run_suite(app, args)
+    finally:
+        await app.router.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=40, help="每个场景的请求数（导出、抽字、列表为一半）")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", help="逗号分隔的场景名前缀，如 chat,export_pdf,list")
+    parser.add_argument("--rows", type=int, default=10000, help="列表接口预置的记录数")
+    parser.add_argument("--bank-sizes", type=lambda s: [int(x) for x in s.split(",")], default=[0, 200, 2000])
+    parser.add_argument("--resume-lengths", type=lambda s: [int(x) for x in s.split(",")], default=[1, 4, 12],
+                        help="样例简历重复次数")
+    parser.add_argument("--pdf-pages", type=lambda s: [int(x) for x in s.split(",")], default=[2, 20])
+    parser.add_argument("--mock-ttft-ms", type=float, default=200)
+    parser.add_argument("--mock-tps", type=float, default=200)
+    parser.add_argument("--mock-response-tokens", type=int, default=300)
+    parser.add_argument("--mock-max-in-flight", type=int, default=0, help="mock Provider 在途上限，0 表示等于并发数")
+    parser.add_argument("--save-baseline", metavar="PATH", help="把本次结果写入基线文件")
+    parser.add_argument("--baseline", metavar="PATH", help="与基线文件对比，发现回退时退出码为 1")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对变化（默认 20%%）")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="小于该绝对差的延迟变化视为噪声")
+    parser.add_argument("--json", metavar="PATH", help="把本次结果另存为 JSON")
+    args = parser.parse_args()
+
+    os.environ["LLM_MOCK_ENABLED"] = "1"
+    # 基准不需要缓存命中来掩盖上游耗时
+    os.environ["LLM_CACHE_ENABLED"] = "0"
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    save_path = os.path.abspath(args.save_baseline) if args.save_baseline else None
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    client = setup_app()
+    import providers
+
+    # 配置写到临时目录，不覆盖 backend/ai_settings.json
+    providers.SETTINGS_FILE = os.path.join(os.getcwd(), "ai_settings.json")
+    providers.save_settings({
+        "provider": "mock",
+        "model": "mock-default",
+        "mock": {
+            "ttft_ms": args.mock_ttft_ms,
+            "tokens_per_s": args.mock_tps,
+            "response_tokens": args.mock_response_tokens,
+            "error_rate": 0,
+            "seed": 1,
+        },
+        "rate_limits": {"mock": {"max_in_flight": args.mock_max_in_flight or args.concurrency}},
+    })
+
+    rss_start = rss_mb()
+    print(f"python {platform.python_version()}, rss at start {rss_start:.0f}MB")
+    t0 = time.perf_counter()
+    results = asyncio.run(_main(client.app, args))
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rows": args.rows,
+            "wall_s": round(time.perf_counter() - t0, 1),
+            "rss_start_mb": round(rss_start, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+        "scenarios": results,
+    }
+    print(f"\npeak rss {report['meta']['peak_rss_mb']:.0f}MB, wall {report['meta']['wall_s']}s")
+
+    for path in (save_path, json_path):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"results written to {path}")
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("scenarios", {}), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) vs {baseline_path}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nno regressions vs baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+PDF 导出延迟基准：对比「每次重新查找/注册字体并构建样式」（旧行为）、仅字体/样式缓存、
+渲染结果缓存命中以及 ETag 304 的耗时。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_export [-n 30]
+
+无中文字体的环境会回退 Helvetica，此时字体注册开销不可见；
+可设置 PDF_CJK_FONT=/path/to/font.ttc 指定字体文件复现真实开销。
+"""
+from __future__ import annotations
+
+import argparse
+import os
+
+from benchmarks._common import measure, print_table, seed_resume, setup_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", type=int, default=30, help="每个用例的请求次数")
+    args = parser.parse_args()
+
+    # 在本进程内渲染，才能清空/观察字体与样式缓存；进程池的排队与渲染耗时见 bench_export_pool
+    os.environ["EXPORT_WORKERS"] = "0"
+    client = setup_app()
+    from reportlab.pdfbase import pdfmetrics
+    import export_render as export
+    from export_cache import export_cache
+
+    resume_id = seed_resume()
+
+    def uncached() -> None:
+        # 模拟旧实现：每次导出都重新发现、注册字体并重建样式，且不走渲染缓存
+        export.pdf_base_font.cache_clear()
+        export._pdf_styles.cache_clear()
+        pdfmetrics._fonts.pop(export._PDF_FONT_NAME, None)
+        export_cache.clear()
+
+    rows = {}
+    for path in ("pdf", "pdf-preview"):
+        url = f"/api/export/{path}/{resume_id}"
+        params = {"font_size": 10, "margin_cm": 2.0}
+
+        def call(url=url, headers=None, expect=200) -> None:
+            resp = client.get(url, params=params, headers=headers or {})
+            assert resp.status_code == expect, resp.text
+
+        rows[f"/api/export/{path} uncached"] = measure(call, args.n, before_each=uncached)
+        call()  # 预热字体与样式
+        rows[f"/api/export/{path} fonts+styles cached"] = measure(call, args.n, before_each=export_cache.clear)
+        call()
+        rows[f"/api/export/{path} render cache hit"] = measure(call, args.n)
+        etag = client.get(url, params=params).headers["etag"]
+        rows[f"/api/export/{path} 304"] = measure(
+            lambda: call(headers={"If-None-Match": etag}, expect=304), args.n
+        )
+
+    print(f"base font: {export.pdf_base_font()}")
+    print_table("PDF export latency", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+导出进程池基准：并发触发 PDF/Word 渲染的同时请求轻量接口（/api/jobs），
+对比线程内渲染（EXPORT_WORKERS=0）与进程池渲染下的导出吞吐、轻量接口延迟、排队等待与 429 次数。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_export_pool [--concurrency 16] [--workers 2] [--max-pending 8]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from benchmarks._common import SAMPLE_RESUME, print_table, seed_resume, setup_app
+
+
+def _long_resume(repeat: int) -> str:
+    return "\n\n".join([SAMPLE_RESUME] * repeat)
+
+
+async def _run(app, resume_id: int, concurrency: int, light_requests: int) -> dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        statuses = []
+        light_ms = []
+
+        async def export_one(i: int) -> None:
+            fmt = "pdf" if i % 2 == 0 else "word"
+            # 每个请求使用不同版式参数，保证渲染缓存不命中
+            resp = await client.get(
+                f"/api/export/{fmt}/{resume_id}",
+                params={"font_size": 9 + i % 4, "margin_cm": 1.0 + (i // 4) * 0.1},
+            )
+            statuses.append(resp.status_code)
+
+        async def light_loop() -> None:
+            for _ in range(light_requests):
+                t0 = time.perf_counter()
+                await client.get("/api/jobs")
+                light_ms.append((time.perf_counter() - t0) * 1000)
+                await asyncio.sleep(0.005)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(light_loop(), *(export_one(i) for i in range(concurrency)))
+        wall = (time.perf_counter() - t0) * 1000
+
+    light_ms.sort()
+    return {
+        "wall": wall,
+        "ok": statuses.count(200),
+        "rejected": statuses.count(429),
+        "light": {
+            "mean": sum(light_ms) / len(light_ms),
+            "p50": light_ms[len(light_ms) // 2],
+            "p95": light_ms[min(len(light_ms) - 1, int(len(light_ms) * 0.95))],
+            "max": light_ms[-1],
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=8)
+    parser.add_argument("--light-requests", type=int, default=40)
+    parser.add_argument("--resume-repeat", type=int, default=6, help="样例简历重复次数，控制渲染负载")
+    args = parser.parse_args()
+
+    client = setup_app()
+    from export_cache import export_cache
+    from export_pool import ExportPool
+    import routers.export as export_router
+
+    resume_id = seed_resume(_long_resume(args.resume_repeat))
+    light_rows = {}
+    for label, workers in (("thread (EXPORT_WORKERS=0)", 0), (f"process (EXPORT_WORKERS={args.workers})", args.workers)):
+        pool = ExportPool(workers, args.max_pending, 2)
+        pool.start()
+        export_router.export_pool = pool
+        export_cache.clear()
+        result = asyncio.run(_run(client.app, resume_id, args.concurrency, args.light_requests))
+        stats = pool.stats()
+        pool.shutdown()
+        light_rows[f"/api/jobs during exports, {label}"] = result["light"]
+        print(
+            f"{label}: wall={result['wall']:.0f}ms ok={result['ok']} 429={result['rejected']} "
+            f"render p50={stats['render_ms']['p50']}ms queue_wait p95={stats['queue_wait_ms']['p95']}ms"
+        )
+    print_table("Light endpoint latency under export load", light_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+图片 OCR 基准：对一组 JD 截图对比
+原始做法（整图直接 pytesseract）/ 预处理 + 切片 + 进程池 / 识别缓存命中 三种情况的耗时。
+
+默认用 PIL 生成若干张不同尺寸的合成 JD 截图；可用 --images 指定真实截图目录（png/jpg/webp）。
+需要本机安装 Tesseract（含 chi_sim 语言包）；未安装时只测预处理与切片耗时。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_ocr [--images DIR] [--workers 2] [-n 3]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from benchmarks._common import BACKEND_DIR, measure, print_table
+
+_JD_LINES = [
+    "高级后端工程师（Python）",
+    "岗位职责：",
+    "1. 负责核心交易系统的设计与开发，保障高并发场景下的稳定性；",
+    "2. 参与服务治理、性能优化与容量规划；",
+    "任职要求：",
+    "1. 3 年以上 Python / Go 开发经验，熟悉 FastAPI、Django 等框架；",
+    "2. 熟悉 MySQL、Redis、Kafka，有分布式系统经验者优先。",
+]
+
+
+def _synthetic_screenshots() -> List[Tuple[str, bytes]]:
+    from PIL import Image, ImageDraw, ImageFont
+
+    from export_render import _FONT_CANDIDATES, _find_font
+
+    font_path = _find_font("PDF_CJK_FONT", _FONT_CANDIDATES)
+    out = []
+    # (宽, 重复段数, 字号)：手机长截图 / 桌面截图 / 高分屏截图
+    for width, repeat, size in ((1080, 6, 34), (1920, 2, 22), (2880, 3, 44)):
+        font = ImageFont.truetype(font_path, size) if font_path else ImageFont.load_default()
+        lines = _JD_LINES * repeat
+        height = 40 + len(lines) * int(size * 1.8)
+        image = Image.new("RGB", (width, height), (250, 250, 250))
+        draw = ImageDraw.Draw(image)
+        for i, line in enumerate(lines):
+            draw.text((30, 20 + i * int(size * 1.8)), line, fill=(40, 40, 40), font=font)
+        buf = io.BytesIO()
+        image.save(buf, format="PNG")
+        out.append((f"synthetic_{width}x{height}.png", buf.getvalue()))
+    return out
+
+
+def _load_images(directory: str) -> List[Tuple[str, bytes]]:
+    paths = sorted(
+        p for p in Path(directory).iterdir() if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+    )
+    return [(p.name, p.read_bytes()) for p in paths]
+
+
+def _baseline(image_bytes: bytes) -> str:
+    from PIL import Image
+    import pytesseract
+
+    return pytesseract.image_to_string(Image.open(io.BytesIO(image_bytes)), lang="chi_sim+eng").strip()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", help="JD 截图目录；缺省使用合成截图")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("-n", type=int, default=3, help="每种情况重复次数")
+    args = parser.parse_args()
+
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    from ocr_pool import OcrPool, prepare_tiles
+
+    images = _load_images(args.images) if args.images else _synthetic_screenshots()
+    has_tesseract = shutil.which("tesseract") is not None
+    if not has_tesseract:
+        print("未找到 tesseract 可执行文件：仅测预处理与切片耗时")
+
+    rows = {}
+    for name, data in images:
+        tiles = prepare_tiles(data)
+        rows[f"{name[:28]} prepare ({len(tiles)} tiles)"] = measure(lambda: prepare_tiles(data), args.n)
+    print_table("Preprocess + tiling", rows)
+    if not has_tesseract:
+        return
+
+    pool = OcrPool(args.workers, 64, 1, 256)
+    # 预热：拉起子进程并加载 pytesseract
+    asyncio.run(pool.ocr(images[0][1]))
+    rows = {}
+    for name, data in images:
+        short = name[:24]
+        rows[f"{short} baseline"] = measure(lambda: _baseline(data), args.n)
+        rows[f"{short} pool"] = measure(lambda: asyncio.run(pool.ocr(data)), args.n, before_each=pool._cache.clear)
+        rows[f"{short} cache hit"] = measure(lambda: asyncio.run(pool.ocr(data)), args.n)
+    pool.shutdown()
+    print_table(f"OCR per screenshot (workers={args.workers})", rows)
+
+    # 整批：原始做法串行 vs 进程池并发
+    t0 = time.perf_counter()
+    for _, data in images:
+        _baseline(data)
+    serial_ms = (time.perf_counter() - t0) * 1000
+    pool = OcrPool(args.workers, 64, 1, 256)
+    asyncio.run(pool.ocr(images[0][1]))
+    pool._cache.clear()
+
+    async def _batch() -> None:
+        await asyncio.gather(*(pool.ocr(data) for _, data in images))
+
+    t0 = time.perf_counter()
+    asyncio.run(_batch())
+    pool_ms = (time.perf_counter() - t0) * 1000
+    pool.shutdown()
+    print(f"\nbatch of {len(images)}: baseline serial {serial_ms:.0f}ms, pool {pool_ms:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+冷启动基准：在全新子进程中 `import main`，统计导入耗时，并用 `-X importtime` 给出按包汇总的导入开销。
+
+同时检查重量级依赖（ReportLab、python-docx、PyMuPDF、pypdf、pytesseract、Pillow、模型 SDK）
+是否被提前导入——它们应在首次用到的代码路径里按需加载。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_startup [-n 5] [--top 15] [--budget-ms 1500]
+
+导入耗时中位数超过预算，或有重量级依赖在启动时被导入，退出码为 1（可在 CI 中作为回退门禁）。
+每次运行使用新的临时目录（含空 SQLite 库），与 worker 首次启动时一致。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from benchmarks._common import BACKEND_DIR
+
+# 应按需导入的依赖：出现在启动后的 sys.modules 中即视为回退
+LAZY_MODULES = ("reportlab", "docx", "fitz", "pypdf", "pytesseract", "PIL", "anthropic", "openai")
+DEFAULT_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "1500"))
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {backend!r})
+import main
+elapsed = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"import_ms": elapsed, "eager": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def _run_probe(importtime: bool = False) -> Tuple[dict, str, float]:
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", _PROBE.format(backend=str(BACKEND_DIR), lazy=LAZY_MODULES)]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=workdir, capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result, proc.stderr, wall
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """解析 `-X importtime` 输出为 (模块名, 自身耗时 us, 累计耗时 us)。"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line.split(":", 1)[1].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+        except ValueError:
+            continue
+    return rows
+
+
+def by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return dict(sorted(totals.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", type=int, default=5, help="计时的冷启动次数（另有一次预热不计）")
+    parser.add_argument("--top", type=int, default=15, help="导入开销报告显示的条目数")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="import main 耗时中位数上限（默认 STARTUP_BUDGET_MS 或 1500）")
+    args = parser.parse_args()
+
+    # 预热：确保 .pyc 已生成，计时只反映导入本身
+    _run_probe()
+    import_ms: List[float] = []
+    wall_ms: List[float] = []
+    eager: List[str] = []
+    for _ in range(args.n):
+        result, _, wall = _run_probe()
+        import_ms.append(result["import_ms"])
+        wall_ms.append(wall)
+        eager = result["eager"]
+
+    _, stderr, _ = _run_probe(importtime=True)
+    rows = parse_importtime(stderr)
+    total_us = sum(r[1] for r in rows)
+
+    print(f"\nImport cost by top-level package (-X importtime, total {total_us / 1000:.0f}ms)")
+    print(f"{'package':<36}{'self ms':>10}{'share':>9}")
+    for name, us in list(by_package(rows).items())[: args.top]:
+        print(f"{name:<36}{us / 1000:>10.1f}{us / total_us:>9.1%}")
+
+    print(f"\nSlowest modules by cumulative time")
+    print(f"{'module':<56}{'cumulative ms':>14}")
+    for name, _, cumulative in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]:
+        print(f"{name:<56}{cumulative / 1000:>14.1f}")
+
+    median = statistics.median(import_ms)
+    print(
+        f"\nimport main: median {median:.0f}ms, min {min(import_ms):.0f}ms, max {max(import_ms):.0f}ms "
+        f"(process wall median {statistics.median(wall_ms):.0f}ms, n={args.n}); budget {args.budget_ms:.0f}ms"
+    )
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"cold start {median:.0f}ms exceeds budget {args.budget_ms:.0f}ms")
+    if eager:
+        failures.append(f"heavy modules imported at startup: {', '.join(eager)}")
+    if failures:
+        for line in failures:
+            print(f"FAIL: {line}")
+        sys.exit(1)
+    print("OK: within budget, no heavy modules imported eagerly")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+HTTP 响应压缩：Accept-Encoding 协商（br / gzip）与动态响应压缩中间件。
+
+- 只压缩一次性发出的响应体（JSON、Markdown 等），分块发送的流（SSE、ZIP、文件）原样透传；
+- 体积小于 RESPONSE_COMPRESS_MIN_BYTES、类型不可压缩、已带 Content-Encoding（如预压缩静态资源）、
+  206 分段响应均不处理；
+- 压缩后 ETag 改为弱校验（W/"..."），同一资源不同编码仍能被 If-None-Match 命中（见 export_cache.etag_matches）；
+- brotli 需安装 `brotli` 包，未安装时只协商 gzip。
+"""
+from __future__ import annotations
+
+import gzip
+import os
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 可调参数（环境变量可覆盖）
+MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "4096"))
+# 动态响应注重速度：gzip 6、brotli 4 已能拿到大部分压缩率
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+# 超过该大小的响应体放到线程池压缩，避免阻塞事件循环
+THREADPOOL_MIN_BYTES = 256 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+@lru_cache(maxsize=1)
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return ("br", "gzip") if _brotli() is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str, offered: Tuple[str, ...]) -> Optional[str]:
+    """按 q 值选出 offered 中客户端最偏好的编码；q 相同时按 offered 顺序（br 优先）。"""
+    if not accept_encoding:
+        return None
+    prefs: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        prefs[name.strip()] = q
+    best, best_q = None, 0.0
+    for enc in offered:
+        q = prefs.get(enc, prefs.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def compress(data: bytes, encoding: str, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY) -> bytes:
+    if encoding == "br":
+        return _brotli().compress(data, quality=brotli_quality)
+    return gzip.compress(data, gzip_level, mtime=0)
+
+
+def _should_compress(status: int, headers: Headers, body: bytes) -> bool:
+    if status in (204, 206, 304) or len(body) < MIN_BYTES:
+        return False
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    if content_type.startswith("text/event-stream"):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """纯 ASGI 中间件：暂存响应头，拿到首个响应体后再决定是否压缩。"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), available_encodings())
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            pending, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body") or not _should_compress(pending["status"], Headers(raw=pending["headers"]), body):
+                await send(pending)
+                await send(message)
+                return
+
+            if len(body) >= THREADPOOL_MIN_BYTES:
+                packed = await run_in_threadpool(compress, body, encoding)
+            else:
+                packed = compress(body, encoding)
+            headers = MutableHeaders(raw=list(pending["headers"]))
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(packed))
+            vary = headers.get("vary")
+            if not vary:
+                headers["Vary"] = "Accept-Encoding"
+            elif "accept-encoding" not in vary.lower():
+                headers["Vary"] = f"{vary}, Accept-Encoding"
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send({**pending, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": packed})
+
+        await self.app(scope, receive, send_wrapper)
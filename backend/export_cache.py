@@ -0,0 +1,166 @@
+"""
+导出渲染结果缓存：内存 LRU + 磁盘两级，键为（简历内容哈希, 格式, 字号, 页边距, 渲染器版本）。
+同一份简历在预览弹窗里反复拖动字号/页边距时，回到已渲染过的组合可直接命中。
+简历内容变化后键随之变化；update_resume / delete_resume 会主动清掉该简历的旧条目。
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+# 可调参数（环境变量可覆盖）
+CACHE_DIR = os.environ.get(
+    "EXPORT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".export_cache"),
+)
+MAX_MEMORY_BYTES = int(os.environ.get("EXPORT_CACHE_MEMORY_MB", "32")) * 1024 * 1024
+MAX_DISK_BYTES = int(os.environ.get("EXPORT_CACHE_DISK_MB", "256")) * 1024 * 1024
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+def make_key(content_sha: str, fmt: str, font_size: int, margin_cm: float, renderer_version: int) -> str:
+    raw = f"{content_sha}|{fmt}|{font_size}|{margin_cm:.2f}|v{renderer_version}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def etag_for(key: str, disposition: str = "") -> str:
+    """渲染结果相同但下载文件名不同（简历改名）时 ETag 也要不同，否则 304 会沿用旧文件名。"""
+    if disposition:
+        key = hashlib.sha256(f"{key}|{disposition}".encode("utf-8")).hexdigest()
+    return f'"{key[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ExportCache:
+    def __init__(self, directory: str, max_memory_bytes: int, max_disk_bytes: int):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key → 文件大小，按最近使用排序
+        self._disk_bytes = 0
+        self._disk_loaded = False
+        self._by_resume: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def _load_disk_index(self) -> None:
+        if self._disk_loaded:
+            return
+        self._disk_loaded = True
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".bin")]
+        except FileNotFoundError:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for e in entries:
+            size = e.stat().st_size
+            self._disk[e.name[:-4]] = size
+            self._disk_bytes += size
+
+    def _remember_mem(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old)
+        self._mem[key] = data
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self.max_memory_bytes and self._mem:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= len(evicted)
+
+    def _drop_disk(self, key: str) -> None:
+        size = self._disk.pop(key, None)
+        if size is None:
+            return
+        self._disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                return data
+            self._load_disk_index()
+            if key not in self._disk:
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                self._disk_bytes -= self._disk.pop(key, 0)
+                return None
+            self._disk.move_to_end(key)
+            self._remember_mem(key, data)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes, resume_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._remember_mem(key, data)
+            if resume_id is not None:
+                self._by_resume.setdefault(resume_id, set()).add(key)
+            self._load_disk_index()
+            if len(data) > self.max_disk_bytes:
+                return
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp = f"{self._path(key)}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self._path(key))
+            except OSError:
+                return
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            while self._disk_bytes > self.max_disk_bytes and self._disk:
+                oldest = next(iter(self._disk))
+                self._drop_disk(oldest)
+
+    def invalidate_resume(self, resume_id: int) -> int:
+        """删除该简历此前渲染过的全部条目（内存 + 磁盘），返回删除数量。"""
+        with self._lock:
+            keys = self._by_resume.pop(resume_id, set())
+            for key in keys:
+                data = self._mem.pop(key, None)
+                if data is not None:
+                    self._mem_bytes -= len(data)
+                self._load_disk_index()
+                self._drop_disk(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._load_disk_index()
+            for key in list(self._disk):
+                self._drop_disk(key)
+            self._mem.clear()
+            self._mem_bytes = 0
+            self._by_resume.clear()
+
+
+export_cache = ExportCache(CACHE_DIR, MAX_MEMORY_BYTES, MAX_DISK_BYTES)
@@ -0,0 +1,190 @@
+"""
+导出渲染进程池：PDF / Word 渲染是 CPU 密集且持有 GIL 的同步代码，放进独立子进程，
+避免占用 Starlette 默认线程池、拖慢其它同步接口。
+
+- 排队上限：在途（排队 + 渲染中）任务数达到 EXPORT_MAX_PENDING 时直接拒绝，由接口返回 429 + Retry-After；
+- 统计：记录每次任务的排队等待与渲染耗时，供 /api/export/stats 与 Server-Timing 响应头使用；
+- EXPORT_WORKERS=0 时退化为线程内渲染（调试或受限环境用）。
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+import telemetry
+
+# 可调参数（环境变量可覆盖）
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", str(min(2, os.cpu_count() or 1))))
+EXPORT_MAX_PENDING = int(os.environ.get("EXPORT_MAX_PENDING", "8"))
+EXPORT_RETRY_AFTER = int(os.environ.get("EXPORT_RETRY_AFTER", "2"))
+_STATS_WINDOW = 200
+
+
+class ExportQueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("export queue is full")
+        self.retry_after = retry_after
+
+
+def _init_worker() -> None:
+    # 子进程启动时一次性注册字体，后续任务直接复用
+    from export_render import pdf_base_font
+
+    pdf_base_font()
+
+
+def _render_job(fmt: str, content: str, font_size: int, margin_cm: float) -> Tuple[bytes, float, float]:
+    """在子进程中执行：返回 (渲染结果, 开始时间戳, 渲染耗时 ms)。"""
+    from export_render import RENDERERS
+
+    started = time.time()
+    t0 = time.perf_counter()
+    data = RENDERERS[fmt](content, font_size, margin_cm)
+    return data, started, (time.perf_counter() - t0) * 1000
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.render_ms: Deque[float] = deque(maxlen=_STATS_WINDOW)
+        self.queue_wait_ms: Deque[float] = deque(maxlen=_STATS_WINDOW)
+
+    @staticmethod
+    def _summary(samples: Deque[float]) -> Dict[str, float]:
+        if not samples:
+            return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(samples)
+        n = len(ordered)
+        return {
+            "count": n,
+            "mean": round(sum(ordered) / n, 2),
+            "p50": round(ordered[n // 2], 2),
+            "p95": round(ordered[min(n - 1, int(n * 0.95))], 2),
+            "max": round(ordered[-1], 2),
+        }
+
+
+class ExportPool:
+    def __init__(self, workers: int, max_pending: int, retry_after: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn：各平台行为一致，且不会 fork 出带着事件循环/线程状态的子进程
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def start(self) -> None:
+        """预热：提前拉起全部子进程并注册字体，首个导出请求不再承担进程启动开销。"""
+        if self.workers <= 0:
+            _init_worker()
+            return
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_init_worker)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats.rejected += 1
+                raise ExportQueueFull(self.retry_after)
+            self._pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _render_and_release(self, fmt: str, content: str, font_size: int, margin_cm: float) -> Tuple[bytes, float, float]:
+        try:
+            return _render_job(fmt, content, font_size, margin_cm)
+        finally:
+            self._release()
+
+    async def _submit(self, fmt: str, content: str, font_size: int, margin_cm: float) -> Tuple[bytes, float, float]:
+        """
+        在途数在渲染真正结束时才释放（子进程任务的完成回调 / 线程内 finally），而不是在等待方返回时：
+        请求被取消后，已经开始的渲染仍占着工作进程，提前让出名额会导致超额放行。
+        """
+        if self.workers > 0:
+            try:
+                future = self._get_executor().submit(_render_job, fmt, content, font_size, margin_cm)
+            except BrokenProcessPool:
+                # 子进程异常退出：重建进程池，本次改为线程内渲染
+                self.shutdown()
+            except BaseException:
+                self._release()
+                raise
+            else:
+                # 排队中的任务被取消时回调立即触发；已开始的任务要等子进程渲染完
+                future.add_done_callback(lambda _: self._release())
+                try:
+                    return await asyncio.wrap_future(future)
+                except BrokenProcessPool:
+                    self.shutdown()
+                    with self._lock:
+                        self._pending += 1
+        return await run_in_threadpool(self._render_and_release, fmt, content, font_size, margin_cm)
+
+    async def render(self, fmt: str, content: str, font_size: int, margin_cm: float) -> Tuple[bytes, float, float]:
+        """提交渲染任务，返回 (渲染结果, 排队等待 ms, 渲染耗时 ms)；队列已满时抛 ExportQueueFull。"""
+        self._acquire()
+        submitted = time.time()
+        try:
+            data, started, render_ms = await self._submit(fmt, content, font_size, margin_cm)
+        except Exception:
+            with self._lock:
+                self._stats.failed += 1
+            raise
+
+        queue_wait_ms = max(0.0, (started - submitted) * 1000)
+        telemetry.EXPORT_RENDER.observe(render_ms / 1000, (fmt,))
+        telemetry.EXPORT_QUEUE_WAIT.observe(queue_wait_ms / 1000, (fmt,))
+        with self._lock:
+            self._stats.completed += 1
+            self._stats.render_ms.append(render_ms)
+            self._stats.queue_wait_ms.append(queue_wait_ms)
+        return data, queue_wait_ms, render_ms
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._stats.completed,
+                "rejected": self._stats.rejected,
+                "failed": self._stats.failed,
+                "render_ms": _Stats._summary(self._stats.render_ms),
+                "queue_wait_ms": _Stats._summary(self._stats.queue_wait_ms),
+            }
+
+
+export_pool = ExportPool(EXPORT_WORKERS, EXPORT_MAX_PENDING, EXPORT_RETRY_AFTER)
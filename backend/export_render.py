@@ -0,0 +1,255 @@
+"""
+简历渲染：Markdown → PDF（ReportLab）/ Word（python-docx）/ Markdown 字节。
+PDF 与 Word 共用 markdown_ir 的解析结果，行内粗体/斜体会真正渲染出来。
+只依赖渲染库、不依赖 FastAPI 与数据库，导出进程池的子进程只需导入本模块。
+ReportLab / python-docx 在首次渲染时才导入：API 进程导入本模块只为 RENDERER_VERSION 与 Markdown 导出，
+不必为此加载整套排版库（渲染通常发生在导出进程池的子进程里）。
+"""
+from __future__ import annotations
+
+import io
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Tuple
+from xml.sax.saxutils import escape as xml_escape
+
+from markdown_ir import Span, parse_markdown
+
+if TYPE_CHECKING:
+    from docx.document import Document
+    from reportlab.lib.styles import ParagraphStyle
+
+# 渲染逻辑（版式、字体、解析规则）变化时递增，使旧的渲染缓存失效
+RENDERER_VERSION = 3
+
+
+_PDF_FONT_NAME = "ChineseFont"
+_PDF_BOLD_FONT_NAME = "ChineseFont-Bold"
+
+_FONT_CANDIDATES = [
+    # Windows
+    r"%WINDIR%\Fonts\msyh.ttc",
+    r"%WINDIR%\Fonts\msyhbd.ttc",
+    r"%WINDIR%\Fonts\simsun.ttc",
+    "C:\\Windows\\Fonts\\msyh.ttc",
+    "C:\\Windows\\Fonts\\simsun.ttc",
+    # macOS
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/Supplemental/Songti.ttc",
+    "/Library/Fonts/Arial Unicode.ttf",
+    # Linux
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+]
+
+# 粗体字重（可选）：找不到时 <b> 回退为常规字重
+_BOLD_FONT_CANDIDATES = [
+    r"%WINDIR%\Fonts\msyhbd.ttc",
+    "C:\\Windows\\Fonts\\msyhbd.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+]
+
+
+def _find_font(env_var: str, candidates: List[str]) -> Optional[str]:
+    for fp in [os.environ.get(env_var, "")] + candidates:
+        if not fp:
+            continue
+        normalized = os.path.normpath(os.path.expanduser(os.path.expandvars(fp)))
+        if os.path.exists(normalized):
+            return normalized
+    return None
+
+
+@lru_cache(maxsize=1)
+def pdf_base_font() -> str:
+    """查找并注册中文字体（及可选粗体），进程内只做一次（.ttc 解析较慢）；失败回退 Helvetica。
+    PDF_CJK_FONT / PDF_CJK_FONT_BOLD 可指定字体文件，优先于内置候选列表。"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    font_path = _find_font("PDF_CJK_FONT", _FONT_CANDIDATES)
+    if not font_path:
+        return "Helvetica"
+    try:
+        pdfmetrics.registerFont(TTFont(_PDF_FONT_NAME, font_path))
+    except Exception:
+        return "Helvetica"
+    bold_name = _PDF_FONT_NAME
+    bold_path = _find_font("PDF_CJK_FONT_BOLD", _BOLD_FONT_CANDIDATES)
+    if bold_path:
+        try:
+            pdfmetrics.registerFont(TTFont(_PDF_BOLD_FONT_NAME, bold_path))
+            bold_name = _PDF_BOLD_FONT_NAME
+        except Exception:
+            pass
+    pdfmetrics.registerFontFamily(
+        _PDF_FONT_NAME,
+        normal=_PDF_FONT_NAME,
+        bold=bold_name,
+        italic=_PDF_FONT_NAME,
+        boldItalic=bold_name,
+    )
+    return _PDF_FONT_NAME
+
+
+class _PdfStyles(NamedTuple):
+    h1: ParagraphStyle
+    h2: ParagraphStyle
+    h3: ParagraphStyle
+    body: ParagraphStyle
+    bullet: ParagraphStyle
+
+
+@lru_cache(maxsize=16)
+def _pdf_styles(font_size: int) -> _PdfStyles:
+    """按正文字号缓存段落样式；ParagraphStyle 构建后只读，可跨请求复用。"""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+
+    base_font = pdf_base_font()
+    h1_size = max(14, font_size + 8)
+    h2_size = max(11, font_size + 3)
+    h3_size = max(10, font_size + 1)
+    return _PdfStyles(
+        h1=ParagraphStyle("H1", fontName=base_font, fontSize=h1_size, spaceAfter=6, spaceBefore=10, textColor=colors.HexColor("#1a1a2e"), leading=h1_size + 4),
+        h2=ParagraphStyle("H2", fontName=base_font, fontSize=h2_size, spaceAfter=4, spaceBefore=8, textColor=colors.HexColor("#16213e"), leading=h2_size + 4),
+        h3=ParagraphStyle("H3", fontName=base_font, fontSize=h3_size, spaceAfter=3, spaceBefore=5, textColor=colors.HexColor("#0f3460"), leading=h3_size + 3),
+        body=ParagraphStyle("Body", fontName=base_font, fontSize=font_size, spaceAfter=2, spaceBefore=1, leading=font_size + 4, textColor=colors.HexColor("#333333")),
+        bullet=ParagraphStyle("Bullet", fontName=base_font, fontSize=font_size, spaceAfter=2, spaceBefore=1, leading=font_size + 4, leftIndent=15, textColor=colors.HexColor("#333333")),
+    )
+
+
+def _spans_to_markup(spans: Tuple[Span, ...]) -> str:
+    """IR 行内片段 → ReportLab Paragraph 标记（转义 & < >，粗体/斜体/代码分别包裹）。"""
+    out = []
+    for span in spans:
+        text = xml_escape(span.text)
+        if span.code:
+            text = f'<font face="Courier">{text}</font>'
+        if span.italic:
+            text = f"<i>{text}</i>"
+        if span.bold:
+            text = f"<b>{text}</b>"
+        out.append(text)
+    return "".join(out)
+
+
+def md_to_pdf_content(md_text: str, font_size: int = 10):
+    """font_size: 9, 10, 11, 12 (body text base)."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import cm
+    from reportlab.platypus import HRFlowable, Paragraph, Spacer
+
+    styles = _pdf_styles(font_size)
+    heading_styles = {1: styles.h1, 2: styles.h2, 3: styles.h3}
+
+    story = []
+    for block in parse_markdown(md_text):
+        if block.kind == "blank":
+            story.append(Spacer(1, 0.2 * cm))
+        elif block.kind == "rule":
+            story.append(HRFlowable(width="100%", thickness=0.3, color=colors.HexColor("#dddddd")))
+        elif block.kind == "heading":
+            markup = _spans_to_markup(block.spans)
+            if block.level == 2:
+                story.append(Spacer(1, 0.1 * cm))
+                story.append(Paragraph(markup, styles.h2))
+                story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor("#cccccc")))
+            else:
+                story.append(Paragraph(markup, heading_styles.get(block.level, styles.h3)))
+        elif block.kind == "bullet":
+            style = styles.bullet
+            if block.level:
+                style = ParagraphStyle(f"Bullet{block.level}", parent=style, leftIndent=15 + 12 * block.level)
+            story.append(Paragraph(f"• {_spans_to_markup(block.spans)}", style))
+        elif block.text.strip():
+            story.append(Paragraph(_spans_to_markup(block.spans), styles.body))
+
+    return story
+
+
+def render_pdf(content: str, font_size: int, margin_cm: float) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate
+
+    buffer = io.BytesIO()
+    m = margin_cm * cm
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=m, leftMargin=m, topMargin=m, bottomMargin=m)
+    doc.build(md_to_pdf_content(content, font_size))
+    return buffer.getvalue()
+
+
+def _add_runs(p, spans: Tuple[Span, ...], font_pt: int) -> None:
+    from docx.shared import Pt
+
+    for span in spans:
+        run = p.add_run(span.text)
+        run.font.size = Pt(font_pt)
+        if span.bold:
+            run.bold = True
+        if span.italic:
+            run.italic = True
+        if span.code:
+            run.font.name = "Consolas"
+
+
+def _add_horizontal_rule(doc: Document) -> None:
+    """python-docx 无分隔线 API：用段落下边框模拟。"""
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    p = doc.add_paragraph()
+    p_pr = p._p.get_or_add_pPr()
+    border = OxmlElement("w:pBdr")
+    bottom = OxmlElement("w:bottom")
+    bottom.set(qn("w:val"), "single")
+    bottom.set(qn("w:sz"), "4")
+    bottom.set(qn("w:space"), "1")
+    bottom.set(qn("w:color"), "CCCCCC")
+    border.append(bottom)
+    p_pr.append(border)
+
+
+def render_docx(content: str, font_size: int, margin_cm: float) -> bytes:
+    from docx import Document
+    from docx.shared import Cm
+
+    doc = Document()
+    for section in doc.sections:
+        section.top_margin = Cm(margin_cm)
+        section.bottom_margin = Cm(margin_cm)
+        section.left_margin = Cm(margin_cm)
+        section.right_margin = Cm(margin_cm)
+    heading_pt = {1: min(22, font_size + 8), 2: min(16, font_size + 4), 3: min(14, font_size + 2)}
+    for block in parse_markdown(content):
+        if block.kind == "blank":
+            doc.add_paragraph("")
+        elif block.kind == "rule":
+            _add_horizontal_rule(doc)
+        elif block.kind == "heading":
+            level = min(block.level, 3)
+            p = doc.add_heading("", level=level)
+            _add_runs(p, block.spans, heading_pt[level])
+        elif block.kind == "bullet":
+            style = "List Bullet" if block.level == 0 else f"List Bullet {min(block.level + 1, 3)}"
+            _add_runs(doc.add_paragraph(style=style), block.spans, font_size)
+        else:
+            _add_runs(doc.add_paragraph(), block.spans, font_size)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def render_markdown(content: str, font_size: int = 0, margin_cm: float = 0.0) -> bytes:
+    return content.encode("utf-8")
+
+
+RENDERERS: Dict[str, Callable[[str, int, float], bytes]] = {
+    "pdf": render_pdf,
+    "docx": render_docx,
+    "md": render_markdown,
+}
@@ -7,6 +7,7 @@ import json
 import re
 from typing import Dict, List, Optional
 
+from llm_usage import UsageTags
 from providers import complete_response
 from interview_question_bank import QUESTION_CATEGORIES
 
@@ -69,6 +70,8 @@ async def generate_job_question_dicts(
     job_content: str,
     resume_content: str,
     user_background: Optional[str] = None,
+    use_cache: bool = True,
+    tags: Optional[UsageTags] = None,
 ) -> List[Dict[str, str]]:
     jd = (job_content or "").strip() or "（JD 为空，请输出通用职场面试题）"
     resume = (resume_content or "").strip() or "（简历为空，请输出通用职场面试问题）"
@@ -82,5 +85,15 @@ async def generate_job_question_dicts(
     raw = await complete_response(
         GENERATE_BANK_SYSTEM,
         [{"role": "user", "content": user_msg}],
+        use_cache=use_cache,
+        validate=_is_valid_question_list,
+        tags=tags or UsageTags("bank"),
     )
     return parse_llm_question_list(raw)
+
+
+def _is_valid_question_list(raw: str) -> bool:
+    try:
+        return bool(parse_llm_question_list(raw))
+    except ValueError:
+        return False
@@ -0,0 +1,164 @@
+"""
+模拟面试题单覆盖度追踪：按客户端提交的对话历史，用字符 n-gram 相似度把各轮面试官 <<<SPEECH>>> 区块
+匹配到题单条目，按会话记录已覆盖的题目；下一轮系统提示只注入剩余题目。
+纯本地计算，不调用 LLM。
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional
+
+from interview_question_bank import BankQuestion, questionnaire_to_markdown
+
+REACTION_TAG = "<<<REACTION>>>"
+SPEECH_TAG = "<<<SPEECH>>>"
+
+# 可调参数
+NGRAM_N = 2
+# 题干 n-gram 被发言覆盖的比例达到该值即视为已问到（面试官会口语化转述，阈值不宜过高）
+MATCH_THRESHOLD = 0.35
+MAX_SESSIONS = 256
+
+# 去掉空白与常见中英文标点，只保留参与相似度计算的字符
+_NORMALIZE_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def extract_speech(raw: str) -> str:
+    """与前端 parseInterviewSimReply 一致：取 <<<SPEECH>>> 之后的发言；无标记时返回全文。"""
+    trimmed = (raw or "").strip()
+    r_idx = trimmed.find(REACTION_TAG)
+    s_idx = trimmed.find(SPEECH_TAG)
+    if r_idx != -1 and s_idx != -1 and s_idx > r_idx:
+        return trimmed[s_idx + len(SPEECH_TAG):].strip()
+    if s_idx != -1:
+        return trimmed[s_idx + len(SPEECH_TAG):].strip()
+    return trimmed
+
+
+def char_ngrams(text: str, n: int = NGRAM_N) -> FrozenSet[str]:
+    s = _NORMALIZE_RE.sub("", (text or "").lower())
+    if len(s) < n:
+        return frozenset([s]) if s else frozenset()
+    return frozenset(s[i:i + n] for i in range(len(s) - n + 1))
+
+
+def containment(item_grams: FrozenSet[str], speech_grams: FrozenSet[str]) -> float:
+    """题干 n-gram 中出现在发言里的比例。"""
+    if not item_grams:
+        return 0.0
+    return len(item_grams & speech_grams) / len(item_grams)
+
+
+def _turn_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CoverageSession:
+    """
+    覆盖度完全由客户端提交的消息列表推导：按轮记下面试官发言的哈希，与新提交的历史逐轮比对，
+    从第一处不一致（重新生成、删掉轮次）起丢弃之后的覆盖记录再重新匹配。
+    同一会话可能被并发请求同时更新，读写都在会话锁内进行。
+    """
+    items: List[BankQuestion]
+    grams: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+    covered: Dict[str, int] = field(default_factory=dict)  # 题目 id → 首次覆盖的轮次（从 1 开始）
+    turn_keys: List[str] = field(default_factory=list)  # 已处理的面试官轮次内容哈希
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if not self.grams:
+            self.grams = {q.id: char_ngrams(q.text) for q in self.items}
+
+    @property
+    def turns_seen(self) -> int:
+        return len(self.turn_keys)
+
+    def _match(self, assistant_text: str, turn: int) -> List[str]:
+        """把一轮面试官回复与尚未覆盖的题目比较，返回新覆盖的题目 id。"""
+        speech_grams = char_ngrams(extract_speech(assistant_text))
+        if not speech_grams:
+            return []
+        newly: List[str] = []
+        for q in self.items:
+            if q.id in self.covered:
+                continue
+            if containment(self.grams[q.id], speech_grams) >= MATCH_THRESHOLD:
+                self.covered[q.id] = turn
+                newly.append(q.id)
+        return newly
+
+    def sync(self, messages: list) -> List[str]:
+        """按对话历史更新覆盖记录，返回本次新覆盖的题目 id；与上次一致的轮次不重复匹配。"""
+        texts = [m.get("content") or "" for m in messages if m.get("role") == "assistant"]
+        keys = [_turn_key(t) for t in texts]
+        with self._lock:
+            keep = 0
+            while keep < min(len(keys), len(self.turn_keys)) and keys[keep] == self.turn_keys[keep]:
+                keep += 1
+            if keep < len(self.turn_keys):
+                # 历史在此处分叉：之后轮次的覆盖记录作废
+                self.covered = {qid: turn for qid, turn in self.covered.items() if turn <= keep}
+                del self.turn_keys[keep:]
+            newly: List[str] = []
+            for i in range(keep, len(keys)):
+                newly.extend(self._match(texts[i], i + 1))
+                self.turn_keys.append(keys[i])
+            return newly
+
+    def remaining(self) -> List[BankQuestion]:
+        with self._lock:
+            return [q for q in self.items if q.id not in self.covered]
+
+    def remaining_markdown(self) -> str:
+        rest = self.remaining()
+        done = len(self.items) - len(rest)
+        if not rest:
+            return (
+                "## 本场题单进度\n\n"
+                f"题单中的 {len(self.items)} 道大题均已覆盖。可结合候选人回答做少量追问，"
+                "或邀请候选人反向提问后自然收尾。"
+            )
+        md = questionnaire_to_markdown(rest)
+        if done:
+            md += f"\n\n（已覆盖 {done}/{len(self.items)} 题，以上为剩余题目）"
+        return md
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "total": len(self.items),
+                "covered": [
+                    {"id": q.id, "turn": self.covered[q.id]} for q in self.items if q.id in self.covered
+                ],
+                "remaining": [q.id for q in self.items if q.id not in self.covered],
+                "turns_seen": self.turns_seen,
+            }
+
+
+_sessions: "OrderedDict[str, CoverageSession]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def create_session(items: List[BankQuestion]) -> str:
+    session_id = uuid.uuid4().hex
+    with _lock:
+        _sessions[session_id] = CoverageSession(items=list(items))
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return session_id
+
+
+def get_session(session_id: Optional[str]) -> Optional[CoverageSession]:
+    if not session_id:
+        return None
+    with _lock:
+        sess = _sessions.get(session_id)
+        if sess is not None:
+            _sessions.move_to_end(session_id)
+        return sess
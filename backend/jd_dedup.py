@@ -0,0 +1,78 @@
+"""
+岗位 JD 去重：批量导入时与已有 jobs 及同批文件比对。
+
+- 完全重复：去掉空白与标点、统一小写后的内容哈希相同；
+- 近似重复：字符 3-gram 集合的 Jaccard 相似度 ≥ NEAR_DUP_THRESHOLD
+  （同一 JD 的截图 OCR 与 PDF 版本、或招聘网站改了几个字的重发）。
+纯本地计算，不调用 LLM。
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Union
+
+# 可调参数
+NGRAM_N = 3
+NEAR_DUP_THRESHOLD = 0.85
+
+_NORMALIZE_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_jd(text: str) -> str:
+    return _NORMALIZE_RE.sub("", (text or "").lower())
+
+
+def _digest(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def shingles(normalized: str, n: int = NGRAM_N) -> FrozenSet[str]:
+    if len(normalized) < n:
+        return frozenset([normalized]) if normalized else frozenset()
+    return frozenset(normalized[i:i + n] for i in range(len(normalized) - n + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# 已有岗位用 job id（int）标识，同批待导入文件用文件名（str）标识
+Ref = Union[int, str]
+
+
+class DupMatch(NamedTuple):
+    ref: Ref
+    similarity: float
+    exact: bool
+
+
+class JobDedupIndex:
+    def __init__(self) -> None:
+        self._by_hash: Dict[str, Ref] = {}
+        self._entries: List[Tuple[Ref, FrozenSet[str]]] = []
+
+    def add(self, ref: Ref, text: str) -> None:
+        normalized = normalize_jd(text)
+        self._by_hash.setdefault(_digest(normalized), ref)
+        self._entries.append((ref, shingles(normalized)))
+
+    def find(self, text: str) -> Optional[DupMatch]:
+        normalized = normalize_jd(text)
+        digest = _digest(normalized)
+        if digest in self._by_hash:
+            return DupMatch(self._by_hash[digest], 1.0, True)
+        grams = shingles(normalized)
+        if not grams:
+            return None
+        best: Optional[DupMatch] = None
+        for ref, other in self._entries:
+            # Jaccard 上界为两集合大小之比，差距过大直接跳过
+            if min(len(grams), len(other)) < NEAR_DUP_THRESHOLD * max(len(grams), len(other)):
+                continue
+            sim = jaccard(grams, other)
+            if sim >= NEAR_DUP_THRESHOLD and (best is None or sim > best.similarity):
+                best = DupMatch(ref, round(sim, 3), False)
+        return best
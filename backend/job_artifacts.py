@@ -0,0 +1,262 @@
+"""
+岗位 JD 派生数据：按内容哈希计算一次并入库（job_artifacts 表），JD 更新时重算。
+
+- 分段：把 JD 切成 岗位职责 / 任职要求 / 加分项（以及开头的概述、其余杂项）；
+- 关键词：本地抽取技能词（英文技术栈 + 常见中文技能词），按出现次数排序；
+- 摘要（可选）：调用当前 LLM 生成精简版 JD，仅在显式请求时生成，同样按内容哈希失效。
+
+面试模拟、复盘、评分卡等每轮都要携带 JD 的提示词改用 compact_job_context，
+有摘要时用摘要，否则用分段后的职责/要求/加分项，省去公司介绍、福利等与评估无关的篇幅。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import models
+from llm_usage import UsageTags
+from providers import complete_response, load_settings, resolve_chain
+
+# 分段/抽词规则变化时递增，已入库的派生数据会按需重算
+ARTIFACT_VERSION = 2
+MAX_KEYWORDS = 30
+# 摘要少于该字数视为生成失败（不入库，避免把提示语或残缺输出当成 JD）
+_MIN_SUMMARY_CHARS = 20
+
+SECTION_TITLES = {
+    "responsibilities": "岗位职责",
+    "requirements": "任职要求",
+    "bonus": "加分项",
+}
+
+# 小标题行识别：不带序号/项目符号，且以冒号结尾、带标题标记或以关键词开头，整行不宜过长
+_SECTION_PATTERNS = [
+    ("responsibilities", re.compile(r"(岗位职责|工作职责|职位职责|工作内容|职位描述|岗位描述|responsibilit|what you.?ll do)", re.I)),
+    ("requirements", re.compile(r"(任职要求|岗位要求|任职资格|职位要求|能力要求|requirement|qualification|what we.?re looking for)", re.I)),
+    ("bonus", re.compile(r"(加分项|优先考虑|以下优先|bonus|nice to have|preferred|plus)", re.I)),
+    ("other", re.compile(r"(福利|待遇|薪资福利|公司介绍|关于我们|工作地点|benefit|about us)", re.I)),
+]
+_MAX_HEADING_LEN = 24
+# 小标题行中关键词之外的文字会随标题一起丢掉；累计超过该字数时 compact_job_context 回退原文
+_MAX_DROPPED_CHARS = 8
+_HEADING_MARK_RE = re.compile(r"^(?:#{1,6}|【|\[|\*\*)")
+# 统计丢弃字数时忽略空白与标点
+_HEADING_FILLER_RE = re.compile(r"[\s\W_]+")
+_INLINE_HEADING_RE = re.compile(r"^[^:：]{2,16}[:：]\s*\S")
+_BULLET_PREFIX_RE = re.compile(r"^\s*(?:[-*•·●]|\d+[.、)）]|[（(]\d+[)）]|[一二三四五六七八九十]+[、.])\s*")
+
+_EN_TOKEN_RE = re.compile(r"(?<![A-Za-z0-9])[A-Za-z][A-Za-z0-9+#.\-]*[A-Za-z0-9+#]|(?<![A-Za-z0-9])[A-Za-z](?![A-Za-z0-9])")
+_EN_STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or our the to we with you your will can "
+    "have has etc e.g i.e jd hr team work job years year experience plus preferred".split()
+)
+_CN_SKILLS = [
+    "分布式", "高并发", "微服务", "中间件", "数据库", "缓存", "消息队列", "搜索引擎", "推荐系统", "机器学习",
+    "深度学习", "自然语言处理", "计算机视觉", "大模型", "数据分析", "数据挖掘", "数据仓库", "性能优化", "系统设计",
+    "架构设计", "自动化测试", "持续集成", "云原生", "容器", "运维", "安全", "前端", "后端", "全栈", "移动端",
+    "产品设计", "需求分析", "用户研究", "项目管理", "跨部门协作", "沟通能力", "团队管理", "英语",
+]
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+def _heading_kind(line: str) -> Optional[Tuple[str, int]]:
+    """
+    判断一行是否为小标题，返回 (分段类型, 关键词之外被丢弃的字数)。
+    带序号/项目符号的行（如「2. 有大模型经验者优先考虑」）总是内容；否则需以冒号结尾、带标题标记（#、【】、**）
+    或以小标题关键词开头，避免「Go preferred」这类短句被当成标题吞掉。
+    """
+    text = line.strip()
+    if not text.startswith("**") and _BULLET_PREFIX_RE.match(text):
+        return None
+    marked = bool(_HEADING_MARK_RE.match(text))
+    colon = text.rstrip("*】] ").endswith((":", "："))
+    core = text.strip("#*【】[]：: ").strip()
+    if not core or len(core) > _MAX_HEADING_LEN:
+        return None
+    for kind, pattern in _SECTION_PATTERNS:
+        m = pattern.search(core)
+        if m and (marked or colon or m.start() == 0):
+            rest = core
+            for _, p in _SECTION_PATTERNS:
+                rest = p.sub("", rest)
+            return kind, len(_HEADING_FILLER_RE.sub("", rest))
+    return None
+
+
+def _segment(text: str) -> Tuple[Dict[str, List[str]], int]:
+    sections: Dict[str, List[str]] = {"overview": []}
+    current = "overview"
+    dropped = 0
+    for raw in (text or "").splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if _INLINE_HEADING_RE.match(line):
+            # 「任职要求：3 年以上经验」这类标题与内容同一行的写法
+            head, sep, rest = re.split(r"([:：])", line, maxsplit=1)
+            heading = _heading_kind(head + sep)
+            if heading is not None:
+                current, extra = heading
+                dropped += extra
+                sections.setdefault(current, []).append(_BULLET_PREFIX_RE.sub("", rest.strip()))
+                continue
+        heading = _heading_kind(line)
+        if heading is not None:
+            current, extra = heading
+            dropped += extra
+            sections.setdefault(current, [])
+            continue
+        item = _BULLET_PREFIX_RE.sub("", line).strip()
+        if item:
+            sections.setdefault(current, []).append(item)
+    return {k: v for k, v in sections.items() if v}, dropped
+
+
+def segment_sections(text: str) -> Dict[str, List[str]]:
+    """按小标题切分 JD；小标题前的内容归入 overview。条目去掉序号/项目符号前缀。"""
+    return _segment(text)[0]
+
+
+def extract_keywords(text: str, limit: int = MAX_KEYWORDS) -> List[str]:
+    """技能关键词：英文技术词（保留原始大小写中最常见的写法）+ 中文技能词表命中，按出现次数排序。"""
+    counts: Counter = Counter()
+    spelling: Dict[str, Counter] = {}
+    for token in _EN_TOKEN_RE.findall(text or ""):
+        key = token.lower().rstrip(".")
+        if len(key) < 2 and key not in ("c", "r"):
+            continue
+        if key in _EN_STOPWORDS or key.isdigit():
+            continue
+        counts[key] += 1
+        spelling.setdefault(key, Counter())[token.rstrip(".")] += 1
+    for word in _CN_SKILLS:
+        n = (text or "").count(word)
+        if n:
+            counts[word] += n
+            spelling.setdefault(word, Counter())[word] += n
+    return [spelling[k].most_common(1)[0][0] for k, _ in counts.most_common(limit)]
+
+
+def compute_artifacts(content: str) -> dict:
+    sections, dropped = _segment(content)
+    return {
+        "version": ARTIFACT_VERSION,
+        "sections": sections,
+        "keywords": extract_keywords(content),
+        # 被当作小标题丢掉的非关键词字数，用于判断分段是否可靠
+        "dropped_chars": dropped,
+    }
+
+
+def refresh_job_artifacts(db: Session, db_job: models.Job, commit: bool = True) -> models.JobArtifact:
+    """内容哈希或规则版本变化时重算本地派生数据；LLM 摘要只在内容未变时保留。"""
+    digest = content_hash(db_job.content or "")
+    row = db.query(models.JobArtifact).filter(models.JobArtifact.job_id == db_job.id).first()
+    if row is not None and row.content_hash == digest and row.version == ARTIFACT_VERSION:
+        return row
+    if row is None:
+        row = models.JobArtifact(job_id=db_job.id)
+        db.add(row)
+    if row.content_hash != digest:
+        row.summary = None
+    row.content_hash = digest
+    row.version = ARTIFACT_VERSION
+    row.artifacts_json = json.dumps(compute_artifacts(db_job.content or ""), ensure_ascii=False)
+    if commit:
+        db.commit()
+        db.refresh(row)
+    return row
+
+
+def current_artifacts(db: Session, db_job: models.Job) -> Tuple[dict, Optional[str], str]:
+    """
+    只读：返回 (派生数据, 摘要, 内容哈希)。入库数据仍有效时直接使用，否则在内存中重算；
+    入库由岗位创建/更新与摘要生成负责，GET 接口与提示词拼接不写库。
+    """
+    digest = content_hash(db_job.content or "")
+    row = db.query(models.JobArtifact).filter(models.JobArtifact.job_id == db_job.id).first()
+    summary = row.summary if row is not None and row.content_hash == digest else None
+    if row is not None and row.content_hash == digest and row.version == ARTIFACT_VERSION:
+        return json.loads(row.artifacts_json or "{}"), summary, digest
+    return compute_artifacts(db_job.content or ""), summary, digest
+
+
+def _header_lines(db_job: models.Job) -> List[str]:
+    parts = []
+    if getattr(db_job, "job_url", None):
+        parts.append(f"岗位链接：{db_job.job_url}")
+    if getattr(db_job, "salary", None):
+        parts.append(f"薪资：{db_job.salary}")
+    return parts
+
+
+def compact_job_context(db: Session, db_job: models.Job) -> Optional[str]:
+    """精简版 JD；分段失败（找不到职责/要求，或小标题行丢掉了过多文字）且没有摘要时返回 None，由调用方回退原文。"""
+    data, summary, _ = current_artifacts(db, db_job)
+    keywords = data.get("keywords") or []
+    parts = [f"岗位：{db_job.title}" + (f"（{db_job.company}）" if db_job.company else "")]
+    parts.extend(_header_lines(db_job))
+    if summary:
+        parts.append(summary.strip())
+    else:
+        sections = data.get("sections") or {}
+        if not sections.get("responsibilities") and not sections.get("requirements"):
+            return None
+        if data.get("dropped_chars", 0) > _MAX_DROPPED_CHARS:
+            return None
+        for kind, title in SECTION_TITLES.items():
+            items = sections.get(kind)
+            if items:
+                parts.append(f"{title}：\n" + "\n".join(f"- {x}" for x in items))
+    if keywords:
+        parts.append("核心技能关键词：" + "、".join(keywords))
+    return "\n\n".join(parts)
+
+
+JOB_SUMMARY_SYSTEM = """你是招聘需求分析助手。请把用户给出的岗位 JD 压缩为面试官与评估模型使用的精简版，要求：
+1）只保留对评估候选人有用的信息：核心职责、硬性要求、加分项、业务背景关键信息；
+2）删去公司介绍、福利待遇、口号等内容；
+3）用中文条目输出，分「职责」「要求」「加分项」三节，每节不超过 6 条，每条不超过 40 字；
+4）不要编造 JD 中没有的信息；只输出正文，不要前言。"""
+
+
+class SummaryUnavailable(Exception):
+    """未配置可用模型，无法生成摘要。"""
+
+
+def _is_valid_summary(text: str) -> bool:
+    text = (text or "").strip()
+    return len(text) >= _MIN_SUMMARY_CHARS and not text.startswith("⚠️")
+
+
+async def generate_job_summary(db: Session, db_job: models.Job) -> models.JobArtifact:
+    """
+    调用当前配置的 LLM 生成精简版 JD 并入库（按内容哈希缓存，内容不变不重复生成）。
+    未配置可用模型时抛 SummaryUnavailable；输出为空、为提示语或过短时抛 ValueError，不写入摘要。
+    """
+    row = refresh_job_artifacts(db, db_job)
+    if row.summary:
+        return row
+    chain, warning = resolve_chain(load_settings())
+    if not chain:
+        raise SummaryUnavailable(warning or "未配置当前所选模型的 API Key")
+    summary = await complete_response(
+        JOB_SUMMARY_SYSTEM,
+        [{"role": "user", "content": db_job.content or ""}],
+        validate=_is_valid_summary,
+        tags=UsageTags("job_summary", db_job.id),
+    )
+    if not _is_valid_summary(summary):
+        raise ValueError("模型未返回有效摘要")
+    row.summary = summary.strip()
+    db.commit()
+    db.refresh(row)
+    return row
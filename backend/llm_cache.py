@@ -0,0 +1,153 @@
+"""
+非流式 LLM 调用（complete_response）的响应缓存，默认关闭（LLM_CACHE_ENABLED=1 开启）。
+
+- 键：(provider, model, system 哈希, messages 哈希, prompt_version)，provider/model 取当前所选主模型；
+- 存储：主库 llm_response_cache 表，按 TTL 过期；总大小超过上限时按最近使用时间淘汰；
+- 合并：同一进程内相同键的并发请求只调用一次上游（single-flight），其余等待同一结果；
+- 旁路：调用方传 use_cache=False 即跳过读写；validate 不通过（如 JSON 解析失败）的结果不写入。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+
+import models
+from database import SessionLocal
+
+# 可调参数（环境变量可覆盖）
+ENABLED = os.environ.get("LLM_CACHE_ENABLED", "0").lower() in ("1", "true", "yes")
+TTL_S = int(os.environ.get("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(provider: str, model: str, system: str, messages: list, prompt_version: str = "") -> str:
+    messages_sha = _sha(json.dumps(messages, ensure_ascii=False, sort_keys=True))
+    return _sha(f"{provider}|{model}|{_sha(system or '')}|{messages_sha}|{prompt_version}")
+
+
+def _now() -> datetime:
+    # SQLite 不保存时区，统一按 UTC 的 naive datetime 存取
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _get(key: str) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        row = db.query(models.LLMResponseCache).filter(models.LLMResponseCache.cache_key == key).first()
+        if row is None:
+            return None
+        now = _now()
+        if row.expires_at <= now:
+            db.delete(row)
+            db.commit()
+            return None
+        row.hits += 1
+        row.last_used_at = now
+        db.commit()
+        return row.response
+    finally:
+        db.close()
+
+
+def _put(key: str, provider: str, model: str, prompt_version: str, response: str) -> None:
+    db = SessionLocal()
+    try:
+        now = _now()
+        row = db.query(models.LLMResponseCache).filter(models.LLMResponseCache.cache_key == key).first()
+        if row is None:
+            row = models.LLMResponseCache(cache_key=key, hits=0)
+            db.add(row)
+        row.provider = provider
+        row.model = model
+        row.prompt_version = prompt_version
+        row.response = response
+        row.size_bytes = len(response.encode("utf-8"))
+        row.expires_at = now + timedelta(seconds=TTL_S)
+        row.last_used_at = now
+        db.commit()
+        _evict(db, now)
+    finally:
+        db.close()
+
+
+def _evict(db, now: datetime) -> None:
+    """删除过期条目；总大小仍超上限时按最近使用时间从旧到新删除。"""
+    table = models.LLMResponseCache
+    db.query(table).filter(table.expires_at <= now).delete(synchronize_session=False)
+    total = db.query(func.coalesce(func.sum(table.size_bytes), 0)).scalar() or 0
+    if total > MAX_BYTES:
+        doomed = []
+        for row_id, size in db.query(table.id, table.size_bytes).order_by(table.last_used_at.asc()).all():
+            if total <= MAX_BYTES:
+                break
+            doomed.append(row_id)
+            total -= size
+        db.query(table).filter(table.id.in_(doomed)).delete(synchronize_session=False)
+    db.commit()
+
+
+def clear() -> int:
+    db = SessionLocal()
+    try:
+        n = db.query(models.LLMResponseCache).delete(synchronize_session=False)
+        db.commit()
+        return n
+    finally:
+        db.close()
+
+
+async def cached_call(
+    key: str,
+    provider: str,
+    model: str,
+    prompt_version: str,
+    call: Callable[[], Awaitable[str]],
+    validate: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """命中直接返回；未命中时相同键只发起一次 call()，结果非空且通过 validate 才写入缓存。"""
+    while True:
+        pending = _inflight.get(key)
+        if pending is None:
+            break
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # 领头的请求被取消（客户端断开），由当前请求接手
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        hit = await run_in_threadpool(_get, key)
+        if hit is not None:
+            result = hit
+        else:
+            result = await call()
+            if result.strip() and (validate is None or validate(result)):
+                await run_in_threadpool(_put, key, provider, model, prompt_version, result)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        # 没有其他等待者时避免 "exception was never retrieved" 警告
+        future.exception()
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        _inflight.pop(key, None)
@@ -0,0 +1,132 @@
+"""
+LLM 用量记录：每次调用（含故障转移、对冲产生的尝试）的 token 数、首 token 时间、总耗时，
+按功能（feature）、岗位、简历打标签，写入 llm_usage 表。
+
+- 写入在后台线程批量进行（攒够 FLUSH_BATCH 条或每 FLUSH_INTERVAL_S 秒一次），不占请求路径；
+- Provider 未返回 usage 时按字符数估算，estimated=1 标记；
+- 费用不在写入时计算：ai_settings.json 的 prices（每百万 token 单价）在查询聚合时套用。
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import insert
+
+import models
+from database import SessionLocal
+
+# 可调参数（环境变量可覆盖）
+FLUSH_BATCH = int(os.environ.get("LLM_USAGE_FLUSH_BATCH", "100"))
+FLUSH_INTERVAL_S = float(os.environ.get("LLM_USAGE_FLUSH_INTERVAL_S", "2"))
+# 队列上限：数据库长时间不可写时丢弃新记录，而不是无限占用内存
+MAX_PENDING = 10000
+
+FEATURES = ("chat", "interview_sim", "report", "scorecard", "bank", "resume_parse", "job_summary", "other")
+
+
+class UsageTags(NamedTuple):
+    feature: str = "other"
+    job_id: Optional[int] = None
+    resume_id: Optional[int] = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def usage_from_anthropic(usage) -> dict:
+    return {
+        "input_tokens": getattr(usage, "input_tokens", None),
+        "output_tokens": getattr(usage, "output_tokens", None),
+        "cached_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+    }
+
+
+def usage_from_openai(usage) -> dict:
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if cached is None:
+        # DeepSeek 的上下文缓存命中字段
+        cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    return {
+        "input_tokens": getattr(usage, "prompt_tokens", None),
+        "output_tokens": getattr(usage, "completion_tokens", None),
+        "cached_tokens": cached or 0,
+    }
+
+
+class UsageWriter:
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=MAX_PENDING)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.dropped = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-usage-writer", daemon=True)
+                self._thread.start()
+
+    def record(self, row: dict) -> None:
+        row.setdefault("created_at", _now())
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self._ensure_started()
+
+    def _drain(self, first: Optional[dict] = None) -> List[dict]:
+        rows = [first] if first is not None else []
+        while len(rows) < FLUSH_BATCH:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, rows: List[dict]) -> None:
+        if not rows:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(insert(models.LLMUsage), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.dropped += len(rows)
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=FLUSH_INTERVAL_S)
+            except queue.Empty:
+                continue
+            # 拿到第一条后稍等片刻，把同一时段的记录攒成一批
+            self._stop.wait(min(0.2, FLUSH_INTERVAL_S))
+            self._write(self._drain(first))
+
+    def flush(self) -> None:
+        """同步写出队列中剩余的记录（关闭时、或查询前保证数据可见）。"""
+        while True:
+            rows = self._drain()
+            if not rows:
+                return
+            self._write(rows)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self.flush()
+
+
+usage_writer = UsageWriter()
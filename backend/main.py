@@ -1,17 +1,28 @@
 from pathlib import Path
+import asyncio
 import os
+import threading
 from dotenv import load_dotenv
 
 # 加载 backend/.env 中的环境变量（API Key 等）
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-
+from fastapi.responses import PlainTextResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+import profiling
+from compression import CompressionMiddleware
+from json_response import FastJSONResponse
+from static_assets import CompressedStaticFiles, SpaIndex
+import telemetry
 from database import engine, Base
-from routers import jobs, resumes, chat, export, settings as settings_router, uploads, background, interview_sim, evaluation
+from export_pool import export_pool
+from ocr_pool import ocr_pool
+from upload_limits import UploadLimitMiddleware
+from llm_usage import usage_writer
+from routers import jobs, resumes, chat, export, settings as settings_router, uploads, background, interview_sim, evaluation, metrics, profiles
 
 Base.metadata.create_all(bind=engine)
 
@@ -118,8 +129,11 @@ try:
 except Exception:
     pass
 
-app = FastAPI(title="一岗一历 · OneJD OneResume", version="1.0.0")
+app = FastAPI(title="一岗一历 · OneJD OneResume", version="1.0.0", default_response_class=FastJSONResponse)
 
+# 最内层：只看路由返回的响应体，SSE 与分块流原样透传
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(UploadLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -127,6 +141,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if telemetry.ENABLED:
+    # 最外层：耗时包含 CORS 与上传限制中间件
+    app.add_middleware(telemetry.MetricsMiddleware)
+    telemetry.instrument_engine(engine)
+if profiling.ENABLED:
+    # 在指标中间件之外：剖析覆盖整个请求处理链
+    app.add_middleware(profiling.ProfilingMiddleware)
 
 app.include_router(jobs.router)
 app.include_router(resumes.router)
@@ -137,24 +158,81 @@ app.include_router(export.router)
 app.include_router(settings_router.router)
 app.include_router(uploads.router)
 app.include_router(background.router)
+app.include_router(metrics.router)
+app.include_router(profiles.router)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus 文本格式指标（METRICS_ENABLED=0 时返回 404）。"""
+    if not telemetry.ENABLED:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(telemetry.registry.render(), media_type="text/plain; version=0.0.4")
+
 
 static_dir = os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
 if os.path.exists(static_dir):
-    app.mount("/assets", StaticFiles(directory=os.path.join(static_dir, "assets")), name="assets")
+    # 带哈希的构建产物：压缩协商 + 一年 immutable 缓存
+    app.mount("/assets", CompressedStaticFiles(directory=os.path.join(static_dir, "assets"), immutable_hashed=True), name="assets")
+    # dist 根目录下的其它文件（favicon 等 public 资源，文件名固定：no-cache + ETag）与常驻内存的 index.html
+    spa_files = CompressedStaticFiles(directory=static_dir)
+    spa_index = SpaIndex(os.path.join(static_dir, "index.html"))
 
     @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
+    async def serve_spa(full_path: str, request: Request):
         if full_path.startswith("api/") or full_path == "api":
             from fastapi import HTTPException
             raise HTTPException(status_code=404, detail="Not Found")
-        index_path = os.path.join(static_dir, "index.html")
-        return FileResponse(index_path)
+        if "." in full_path.rsplit("/", 1)[-1] and full_path != "index.html":
+            try:
+                return await spa_files.get_response(full_path, request.scope)
+            except StarletteHTTPException:
+                pass
+        return spa_index.response(request.headers)
 else:
     @app.get("/")
     def root():
         return {"message": "简历定制Agent API is running"}
 
 
+@app.on_event("startup")
+def start_export_pool():
+    # 导出进程池在后台预热（拉起子进程并一次性注册中文字体），首个 PDF 导出无需再解析 .ttc
+    threading.Thread(target=export_pool.start, name="export-pool-warmup", daemon=True).start()
+
+
+_loop_lag_task = None
+
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    global _loop_lag_task
+    if telemetry.ENABLED:
+        _loop_lag_task = asyncio.create_task(telemetry.monitor_event_loop_lag())
+
+
+@app.on_event("shutdown")
+def stop_export_pool():
+    export_pool.shutdown()
+
+
+@app.on_event("shutdown")
+def stop_ocr_pool():
+    ocr_pool.shutdown()
+
+
+@app.on_event("shutdown")
+def stop_usage_writer():
+    usage_writer.shutdown()
+
+
+@app.on_event("shutdown")
+def stop_loop_lag_monitor():
+    if _loop_lag_task is not None:
+        _loop_lag_task.cancel()
+
+
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
@@ -0,0 +1,116 @@
+"""
+简历 Markdown → 轻量中间表示（IR）：一次遍历、预编译正则，产出紧凑的块列表，
+供 PDF（ReportLab）与 Word（python-docx）渲染器共用，保证两种导出对边界情况的理解一致。
+
+只覆盖简历模板用到的子集：标题（# ~ ######）、无序列表（- / * / +，支持缩进层级）、
+分隔线（--- / *** / ___）、普通段落、空行，以及行内粗体 / 斜体 / 行内代码。
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+# 结尾的 # 只有前面有空白时才是闭合标记（「### 技能 C#」保留 C#）
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+_BULLET_RE = re.compile(r"^([ \t]*)[-*+]\s+(.*)$")
+_RULE_RE = re.compile(r"^\s*(?:-{3,}|\*{3,}|_{3,})\s*$")
+# 行内：***粗斜体*** / **粗体** / __粗体__ / *斜体* / _斜体_ / `代码`；下划线要求两侧不是单词字符，避免误伤 snake_case
+_INLINE_RE = re.compile(
+    r"\*\*\*(?P<bi>.+?)\*\*\*"
+    r"|\*\*(?P<b1>.+?)\*\*"
+    r"|(?<!\w)__(?P<b2>.+?)__(?!\w)"
+    r"|\*(?P<i1>[^*\s](?:[^*]*?[^*\s])?)\*"
+    r"|(?<!\w)_(?P<i2>[^_\s](?:[^_]*?[^_\s])?)_(?!\w)"
+    r"|`(?P<code>[^`]+)`"
+)
+
+
+class Span(NamedTuple):
+    text: str
+    bold: bool = False
+    italic: bool = False
+    code: bool = False
+
+
+class Block(NamedTuple):
+    # heading / bullet / rule / paragraph / blank
+    kind: str
+    # heading：1～6；bullet：缩进层级（0 起）；其它为 0
+    level: int = 0
+    spans: Tuple[Span, ...] = ()
+
+    @property
+    def text(self) -> str:
+        return "".join(s.text for s in self.spans)
+
+
+def parse_inline(text: str, bold: bool = False, italic: bool = False) -> Tuple[Span, ...]:
+    """
+    行内标记 → Span 序列；斜体内部不跨越同种分隔符，同一行的多个强调各自成段
+    （`python -m doctest markdown_ir.py` 校验）：
+
+    >>> [(s.text, s.bold, s.italic) for s in parse_inline("*a* and *b*")]
+    [('a', False, True), (' and ', False, False), ('b', False, True)]
+    >>> [(s.text, s.italic) for s in parse_inline("_a_ and _b_")]
+    [('a', True), (' and ', False), ('b', True)]
+    >>> [(s.text, s.bold, s.italic) for s in parse_inline("*x* **y**")]
+    [('x', False, True), (' ', False, False), ('y', True, False)]
+    >>> [(s.text, s.bold, s.italic) for s in parse_inline("**粗 *斜* 体** snake_case_name")]
+    [('粗 ', True, False), ('斜', True, True), (' 体', True, False), (' snake_case_name', False, False)]
+    """
+    spans: List[Span] = []
+    pos = 0
+    for m in _INLINE_RE.finditer(text):
+        if m.start() > pos:
+            spans.append(Span(text[pos:m.start()], bold, italic))
+        if m.group("bi") is not None:
+            spans.append(Span(m.group("bi"), True, True))
+        elif m.group("b1") is not None or m.group("b2") is not None:
+            # 粗体内部允许再嵌一层斜体（**粗 *斜* 体**）
+            spans.extend(parse_inline(m.group("b1") or m.group("b2"), True, italic))
+        elif m.group("i1") is not None or m.group("i2") is not None:
+            spans.append(Span(m.group("i1") or m.group("i2"), bold, True))
+        else:
+            spans.append(Span(m.group("code"), bold, italic, True))
+        pos = m.end()
+    if pos < len(text):
+        spans.append(Span(text[pos:], bold, italic))
+    return tuple(s for s in spans if s.text)
+
+
+def _indent_level(indent: str) -> int:
+    width = len(indent.replace("\t", "    "))
+    return min(width // 2, 3)
+
+
+@lru_cache(maxsize=64)
+def parse_markdown(md_text: str) -> Tuple[Block, ...]:
+    r"""
+    解析结果按内容缓存（同一份简历换字号/页边距重复导出时不再重复解析）。
+
+    >>> [b.text for b in parse_markdown("### 技能 C#\n## 经历 ##")]
+    ['技能 C#', '经历']
+    """
+    blocks: List[Block] = []
+    for raw in md_text.splitlines():
+        line = raw.rstrip()
+        if not line.strip():
+            blocks.append(Block("blank"))
+            continue
+        if _RULE_RE.match(line):
+            blocks.append(Block("rule"))
+            continue
+        stripped = line.lstrip()
+        m = _HEADING_RE.match(stripped)
+        if m:
+            blocks.append(Block("heading", len(m.group(1)), parse_inline(m.group(2))))
+            continue
+        m = _BULLET_RE.match(line)
+        if m:
+            content = m.group(2).strip()
+            if content:
+                blocks.append(Block("bullet", _indent_level(m.group(1)), parse_inline(content)))
+            continue
+        blocks.append(Block("paragraph", 0, parse_inline(stripped)))
+    return tuple(blocks)
@@ -0,0 +1,238 @@
+"""
+本地 Mock LLM：不联网、不花钱，用于压测 /api/chat/stream、模拟面试等链路与离线基准。
+
+设 LLM_MOCK_ENABLED=1 后 PROVIDERS 中出现 mock（type=mock，无需 API Key）。行为可调：
+- ttft_ms：首 token 延迟；tokens_per_s：输出速度；response_tokens：自由文本回复的 token 数；
+- error_rate：注入错误的概率；error_mode：before_first_token（可被故障转移接住）或 mid_stream；
+- seed：固定随机种子，便于复现。
+默认值取环境变量 MOCK_LLM_*，ai_settings.json 的 "mock" 字段可覆盖。
+
+按系统提示词识别场景并返回可解析的固定内容：评分卡 JSON、题库 JSON 数组、
+<<<REACTION>>>/<<<SPEECH>>> 面试轮次、复盘报告 Markdown、带 ===RESUME_START/END=== 的简历。
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+from typing import AsyncGenerator, Dict, List, Optional
+
+from interview_question_bank import QUESTION_CATEGORIES
+
+ENABLED = os.environ.get("LLM_MOCK_ENABLED", "0").lower() in ("1", "true", "yes")
+
+MOCK_DEFAULTS = {
+    "ttft_ms": float(os.environ.get("MOCK_LLM_TTFT_MS", "300")),
+    "tokens_per_s": float(os.environ.get("MOCK_LLM_TOKENS_PER_S", "60")),
+    "response_tokens": int(os.environ.get("MOCK_LLM_RESPONSE_TOKENS", "400")),
+    "error_rate": float(os.environ.get("MOCK_LLM_ERROR_RATE", "0")),
+    "error_mode": os.environ.get("MOCK_LLM_ERROR_MODE", "before_first_token"),
+    "seed": int(os.environ["MOCK_LLM_SEED"]) if os.environ.get("MOCK_LLM_SEED") else None,
+}
+
+PROVIDER_ENTRY = {
+    "name": "Mock（本地压测）",
+    "name_cn": "Mock",
+    "type": "mock",
+    "env_key": "",
+    "models": [
+        {"id": "mock-default", "name": "Mock（按配置延迟）"},
+        {"id": "mock-fast", "name": "Mock（无延迟）"},
+    ],
+    "default_model": "mock-default",
+}
+
+# 单次 sleep 至少攒够这么久的 token，避免高 tokens_per_s 时调度开销失真
+_MIN_SLEEP_S = 0.01
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_]+\s*|[^\sA-Za-z0-9_]{1,2}\s*|\s+")
+_FILLER = (
+    "围绕岗位核心要求梳理过往经历，突出可量化的业务结果与个人贡献。"
+    "在项目中主导方案设计与落地，推动跨团队协作并持续复盘改进。"
+)
+
+_ERROR_MODES = ("before_first_token", "mid_stream")
+
+# 未设 seed 时共用的随机源；设了 seed 时每个 seed 一个随机源，跨请求延续同一序列，保证可复现
+_rng = random.Random()
+_seeded_rngs: Dict[int, random.Random] = {}
+_rng_lock = threading.Lock()
+
+
+class MockProviderError(RuntimeError):
+    pass
+
+
+def _coerce(key: str, value):
+    """按字段类型转换并校验，非法值抛 ValueError / TypeError。"""
+    if key == "error_mode":
+        if value not in _ERROR_MODES:
+            raise ValueError(f"error_mode 只能是 {' / '.join(_ERROR_MODES)}")
+        return value
+    if key == "seed":
+        return None if value is None or value == "" else int(value)
+    if key == "response_tokens":
+        number = int(value)
+    else:
+        number = float(value)
+    if number < 0 or (key == "error_rate" and number > 1):
+        raise ValueError(f"{key} 超出范围")
+    return number
+
+
+def clean_mock_settings(raw: dict) -> dict:
+    """校验 /api/settings 提交的 mock 字段：只保留已知字段，类型或取值不合法时抛 ValueError。"""
+    out = {}
+    for key, value in raw.items():
+        if key not in MOCK_DEFAULTS:
+            continue
+        try:
+            out[key] = _coerce(key, value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"mock.{key} 无效: {e}") from e
+    return out
+
+
+def mock_config(settings: Optional[dict] = None) -> dict:
+    """环境变量默认值 + ai_settings.json 的 "mock" 覆盖；覆盖值不合法时忽略该字段。"""
+    conf = dict(MOCK_DEFAULTS)
+    for key, value in ((settings or {}).get("mock") or {}).items():
+        if key in MOCK_DEFAULTS:
+            try:
+                conf[key] = _coerce(key, value)
+            except (TypeError, ValueError):
+                pass
+    return conf
+
+
+def _rng_for(seed: Optional[int]) -> random.Random:
+    if seed is None:
+        return _rng
+    with _rng_lock:
+        rng = _seeded_rngs.get(seed)
+        if rng is None:
+            rng = _seeded_rngs[seed] = random.Random(seed)
+        return rng
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text)
+
+
+def _filler(n_tokens: int) -> str:
+    out: List[str] = []
+    while len(out) < n_tokens:
+        out.extend(_tokens(_FILLER))
+    return "".join(out[:n_tokens])
+
+
+def _last_user_text(messages: list) -> str:
+    for m in reversed(messages):
+        if m.get("role") == "user" and isinstance(m.get("content"), str):
+            return m["content"]
+    return ""
+
+
+def _scorecard(messages: list) -> str:
+    user = _last_user_text(messages)
+    m = re.search(r"能力项生成评分卡：(.+?)\n", user)
+    competencies = [c for c in (m.group(1).split("、") if m else []) if c.strip()] or ["岗位匹配", "技术深度", "沟通协作"]
+    items = [
+        {
+            "competency": c.strip(),
+            "score": 70 + (i * 7) % 25,
+            "confidence": "中",
+            "summary": f"{c.strip()}方面有相关经历，证据较为具体。",
+            "evidence": [{"source": "简历", "quote": "主导核心模块设计与落地", "why": "体现独立负责与结果导向"}],
+            "gap": "缺少规模化场景的量化数据",
+            "suggestion": "补充关键指标与个人贡献占比",
+        }
+        for i, c in enumerate(competencies)
+    ]
+    return json.dumps({
+        "overall_score": 78,
+        "overall_summary": "整体匹配度较好，核心经历与岗位要求相符，部分能力项证据不足。",
+        "items": items,
+        "needs_verification": ["项目规模与个人贡献占比", "线上问题排查的具体案例"],
+    }, ensure_ascii=False)
+
+
+def _question_list() -> str:
+    questions = [
+        {"category": QUESTION_CATEGORIES[i % len(QUESTION_CATEGORIES)],
+         "text": f"请结合你简历中的一段经历，谈谈你在第 {i + 1} 个关键挑战中是如何做决策的？"}
+        for i in range(16)
+    ]
+    return json.dumps(questions, ensure_ascii=False)
+
+
+def _interview_turn(response_tokens: int) -> str:
+    speech = "好的，谢谢你的介绍。" + _filler(max(10, response_tokens - 20)) + "能具体说说你在其中负责的部分吗？"
+    return "<<<REACTION>>>\n面试官点点头，低头记了几笔。\n<<<SPEECH>>>\n" + speech
+
+
+def _report(response_tokens: int) -> str:
+    return (
+        "## 总体评价\n\n" + _filler(response_tokens // 3)
+        + "\n\n## 亮点\n\n- " + _filler(response_tokens // 6)
+        + "\n\n## 待提升\n\n- " + _filler(response_tokens // 6)
+        + "\n\n## 改进建议\n\n1. " + _filler(response_tokens // 3) + "\n"
+    )
+
+
+def _resume(response_tokens: int) -> str:
+    return (
+        "根据岗位要求调整了简历重点，以下为完整简历：\n\n===RESUME_START===\n"
+        "# 张三\n\n## 工作经历\n\n### 某科技公司 | 高级工程师 | 2021.06 - 至今\n\n- "
+        + _filler(max(20, response_tokens - 80))
+        + "\n\n## 专业技能\n\n- **后端**：Python、FastAPI、SQL\n===RESUME_END===\n\n如需调整侧重点请告诉我。"
+    )
+
+
+def canned_response(system: str, messages: list, response_tokens: int) -> str:
+    system = system or ""
+    if "<<<REACTION>>>" in system:
+        return _interview_turn(response_tokens)
+    if "overall_score" in system:
+        return _scorecard(messages)
+    if "JSON 数组" in system and "category" in system:
+        return _question_list()
+    if "复盘" in system:
+        return _report(response_tokens)
+    if "===RESUME_START===" in system and "简历" in _last_user_text(messages):
+        return _resume(response_tokens)
+    return _filler(response_tokens)
+
+
+async def stream_mock(
+    model: str,
+    system: str,
+    messages: list,
+    config: Optional[dict] = None,
+    usage: Optional[dict] = None,
+) -> AsyncGenerator[str, None]:
+    conf = config or mock_config()
+    fast = model == "mock-fast"
+    inject = conf.get("error_rate", 0) > 0 and _rng_for(conf.get("seed")).random() < conf["error_rate"]
+
+    if not fast and conf.get("ttft_ms", 0) > 0:
+        await asyncio.sleep(conf["ttft_ms"] / 1000)
+    if inject and conf.get("error_mode") != "mid_stream":
+        raise MockProviderError("mock provider injected error")
+
+    tokens = _tokens(canned_response(system, messages, int(conf.get("response_tokens", 400))))
+    tps = conf.get("tokens_per_s", 0)
+    per_sleep = 1 if fast or tps <= 0 else max(1, int(tps * _MIN_SLEEP_S))
+    cut = len(tokens) // 2 if inject else None
+    for i in range(0, len(tokens), per_sleep):
+        if cut is not None and i >= cut:
+            raise MockProviderError("mock provider injected mid-stream error")
+        if i and not fast and tps > 0:
+            await asyncio.sleep(per_sleep / tps)
+        yield "".join(tokens[i:i + per_sleep])
+
+    if usage is not None:
+        chars = len(system or "") + sum(len(str(m.get("content", ""))) for m in messages)
+        usage.update(input_tokens=chars // 2, output_tokens=len(tokens), cached_tokens=0)
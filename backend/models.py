@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, ForeignKey, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -24,6 +24,7 @@ class Job(Base):
         back_populates="job",
         cascade="all, delete-orphan",
     )
+    artifact = relationship("JobArtifact", uselist=False, cascade="all, delete-orphan")
 
 
 class Resume(Base):
@@ -48,6 +49,28 @@ class Resume(Base):
 
     job = relationship("Job", back_populates="resumes")
     conversations = relationship("Conversation", back_populates="resume", cascade="all, delete-orphan")
+    revisions = relationship("ResumeRevision", cascade="all, delete-orphan")
+
+
+class ResumeRevision(Base):
+    """简历修订历史：每隔若干版存一份完整快照，其余存相对上一版的压缩行级差异（见 resume_revisions.py）。"""
+    __tablename__ = "resume_revisions"
+    __table_args__ = (UniqueConstraint("resume_id", "revision", name="uq_resume_revisions_resume_revision"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), nullable=False, index=True)
+    # 每份简历内从 1 递增
+    revision = Column(Integer, nullable=False)
+    # snapshot：data 为 zlib 压缩的全文；delta：data 为 zlib 压缩的、相对 revision - 1 的行级操作
+    kind = Column(String(16), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    content_length = Column(Integer, nullable=False, default=0)
+    content_sha = Column(String(64), nullable=False)
+    # create / edit / chat / restore / initial
+    source = Column(String(32), nullable=False, default="edit")
+    note = Column(String(500), nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)
 
 
 class Conversation(Base):
@@ -75,6 +98,62 @@ class JobConversation(Base):
     job = relationship("Job")
 
 
+class JobArtifact(Base):
+    """岗位 JD 派生数据（分段、技能关键词、可选 LLM 摘要），按 JD 内容哈希失效。"""
+    __tablename__ = "job_artifacts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True, unique=True)
+    content_hash = Column(String(64), nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    artifacts_json = Column(Text, nullable=False, default="{}")
+    summary = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class LLMResponseCache(Base):
+    """complete_response 的响应缓存（可选开启），键为 provider/model/提示词哈希/消息哈希/提示词版本。"""
+    __tablename__ = "llm_response_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)
+    provider = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    prompt_version = Column(String(50), nullable=False, default="")
+    response = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    last_used_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class LLMUsage(Base):
+    """每次 LLM 调用尝试的用量与耗时（后台批量写入）。job_id / resume_id 仅作标签，不设外键，删除岗位后用量仍保留。"""
+    __tablename__ = "llm_usage"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    feature = Column(String(50), nullable=False, index=True)
+    provider = Column(String(50), nullable=False, index=True)
+    model = Column(String(100), nullable=False)
+    job_id = Column(Integer, nullable=True, index=True)
+    resume_id = Column(Integer, nullable=True, index=True)
+    priority = Column(String(20), nullable=True)
+    # ok / error / timeout / cancelled / queue_timeout
+    outcome = Column(String(20), nullable=False)
+    hedged = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    cached_tokens = Column(Integer, nullable=False, default=0)
+    # 1 = Provider 未返回 usage，按字符数估算
+    estimated = Column(Integer, nullable=False, default=0)
+    ttft_ms = Column(Float, nullable=True)
+    duration_ms = Column(Float, nullable=True)
+    queue_ms = Column(Float, nullable=True)
+
+
 class EvaluationReport(Base):
     """结构化评估记录：能力项分值 + 证据链 + 置信度。"""
     __tablename__ = "evaluation_reports"
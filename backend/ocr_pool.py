@@ -0,0 +1,346 @@
+"""
+图片 OCR：预处理 + 切片 + 进程池 + 结果缓存。
+
+- 预处理：转灰度，过宽的截图等比缩小到 OCR_MAX_WIDTH，再按 Otsu 阈值二值化，减少 Tesseract 耗时；
+- 切片：长截图按 OCR_TILE_HEIGHT 切成横条，切口选在附近的空白行，避免把一行字切成两半；各切片并行识别；
+- 进程池：Tesseract 是外部进程 + 同步调用，放进独立进程池，不阻塞事件循环；
+  在途任务（预处理切片 + 各切片识别）达到 OCR_MAX_PENDING 时抛 OcrQueueFull，由接口返回 429 + Retry-After；
+- 缓存：按（图片字节哈希, 语言, 流水线版本）缓存识别结果，同一张截图重复上传直接返回。
+OCR_WORKERS=0 时退化为线程内识别（调试或受限环境用）。
+长 PDF 的分页抽字（pdf_text）也复用这个进程池。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+import telemetry
+
+# 可调参数（环境变量可覆盖）
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(min(2, os.cpu_count() or 1))))
+OCR_MAX_PENDING = int(os.environ.get("OCR_MAX_PENDING", "16"))
+OCR_RETRY_AFTER = int(os.environ.get("OCR_RETRY_AFTER", "3"))
+OCR_LANG = os.environ.get("OCR_LANG", "chi_sim+eng")
+OCR_MAX_WIDTH = int(os.environ.get("OCR_MAX_WIDTH", "1800"))
+OCR_TILE_HEIGHT = int(os.environ.get("OCR_TILE_HEIGHT", "1600"))
+OCR_CACHE_ENTRIES = int(os.environ.get("OCR_CACHE_ENTRIES", "256"))
+# 切口向上寻找空白行的范围（像素）
+_CUT_SEARCH_PX = 120
+# 预处理/切片逻辑变化时递增，使旧的识别缓存失效
+OCR_PIPELINE_VERSION = 1
+
+
+class OcrQueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("ocr queue is full")
+        self.retry_after = retry_after
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg = 0.0
+    weight_bg = 0
+    best, best_var = 127, -1.0
+    for t in range(256):
+        weight_bg += histogram[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * histogram[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best, best_var = t, var
+    return best
+
+
+def preprocess_image(image):
+    """灰度 → 限宽缩放 → 二值化（深色背景的截图先反色，保证白底黑字）。"""
+    from PIL import Image, ImageOps
+
+    gray = ImageOps.exif_transpose(image).convert("L")
+    if gray.width > OCR_MAX_WIDTH:
+        height = max(1, round(gray.height * OCR_MAX_WIDTH / gray.width))
+        gray = gray.resize((OCR_MAX_WIDTH, height), Image.LANCZOS)
+    threshold = _otsu_threshold(gray.histogram())
+    binary = gray.point(lambda p: 255 if p > threshold else 0, mode="1").convert("L")
+    # 黑色像素占多数时视为深色主题截图
+    if binary.histogram()[0] > (binary.width * binary.height) // 2:
+        binary = ImageOps.invert(binary)
+    return binary
+
+
+def _is_blank_row(image, y: int) -> bool:
+    return image.crop((0, y, image.width, y + 1)).getextrema()[0] == 255
+
+
+def split_tiles(image) -> list:
+    """按 OCR_TILE_HEIGHT 切成横条；切口优先落在上方最近的空白行。"""
+    tiles = []
+    top = 0
+    while image.height - top > OCR_TILE_HEIGHT:
+        cut = top + OCR_TILE_HEIGHT
+        for y in range(cut, max(top + 1, cut - _CUT_SEARCH_PX), -1):
+            if _is_blank_row(image, y):
+                cut = y
+                break
+        tiles.append(image.crop((0, top, image.width, cut)))
+        top = cut
+    tiles.append(image.crop((0, top, image.width, image.height)))
+    return tiles
+
+
+def prepare_tiles(image_bytes: bytes) -> List[bytes]:
+    """解码 + 预处理 + 切片，返回各切片的 PNG 字节（便于跨进程传递）。"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        processed = preprocess_image(image)
+    out = []
+    for tile in split_tiles(processed):
+        buf = io.BytesIO()
+        tile.save(buf, format="PNG")
+        out.append(buf.getvalue())
+    return out
+
+
+def ocr_tile(tile_png: bytes, lang: str = OCR_LANG) -> str:
+    from PIL import Image
+    import pytesseract
+
+    with Image.open(io.BytesIO(tile_png)) as tile:
+        return pytesseract.image_to_string(tile, lang=lang).strip()
+
+
+def ocr_image(image_bytes: bytes, lang: str = OCR_LANG) -> Tuple[str, float]:
+    """子进程任务：一张图片完整走预处理、切片与逐片识别，返回 (文本, 耗时 ms)。"""
+    t0 = time.perf_counter()
+    parts = [ocr_tile(tile, lang) for tile in prepare_tiles(image_bytes)]
+    return "\n".join(p for p in parts if p).strip(), (time.perf_counter() - t0) * 1000
+
+
+def image_key(image_bytes: bytes, lang: str = OCR_LANG) -> str:
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{digest}|{lang}|v{OCR_PIPELINE_VERSION}"
+
+
+class OcrPool:
+    def __init__(self, workers: int, max_pending: int, retry_after: int, cache_entries: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.cache_entries = cache_entries
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def cache_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+            return text
+
+    def cache_put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def _acquire(self, n: int) -> None:
+        with self._lock:
+            if self._pending + n > self.max_pending and self._pending > 0:
+                raise OcrQueueFull(self.retry_after)
+            self._pending += n
+
+    def _release(self, n: int) -> None:
+        with self._lock:
+            self._pending -= n
+
+    def _call_and_release(self, fn, *args):
+        try:
+            return fn(*args)
+        finally:
+            self._release(1)
+
+    def _submit(self, fn, *args) -> Optional[Future]:
+        """
+        把一个已计入在途数的任务交给进程池，名额在 future 完成时释放，而不是在等待方返回时：
+        调用方被取消或提前出错后，已开始的识别仍占着进程，提前让出名额会导致超额放行。
+        返回 None 表示进程池不可用，名额仍被占用，由调用方在线程内执行（_call_and_release）。
+        """
+        if self.workers <= 0:
+            return None
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            self.shutdown()
+            return None
+        except BaseException:
+            self._release(1)
+            raise
+        future.add_done_callback(lambda _: self._release(1))
+        return future
+
+    def _start(self, fn, *args) -> "asyncio.Future":
+        """异步调用方使用：立即提交（不等协程被调度），线程内执行时同样在结束时释放名额。"""
+        future = self._submit(fn, *args)
+        if future is not None:
+            return asyncio.wrap_future(future)
+        try:
+            return asyncio.get_running_loop().run_in_executor(None, self._call_and_release, fn, *args)
+        except BaseException:
+            self._release(1)
+            raise
+
+    async def _finish(self, future: "asyncio.Future", fn, *args):
+        try:
+            return await future
+        except BrokenProcessPool:
+            # 子进程异常退出：重建进程池，本次改为线程内执行（重新计入在途数）
+            self.shutdown()
+            with self._lock:
+                self._pending += 1
+            return await run_in_threadpool(self._call_and_release, fn, *args)
+
+    def _map_tracked(self, fn, args_list: list) -> list:
+        """同步调用方使用：同 map_sync，但每个任务已计入 1 个在途名额，由任务结束时各自释放。"""
+        futures: List[Optional[Future]] = []
+        try:
+            for args in args_list:
+                futures.append(self._submit(fn, *args))
+        except BaseException:
+            # 出错的那个已在 _submit 中释放；其余未提交的与待线程内执行的一并释放
+            self._release(len(args_list) - len(futures) - 1 + futures.count(None))
+            raise
+        out = []
+        for i, (future, args) in enumerate(zip(futures, args_list)):
+            try:
+                if future is None:
+                    out.append(self._call_and_release(fn, *args))
+                    continue
+                try:
+                    out.append(future.result())
+                except BrokenProcessPool:
+                    self.shutdown()
+                    with self._lock:
+                        self._pending += 1
+                    out.append(self._call_and_release(fn, *args))
+            except BaseException:
+                self._release(futures[i + 1:].count(None))
+                raise
+        return out
+
+    def map_sync(self, fn, args_list: list) -> list:
+        """同步调用方使用：把若干个独立子任务（如 PDF 分页抽字）分发到进程池，按提交顺序返回结果。"""
+        if self.workers <= 0 or len(args_list) <= 1:
+            return [fn(*args) for args in args_list]
+        try:
+            futures = [self._get_executor().submit(fn, *args) for args in args_list]
+            return [f.result() for f in futures]
+        except BrokenProcessPool:
+            self.shutdown()
+            return [fn(*args) for args in args_list]
+
+    async def ocr(self, image_bytes: bytes, lang: str = OCR_LANG) -> str:
+        """识别一张图片；命中缓存直接返回，否则预处理后各切片并行识别再按顺序拼接。"""
+        key = image_key(image_bytes, lang)
+        cached = self.cache_get(key)
+        if cached is not None:
+            return cached
+        t0 = time.perf_counter()
+        # 预处理/切片同样占用进程池，先按 1 个任务计入在途数，拿到切片后再换成切片数；
+        # 名额由各任务结束时释放（见 _submit）
+        self._acquire(1)
+        tiles = await self._finish(self._start(prepare_tiles, image_bytes), prepare_tiles, image_bytes)
+        self._acquire(len(tiles))
+        futures = []
+        try:
+            for tile in tiles:
+                futures.append(self._start(ocr_tile, tile, lang))
+        except BaseException:
+            self._release(len(tiles) - len(futures) - 1)
+            raise
+        parts = await asyncio.gather(
+            *(self._finish(f, ocr_tile, tile, lang) for f, tile in zip(futures, tiles))
+        )
+        text = "\n".join(p for p in parts if p).strip()
+        telemetry.OCR_DURATION.observe(time.perf_counter() - t0, ("pool",))
+        self.cache_put(key, text)
+        return text
+
+    def ocr_sync(self, image_bytes: bytes, lang: str = OCR_LANG) -> str:
+        """同步调用方使用：同样走预处理、切片与缓存，切片在当前线程内依次识别。"""
+        key = image_key(image_bytes, lang)
+        cached = self.cache_get(key)
+        if cached is not None:
+            return cached
+        t0 = time.perf_counter()
+        parts = [ocr_tile(tile, lang) for tile in prepare_tiles(image_bytes)]
+        text = "\n".join(p for p in parts if p).strip()
+        telemetry.OCR_DURATION.observe(time.perf_counter() - t0, ("inline",))
+        self.cache_put(key, text)
+        return text
+
+    def ocr_many_sync(self, images: List[bytes], lang: str = OCR_LANG) -> List[Tuple[str, float]]:
+        """同步调用方使用：多张图片（如 PDF 扫描页）分发到进程池并行识别，返回各自的 (文本, 耗时 ms)；
+        命中缓存的耗时记为 0。在途任务同样计入 OCR_MAX_PENDING，队列已满时抛 OcrQueueFull。"""
+        keys = [image_key(b, lang) for b in images]
+        results: List[Optional[Tuple[str, float]]] = []
+        for key in keys:
+            cached = self.cache_get(key)
+            results.append((cached, 0.0) if cached is not None else None)
+        todo = [i for i, r in enumerate(results) if r is None]
+        if todo:
+            t0 = time.perf_counter()
+            self._acquire(len(todo))
+            outs = self._map_tracked(ocr_image, [(images[i], lang) for i in todo])
+            telemetry.OCR_DURATION.observe(time.perf_counter() - t0, ("pool",))
+            for i, out in zip(todo, outs):
+                self.cache_put(keys[i], out[0])
+                results[i] = out
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "cached": len(self._cache),
+            }
+
+
+ocr_pool = OcrPool(OCR_WORKERS, OCR_MAX_PENDING, OCR_RETRY_AFTER, OCR_CACHE_ENTRIES)
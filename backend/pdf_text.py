@@ -0,0 +1,206 @@
+"""
+PDF 文本抽取：上传解析（/api/uploads）与简历背景整理共用。
+
+- 引擎：优先 PyMuPDF（C 实现，比纯 Python 的 pypdf 快一个数量级），未安装或打开失败时回退 pypdf；
+- 分页并行：页数达到 PDF_PARALLEL_MIN_PAGES 时按页段分发到文档处理进程池（复用 ocr_pool），
+  任务只传文件路径与页段，不把整份 PDF 复制给每个子进程；
+- 扫描页：逐页判断（文字过少即视为扫描页），只有这些页需要走 OCR / 多模态，而不是整份文档；
+  需要 OCR 的扫描页一并交给进程池并行识别；
+- 计时：返回每页的抽取耗时与字数，便于定位慢页面。
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import time
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple
+
+import telemetry
+
+# 可调参数（环境变量可覆盖）
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "16"))
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", "8"))
+# 单页可见字符少于该值视为扫描页
+SCANNED_PAGE_MIN_CHARS = 20
+# 扫描页转图（OCR / 多模态）的缩放倍数
+PAGE_RENDER_ZOOM = 2
+
+
+class PageText(NamedTuple):
+    page: int  # 从 1 开始
+    text: str
+    scanned: bool
+    ms: float
+    engine: str  # pymupdf / pypdf / ocr
+
+
+class PdfTextResult(NamedTuple):
+    pages: Tuple[PageText, ...]
+    engine: str
+    total_ms: float
+
+    @property
+    def text(self) -> str:
+        return "\n".join(p.text for p in self.pages if p.text).strip()
+
+    @property
+    def scanned_pages(self) -> List[int]:
+        return [p.page for p in self.pages if p.scanned]
+
+    def page_report(self) -> List[dict]:
+        return [
+            {"page": p.page, "chars": len(p.text), "scanned": p.scanned, "ms": round(p.ms, 2), "engine": p.engine}
+            for p in self.pages
+        ]
+
+
+def _is_scanned(text: str) -> bool:
+    return len("".join(text.split())) < SCANNED_PAGE_MIN_CHARS
+
+
+def _fitz():
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        return None
+    return fitz
+
+
+def _file_path(pdf_file: BinaryIO) -> Optional[str]:
+    """文件对象背后有真实路径时返回路径（上传的 SpooledTemporaryFile 没有）。"""
+    name = getattr(pdf_file, "name", None)
+    return name if isinstance(name, str) and os.path.isfile(name) else None
+
+
+def _pages_from(source, engine: str, start: int, stop: int) -> List[PageText]:
+    """从已打开的文档（fitz.Document / PdfReader）抽取 [start, stop) 页（0 起）。"""
+    out: List[PageText] = []
+    for i in range(start, stop):
+        t0 = time.perf_counter()
+        if engine == "pymupdf":
+            text = source.load_page(i).get_text("text").strip()
+        else:
+            text = (source.pages[i].extract_text() or "").strip()
+        out.append(PageText(i + 1, text, _is_scanned(text), (time.perf_counter() - t0) * 1000, engine))
+    return out
+
+
+def extract_page_range(path: str, start: int, stop: int, engine: str) -> List[PageText]:
+    """子进程任务：按路径打开 PDF 并抽取 [start, stop) 页（0 起），任务参数里不携带文件内容。"""
+    if engine == "pymupdf":
+        import fitz
+
+        with fitz.open(path) as doc:
+            return _pages_from(doc, engine, start, stop)
+    from pypdf import PdfReader
+
+    return _pages_from(PdfReader(path), engine, start, stop)
+
+
+def _extract_parallel(pdf_file: BinaryIO, data: Optional[bytes], n_pages: int, engine: str) -> List[PageText]:
+    """按页段分发到进程池；没有现成路径时先写一份临时文件，各任务只传 (路径, 起, 止)。"""
+    from ocr_pool import ocr_pool
+
+    path = _file_path(pdf_file)
+    tmp_path = None
+    if path is None:
+        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as out:
+            if data is not None:
+                out.write(data)
+            else:
+                pdf_file.seek(0)
+                shutil.copyfileobj(pdf_file, out)
+        path = tmp_path
+    try:
+        ranges = [
+            (path, start, min(start + PDF_PAGES_PER_TASK, n_pages), engine)
+            for start in range(0, n_pages, PDF_PAGES_PER_TASK)
+        ]
+        return [p for chunk in ocr_pool.map_sync(extract_page_range, ranges) for p in chunk]
+    finally:
+        if tmp_path is not None:
+            os.unlink(tmp_path)
+
+
+def _render_png(doc, page: int, zoom: int = PAGE_RENDER_ZOOM) -> bytes:
+    import fitz
+
+    pix = doc.load_page(page - 1).get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    return pix.tobytes("png")
+
+
+def _open_fitz(fitz, pdf_file: BinaryIO):
+    """用 PyMuPDF 打开：有真实路径时按路径打开，否则读出一次字节（fitz 不接受 SpooledTemporaryFile）。"""
+    pdf_file.seek(0)
+    path = _file_path(pdf_file)
+    if path is not None:
+        return fitz.open(path), None
+    data = pdf_file.read()
+    return fitz.open(stream=data, filetype="pdf"), data
+
+
+def render_pages_png(pdf_file: BinaryIO, pages: List[int], zoom: int = PAGE_RENDER_ZOOM) -> List[bytes]:
+    """把指定页（1 起）渲染为 PNG，供多模态识别；文档只打开一次。需要 PyMuPDF。"""
+    import fitz
+
+    doc, _ = _open_fitz(fitz, pdf_file)
+    with doc:
+        return [_render_png(doc, page, zoom) for page in pages]
+
+
+def _ocr_scanned_pages(doc, pages: List[PageText]) -> List[PageText]:
+    """扫描页渲染为图片后一次性交给 OCR 进程池并行识别；OCR 队列已满时向上抛出 OcrQueueFull。"""
+    from ocr_pool import OcrQueueFull, ocr_pool
+
+    scanned = [p for p in pages if p.scanned]
+    try:
+        results = ocr_pool.ocr_many_sync([_render_png(doc, p.page) for p in scanned])
+    except OcrQueueFull:
+        raise
+    except Exception:
+        # 未安装 Tesseract 等情况保留原结果，由调用方决定是否走多模态
+        return pages
+    by_page = {p.page: PageText(p.page, text, _is_scanned(text), p.ms + ms, "ocr") for p, (text, ms) in zip(scanned, results)}
+    return [by_page.get(p.page, p) for p in pages]
+
+
+def extract_pdf_text(pdf_file: BinaryIO, ocr_scanned: bool = False) -> PdfTextResult:
+    """
+    pdf_file：可 seek 的 PDF 文件对象（上传的临时文件）。
+    ocr_scanned=True 时对扫描页渲染并 OCR（需要 PyMuPDF），其余页面直接用文字层。
+    文档只打开一次：pypdf 直接读文件对象；PyMuPDF 只接受字节流 / 路径，只有用它时才读出字节。
+    """
+    t0 = time.perf_counter()
+    fitz = _fitz()
+    doc, data = None, None
+    if fitz is not None:
+        try:
+            doc, data = _open_fitz(fitz, pdf_file)
+        except Exception:
+            # PyMuPDF 打不开的文件，交给 pypdf 再试一次
+            doc, data = None, None
+    try:
+        if doc is not None:
+            source, engine, n_pages = doc, "pymupdf", len(doc)
+        else:
+            from pypdf import PdfReader
+
+            pdf_file.seek(0)
+            source = PdfReader(pdf_file)
+            engine, n_pages = "pypdf", len(source.pages)
+
+        if n_pages >= PDF_PARALLEL_MIN_PAGES:
+            pages = _extract_parallel(pdf_file, data, n_pages, engine)
+        else:
+            pages = _pages_from(source, engine, 0, n_pages)
+
+        if ocr_scanned and doc is not None and any(p.scanned for p in pages):
+            pages = _ocr_scanned_pages(doc, pages)
+    finally:
+        if doc is not None:
+            doc.close()
+    elapsed = time.perf_counter() - t0
+    telemetry.PDF_EXTRACT.observe(elapsed, (engine,))
+    return PdfTextResult(tuple(pages), engine, elapsed * 1000)
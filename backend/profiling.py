@@ -0,0 +1,250 @@
+"""
+按需单请求采样剖析：PROFILING_ENABLED=1 时注册中间件，请求带 `X-Profile: 1` 头或 `?_profile=1` 参数才采样。
+
+- 采样线程每 PROFILING_INTERVAL_MS 毫秒读取一次各线程调用栈（sys._current_frames），覆盖整个请求，
+  包括 StreamingResponse / SSE 的流式响应体；事件循环线程总是记录（停在 select 即在等 I/O 或子进程），
+  线程池里只记录正在执行的线程；
+- 采样窗口内同进程的其它请求也会被采到，建议在空闲时复现慢请求；导出 / OCR 子进程内部不可见；
+- 结果写入 PROFILING_DIR：<id>.folded（折叠栈，可直接拖进 speedscope 或 flamegraph.pl）、
+  <id>.txt（自顶向下调用树）与 <id>.json（元数据），只保留最近 PROFILING_MAX_FILES 份；
+- 同一时间只剖析一个请求，其余带标记的请求照常处理并在响应头 X-Profile-Skipped 说明原因。
+未开启时不注册中间件；开启但请求未带标记时只多一次请求头 / 查询串检查。
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 可调参数（环境变量可覆盖）
+ENABLED = os.environ.get("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+PROFILE_DIR = Path(os.environ.get("PROFILING_DIR", str(Path(__file__).resolve().parent / ".profiles")))
+INTERVAL_S = float(os.environ.get("PROFILING_INTERVAL_MS", "5")) / 1000
+MAX_FILES = int(os.environ.get("PROFILING_MAX_FILES", "50"))
+# 单次剖析的采样时长上限，超过后停止采样（请求本身不受影响）
+MAX_DURATION_S = float(os.environ.get("PROFILING_MAX_DURATION_S", "300"))
+MAX_STACK_DEPTH = 128
+# 调用树中占比低于该值的分支折叠，避免输出过长
+TREE_MIN_SHARE = 0.005
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_RE = re.compile(rb"(?:^|&)_profile=(?:1|true)(?:&|$)")
+_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+# 非事件循环线程的栈顶落在这些文件里视为空闲（线程池 worker 在等任务），不计入采样
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+_busy = threading.Lock()
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    parts = filename.replace("\\", "/").rsplit("/", 2)
+    short = "/".join(parts[-2:]) if len(parts) > 1 else filename
+    return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """后台线程定时抓取调用栈，按「线程角色;栈帧...」折叠计数。"""
+
+    def __init__(self, loop_thread_id: int, interval: float = INTERVAL_S):
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._labels: Dict[object, str] = {}
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == own:
+                continue
+            is_loop = tid == self.loop_thread_id
+            if not is_loop and frame.f_code.co_filename.endswith(_IDLE_FILES):
+                continue
+            stack: List[str] = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append("[event loop]" if is_loop else f"[thread {names.get(tid, tid)}]")
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + MAX_DURATION_S
+        while not self._stop.wait(self.interval):
+            if time.monotonic() > deadline:
+                return
+            self._sample()
+
+
+def _call_tree(stacks: Counter, total: int) -> str:
+    """折叠栈 → 自顶向下调用树文本（含总占比），低于 TREE_MIN_SHARE 的分支省略。"""
+    root: dict = {"n": 0, "children": {}}
+    for stack, n in stacks.items():
+        node = root
+        node["n"] += n
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"n": 0, "children": {}})
+            node["n"] += n
+
+    lines: List[str] = []
+
+    def walk(node: dict, depth: int) -> None:
+        children = sorted(node["children"].items(), key=lambda kv: kv[1]["n"], reverse=True)
+        for name, child in children:
+            share = child["n"] / total if total else 0
+            if share < TREE_MIN_SHARE:
+                continue
+            lines.append(f"{'  ' * depth}{share * 100:5.1f}%  {child['n']:>6}  {name}")
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines) + "\n"
+
+
+def _prune() -> None:
+    metas = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.name, reverse=True)
+    for meta in metas[MAX_FILES:]:
+        for suffix in (".json", ".folded", ".txt"):
+            meta.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def save_profile(profile_id: str, sampler: Sampler, meta: dict) -> None:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    total = sum(sampler.stacks.values())
+    folded = "".join(f"{stack} {n}\n" for stack, n in sampler.stacks.most_common())
+    (PROFILE_DIR / f"{profile_id}.folded").write_text(folded, encoding="utf-8")
+    header = (
+        f"# {meta['method']} {meta['path']} → {meta['status']}  {meta['duration_ms']}ms  "
+        f"{meta['samples']} samples @ {meta['interval_ms']}ms\n"
+    )
+    (PROFILE_DIR / f"{profile_id}.txt").write_text(header + _call_tree(sampler.stacks, total), encoding="utf-8")
+    # 元数据最后写：列表接口以 .json 为准，避免列出写了一半的剖析
+    (PROFILE_DIR / f"{profile_id}.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    _prune()
+
+
+def list_profiles() -> List[dict]:
+    if not PROFILE_DIR.is_dir():
+        return []
+    rows = []
+    for meta in sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.name, reverse=True):
+        try:
+            rows.append(json.loads(meta.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return rows
+
+
+def profile_path(profile_id: str, suffix: str) -> Optional[Path]:
+    """校验 id 格式后返回文件路径（防止路径穿越）；不存在时返回 None。"""
+    if not _ID_RE.match(profile_id):
+        return None
+    path = PROFILE_DIR / f"{profile_id}{suffix}"
+    return path if path.is_file() else None
+
+
+def delete_profiles() -> int:
+    n = 0
+    for meta in list(PROFILE_DIR.glob("*.json")) if PROFILE_DIR.is_dir() else []:
+        for suffix in (".json", ".folded", ".txt"):
+            meta.with_suffix(suffix).unlink(missing_ok=True)
+        n += 1
+    return n
+
+
+def _requested(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.strip().lower() in (b"1", b"true")
+    qs = scope.get("query_string") or b""
+    return b"_profile=" in qs and PROFILE_QUERY_RE.search(qs) is not None
+
+
+class ProfilingMiddleware:
+    """纯 ASGI 中间件：带标记的请求在整个 ASGI 调用期间（含流式响应体）采样。"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _busy.acquire(blocking=False):
+            await self.app(scope, receive, _with_header(send, b"x-profile-skipped", b"another request is being profiled"))
+            return
+
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        status = 500
+        started_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        sampler = Sampler(threading.get_ident())
+
+        tagged_send = _with_header(send, b"x-profile-id", profile_id.encode())
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await tagged_send(message)
+
+        t0 = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            duration_ms = round((time.perf_counter() - t0) * 1000, 1)
+            meta = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": (scope.get("query_string") or b"").decode("latin-1"),
+                "status": status,
+                "duration_ms": duration_ms,
+                "samples": sampler.samples,
+                "interval_ms": round(sampler.interval * 1000, 2),
+                "created_at": started_at.isoformat(),
+            }
+            try:
+                save_profile(profile_id, sampler, meta)
+            finally:
+                _busy.release()
+
+
+def _with_header(send: Send, name: bytes, value: bytes) -> Send:
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            message = dict(message)
+            message["headers"] = list(message.get("headers", [])) + [(name, value)]
+        await send(message)
+
+    return wrapped
@@ -0,0 +1,184 @@
+"""
+模型 Provider 健康度：按 Provider 的熔断器 + 每次调用尝试（attempt）记录。
+
+- 熔断：最近 BREAKER_WINDOW_S 秒内至少 BREAKER_MIN_CALLS 次调用、错误率 ≥ BREAKER_ERROR_RATE 时打开，
+  BREAKER_COOLDOWN_S 秒内直接跳过该 Provider；冷却结束后放行一次试探调用（半开），成功即关闭、失败重新打开；
+- 记录：每次尝试（含被熔断跳过、对冲落败被取消的）写入环形缓冲，供 /api/settings/provider-health 与指标使用。
+不依赖具体 SDK，providers.stream_response 负责在调用前后上报。
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+# 可调参数（环境变量可覆盖）
+BREAKER_WINDOW_S = float(os.environ.get("LLM_BREAKER_WINDOW_S", "60"))
+BREAKER_MIN_CALLS = int(os.environ.get("LLM_BREAKER_MIN_CALLS", "4"))
+BREAKER_ERROR_RATE = float(os.environ.get("LLM_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_COOLDOWN_S = float(os.environ.get("LLM_BREAKER_COOLDOWN_S", "30"))
+MAX_ATTEMPT_RECORDS = 500
+
+
+@dataclass
+class AttemptRecord:
+    provider: str
+    model: str
+    started_at: float
+    # ok / error / timeout / cancelled（对冲落败或客户端断开）/ circuit_open / queue_timeout
+    outcome: str = "pending"
+    priority: str = "interactive"
+    queue_ms: Optional[float] = None
+    ttft_ms: Optional[float] = None
+    duration_ms: Optional[float] = None
+    chars: int = 0
+    hedged: bool = False
+    # 半开状态下被放行的试探调用：只有它的结果能关闭或重新打开熔断器
+    probe: bool = False
+    error: Optional[str] = None
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def first_token(self) -> None:
+        if self.ttft_ms is None:
+            self.ttft_ms = round((time.perf_counter() - self._t0) * 1000, 1)
+
+    def finish(self, outcome: str, error: Optional[BaseException] = None) -> None:
+        if self.outcome != "pending":
+            return
+        self.outcome = outcome
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 1)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {str(error)[:200]}"
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        d.pop("_t0", None)
+        return d
+
+
+class CircuitBreaker:
+    def __init__(self) -> None:
+        self._events: Deque[tuple] = deque()  # (时间戳, 是否成功)
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    def _trim(self, now: float) -> None:
+        while self._events and now - self._events[0][0] > BREAKER_WINDOW_S:
+            self._events.popleft()
+
+    def state(self, now: Optional[float] = None) -> str:
+        now = time.time() if now is None else now
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at < BREAKER_COOLDOWN_S:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> Tuple[bool, bool]:
+        """返回 (是否放行, 是否为半开试探)。"""
+        state = self.state()
+        if state == "closed":
+            return True, False
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True, True
+        return False, False
+
+    def release_probe(self) -> None:
+        """试探调用被取消或排队超时、没有给出结论时放回名额，下次调用可重新试探。"""
+        self._probe_in_flight = False
+
+    def record_probe(self, ok: bool) -> None:
+        """半开试探的结果决定关闭还是重新打开。"""
+        self._probe_in_flight = False
+        if self._opened_at is None:
+            return
+        if ok:
+            self._opened_at = None
+            self._events.clear()
+        else:
+            self._opened_at = time.time()
+
+    def record(self, ok: bool) -> None:
+        now = time.time()
+        if self._opened_at is not None:
+            # 熔断打开前就已发出的调用，结果不影响熔断状态
+            return
+        self._events.append((now, ok))
+        self._trim(now)
+        total = len(self._events)
+        errors = sum(1 for _, success in self._events if not success)
+        if total >= BREAKER_MIN_CALLS and errors / total >= BREAKER_ERROR_RATE:
+            self._opened_at = now
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        self._trim(now)
+        total = len(self._events)
+        errors = sum(1 for _, success in self._events if not success)
+        return {
+            "state": self.state(now),
+            "calls": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 3) if total else 0.0,
+            "retry_in_s": round(max(0.0, BREAKER_COOLDOWN_S - (now - self._opened_at)), 1) if self._opened_at else 0.0,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_attempts: Deque[AttemptRecord] = deque(maxlen=MAX_ATTEMPT_RECORDS)
+_lock = threading.Lock()
+
+
+def allow(provider: str) -> Tuple[bool, bool]:
+    """返回 (是否放行, 是否为半开试探)；试探调用需在 start_attempt 时标记 probe=True。"""
+    with _lock:
+        return _breakers.setdefault(provider, CircuitBreaker()).allow()
+
+
+def start_attempt(
+    provider: str, model: str, hedged: bool = False, priority: str = "interactive", probe: bool = False
+) -> AttemptRecord:
+    rec = AttemptRecord(
+        provider=provider, model=model, started_at=time.time(), hedged=hedged, priority=priority, probe=probe
+    )
+    with _lock:
+        _attempts.append(rec)
+    return rec
+
+
+def record_skipped(provider: str, model: str, priority: str = "interactive") -> None:
+    rec = start_attempt(provider, model, priority=priority)
+    rec.finish("circuit_open")
+
+
+def finish_attempt(rec: AttemptRecord, outcome: str, error: Optional[BaseException] = None) -> None:
+    """
+    结束一次尝试并更新熔断器；cancelled / queue_timeout 不是 Provider 本身的问题，不计入错误率。
+    只有标记为 probe 的试探调用才释放试探名额或决定半开后的状态。
+    """
+    rec.finish(outcome, error)
+    inconclusive = outcome in ("cancelled", "queue_timeout")
+    with _lock:
+        breaker = _breakers.setdefault(rec.provider, CircuitBreaker())
+        if rec.probe:
+            if inconclusive:
+                breaker.release_probe()
+            else:
+                breaker.record_probe(outcome == "ok")
+        elif not inconclusive:
+            breaker.record(outcome == "ok")
+
+
+def recent_attempts(limit: int = 100) -> List[dict]:
+    with _lock:
+        items = list(_attempts)[-limit:]
+    return [r.to_dict() for r in reversed(items)]
+
+
+def breaker_states() -> Dict[str, dict]:
+    with _lock:
+        return {p: b.snapshot() for p, b in _breakers.items()}
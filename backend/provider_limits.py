@@ -0,0 +1,227 @@
+"""
+模型 Provider 调度：按 Provider 限制并发数，以及每分钟请求数（rpm）/ token 数（tpm）令牌桶。
+
+- 优先级：interactive（对话、模拟面试轮次）永远先于 background（题库生成、复盘报告、评分卡等）出队，
+  且 background 最多占用 max_in_flight - INTERACTIVE_RESERVED_SLOTS 个并发，给交互请求留出余量；
+- token 预估：输入按字符数折算 + 固定输出预留，调用结束后按实际输出修正令牌桶；
+- 排队超过 QUEUE_TIMEOUT_S 抛出 ProviderQueueTimeout（不计入熔断错误率），由上层转下一个备用模型。
+限额默认取环境变量，ai_settings.json 的 rate_limits 可按 Provider 覆盖：
+{"qwen": {"max_in_flight": 4, "rpm": 60, "tpm": 100000}}，rpm / tpm 为 0 表示不限。
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+# 可调参数（环境变量可覆盖）
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", "4"))
+DEFAULT_RPM = int(os.environ.get("LLM_RPM", "0"))
+DEFAULT_TPM = int(os.environ.get("LLM_TPM", "0"))
+INTERACTIVE_RESERVED_SLOTS = int(os.environ.get("LLM_INTERACTIVE_RESERVED_SLOTS", "1"))
+QUEUE_TIMEOUT_S = float(os.environ.get("LLM_QUEUE_TIMEOUT_S", "120"))
+# 每次调用为输出预留的 token 数（结束后按实际输出修正）
+OUTPUT_TOKEN_RESERVE = int(os.environ.get("LLM_OUTPUT_TOKEN_RESERVE", "1024"))
+# 字符 → token 折算：中文约 1~1.5 字/token、英文约 4 字符/token，取偏保守的 2
+CHARS_PER_TOKEN = 2
+# 统计最近多少次排队耗时
+WAIT_SAMPLES = 200
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+_PRIORITY_RANK = {INTERACTIVE: 0, BACKGROUND: 1}
+
+
+class ProviderQueueTimeout(Exception):
+    pass
+
+
+def estimate_tokens(system: str, messages: list) -> int:
+    chars = len(system or "")
+    for m in messages:
+        content = m.get("content", "")
+        chars += len(content) if isinstance(content, str) else len(str(content))
+    return chars // CHARS_PER_TOKEN + OUTPUT_TOKEN_RESERVE
+
+
+class _Bucket:
+    """每分钟额度的令牌桶；per_minute <= 0 表示不限。允许透支（按实际用量修正后为负）。"""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = 0
+        self.tokens = 0.0
+        self._ts = time.monotonic()
+        self.configure(per_minute)
+
+    def configure(self, per_minute: int) -> None:
+        per_minute = max(0, int(per_minute or 0))
+        if per_minute != self.per_minute:
+            self.per_minute = per_minute
+            self.tokens = float(per_minute)
+            self._ts = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(float(self.per_minute), self.tokens + (now - self._ts) * self.per_minute / 60)
+        self._ts = now
+
+    def wait_time(self, amount: float) -> float:
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill()
+        # 单次需求超过桶容量时按满桶计，避免永远等不到
+        amount = min(amount, self.per_minute)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60 / self.per_minute
+
+    def take(self, amount: float) -> None:
+        if self.per_minute > 0:
+            self._refill()
+            self.tokens -= min(amount, self.per_minute)
+
+    def adjust(self, delta: float) -> None:
+        if self.per_minute > 0:
+            self.tokens = min(float(self.per_minute), self.tokens - delta)
+
+
+class Permit(NamedTuple):
+    provider: str
+    priority: str
+    tokens: int
+    wait_ms: float
+
+
+class _Waiter:
+    __slots__ = ("rank", "seq", "tokens", "future", "enqueued")
+
+    def __init__(self, rank: int, seq: int, tokens: int, future: asyncio.Future):
+        self.rank = rank
+        self.seq = seq
+        self.tokens = tokens
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+
+class ProviderLimiter:
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.max_in_flight = DEFAULT_MAX_IN_FLIGHT
+        self.rpm = _Bucket(DEFAULT_RPM)
+        self.tpm = _Bucket(DEFAULT_TPM)
+        self.in_flight = 0
+        self._heap: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=WAIT_SAMPLES) for p in _PRIORITY_RANK}
+
+    def configure(self, max_in_flight: int, rpm: int, tpm: int) -> None:
+        self.max_in_flight = max(1, int(max_in_flight or 1))
+        self.rpm.configure(rpm)
+        self.tpm.configure(tpm)
+
+    def _slot_limit(self, rank: int) -> int:
+        if rank == 0:
+            return self.max_in_flight
+        return max(1, self.max_in_flight - INTERACTIVE_RESERVED_SLOTS)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._heap:
+            waiter = self._heap[0]
+            if waiter.future.done():
+                heapq.heappop(self._heap)
+                continue
+            # 严格优先级：队首拿不到就整体等待，background 不会插到 interactive 前面
+            if self.in_flight >= self._slot_limit(waiter.rank):
+                return
+            wait = max(self.rpm.wait_time(1), self.tpm.wait_time(waiter.tokens))
+            if wait > 0:
+                self._timer = waiter.future.get_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._heap)
+            self.rpm.take(1)
+            self.tpm.take(waiter.tokens)
+            self.in_flight += 1
+            waiter.future.set_result(None)
+
+    async def acquire(self, priority: str, tokens: int, timeout: float = QUEUE_TIMEOUT_S) -> Permit:
+        rank = _PRIORITY_RANK.get(priority, 1)
+        waiter = _Waiter(rank, next(self._seq), tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, waiter)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已分配到名额但调用方放弃了，归还
+                self.in_flight -= 1
+            else:
+                waiter.future.cancel()
+            self._dispatch()
+            if isinstance(e, asyncio.TimeoutError):
+                raise ProviderQueueTimeout(f"{self.provider} 排队超过 {timeout:g} 秒") from None
+            raise
+        wait_ms = (time.perf_counter() - waiter.enqueued) * 1000
+        self._waits[priority if priority in self._waits else BACKGROUND].append(wait_ms)
+        return Permit(self.provider, priority, tokens, round(wait_ms, 1))
+
+    def release(self, permit: Permit, actual_tokens: Optional[int] = None) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        if actual_tokens is not None:
+            self.tpm.adjust(actual_tokens - permit.tokens)
+        self._dispatch()
+
+    def snapshot(self) -> dict:
+        queued = {p: 0 for p in _PRIORITY_RANK}
+        names = {rank: p for p, rank in _PRIORITY_RANK.items()}
+        for w in self._heap:
+            if not w.future.done():
+                queued[names[w.rank]] += 1
+        waits = {}
+        for p, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[p] = {
+                "samples": len(ordered),
+                "avg_ms": round(sum(ordered) / len(ordered), 1) if ordered else 0.0,
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1) if ordered else 0.0,
+                "max_ms": round(ordered[-1], 1) if ordered else 0.0,
+            }
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "rpm": self.rpm.per_minute,
+            "tpm": self.tpm.per_minute,
+            "queued": queued,
+            "wait": waits,
+        }
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def limiter_for(provider: str, settings: Optional[dict] = None) -> ProviderLimiter:
+    """取（必要时创建）Provider 的限流器，并按当前设置刷新限额。"""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        limiter = _limiters[provider] = ProviderLimiter(provider)
+    conf = ((settings or {}).get("rate_limits") or {}).get(provider) or {}
+    limiter.configure(
+        conf.get("max_in_flight", DEFAULT_MAX_IN_FLIGHT),
+        conf.get("rpm", DEFAULT_RPM),
+        conf.get("tpm", DEFAULT_TPM),
+    )
+    return limiter
+
+
+def queue_states() -> Dict[str, dict]:
+    return {p: limiter.snapshot() for p, limiter in _limiters.items()}
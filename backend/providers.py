@@ -1,14 +1,30 @@
 """
 Multi-provider AI abstraction layer.
 Supports Anthropic Claude, Qwen, Zhipu GLM, DeepSeek, Moonshot (Kimi), Baidu ERNIE.
+
+Failover: settings["fallback_chain"] lists backup provider/model pairs tried in order
+when the primary fails before its first token; per-provider circuit breakers skip
+providers with a high recent error rate (see provider_health.py). Optional hedging
+(settings["hedge_after_ms"]) starts the next provider when the first token is late
+and keeps whichever answers first. Every call is scheduled through provider_limits.py
+(per-provider concurrency, rpm/tpm token buckets, interactive-before-background priority).
+
+The anthropic / openai SDKs are imported on first use (see _anthropic_client /
+_openai_client) so that importing this module does not pay for them at startup.
 """
+import asyncio
 import json
 import os
 import re
 from pathlib import Path
-from typing import AsyncGenerator, Dict, Optional, Tuple
-import anthropic
-from openai import AsyncOpenAI
+from typing import AsyncGenerator, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import llm_cache
+import llm_usage
+import mock_llm
+import provider_health
+import provider_limits
+import telemetry
 
 # .env 与 AI 模型设置双向同步
 ENV_FILE = Path(__file__).resolve().parent / ".env"
@@ -51,6 +67,8 @@ PROVIDERS: dict = {
         "type": "openai_compat",
         "base_url": "https://open.bigmodel.cn/api/paas/v4",
         "env_key": "ZHIPU_API_KEY",
+        # 不识别 stream_options；最后一个 chunk 自带 usage
+        "stream_usage": False,
         "models": [
             {"id": "glm-4-plus",  "name": "GLM-4-Plus (旗舰)"},
             {"id": "glm-4",       "name": "GLM-4"},
@@ -101,6 +119,10 @@ PROVIDERS: dict = {
     },
 }
 
+# 本地压测用的 Mock Provider，仅在 LLM_MOCK_ENABLED=1 时出现
+if mock_llm.ENABLED:
+    PROVIDERS["mock"] = mock_llm.PROVIDER_ENTRY
+
 # Path for persisted settings
 SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "ai_settings.json")
 
@@ -108,8 +130,19 @@ _DEFAULT_SETTINGS = {
     "provider": "anthropic",
     "model": "claude-opus-4-6",
     "api_keys": {k: "" for k in PROVIDERS},
+    # 备用模型链：[{"provider": "deepseek", "model": "deepseek-chat"}, ...]，按顺序故障转移
+    "fallback_chain": [],
+    # 对冲阈值（毫秒）：首个 token 超过该时间未到达即并行启动下一个候选；0 表示关闭
+    "hedge_after_ms": 0,
+    # 按 Provider 覆盖调度限额：{"qwen": {"max_in_flight": 4, "rpm": 60, "tpm": 100000}}
+    "rate_limits": {},
+    # 用量费用统计的单价（每百万 token）：{"qwen-plus": {"input": 0.8, "cached_input": 0.2, "output": 2}}
+    "prices": {},
 }
 
+# 首个 token 超时：视为该 Provider 失败，转下一个候选（环境变量可覆盖）
+FIRST_TOKEN_TIMEOUT_S = float(os.environ.get("LLM_FIRST_TOKEN_TIMEOUT_S", "90"))
+
 
 # ──────────────────────────────────────────────
 #  Settings I/O
@@ -136,6 +169,8 @@ def save_settings(settings: dict) -> None:
 
 def get_api_key(provider: str, settings: dict) -> str:
     """Return API key: first from settings file, then from env var."""
+    if PROVIDERS.get(provider, {}).get("type") == "mock":
+        return "mock"
     key_from_settings = settings.get("api_keys", {}).get(provider, "")
     if key_from_settings:
         return key_from_settings
@@ -182,13 +217,26 @@ def sync_env_file(updates: Dict[str, str]) -> None:
 # ──────────────────────────────────────────────
 #  Streaming generators
 # ──────────────────────────────────────────────
+def _anthropic_client(api_key: str):
+    from anthropic import AsyncAnthropic
+
+    return AsyncAnthropic(api_key=api_key)
+
+
+def _openai_client(base_url: str, api_key: str):
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(base_url=base_url, api_key=api_key)
+
+
 async def _stream_anthropic(
     api_key: str,
     model: str,
     system: str,
     messages: list,
+    usage: Optional[dict] = None,
 ) -> AsyncGenerator[str, None]:
-    client = anthropic.AsyncAnthropic(api_key=api_key)
+    client = _anthropic_client(api_key)
 
     # Adaptive thinking only on Opus models
     extra: dict = {}
@@ -204,6 +252,9 @@ async def _stream_anthropic(
     ) as stream:
         async for text in stream.text_stream:
             yield text
+        if usage is not None:
+            final = await stream.get_final_message()
+            usage.update(llm_usage.usage_from_anthropic(final.usage))
 
 
 async def _stream_openai_compat(
@@ -212,19 +263,30 @@ async def _stream_openai_compat(
     model: str,
     system: str,
     messages: list,
+    usage: Optional[dict] = None,
+    include_usage: bool = True,
 ) -> AsyncGenerator[str, None]:
-    client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+    client = _openai_client(base_url, api_key)
 
     openai_messages = [{"role": "system", "content": system}] + messages
 
+    extra: dict = {}
+    if include_usage:
+        # 流结束时多返回一个 choices 为空、只带 usage 的 chunk
+        extra["stream_options"] = {"include_usage": True}
     stream = await client.chat.completions.create(
         model=model,
         messages=openai_messages,
         stream=True,
         max_tokens=8192,
+        **extra,
     )
 
     async for chunk in stream:
+        if usage is not None and getattr(chunk, "usage", None):
+            usage.update(llm_usage.usage_from_openai(chunk.usage))
+        if not chunk.choices:
+            continue
         delta = chunk.choices[0].delta
         if delta.content:
             yield delta.content
@@ -248,10 +310,12 @@ async def test_connection(
     pconfig = PROVIDERS.get(provider)
     if not pconfig:
         return False, f"不支持的 Provider: {provider}"
+    if pconfig["type"] == "mock":
+        return True, "连接成功（Mock）"
 
     try:
         if pconfig["type"] == "anthropic":
-            client = anthropic.AsyncAnthropic(api_key=api_key)
+            client = _anthropic_client(api_key)
             async with client.messages.stream(
                 model=model,
                 max_tokens=10,
@@ -260,7 +324,7 @@ async def test_connection(
                 async for _ in stream.text_stream:
                     break
         else:
-            client = AsyncOpenAI(base_url=pconfig["base_url"], api_key=api_key)
+            client = _openai_client(pconfig["base_url"], api_key)
             stream = await client.chat.completions.create(
                 model=model,
                 messages=[{"role": "user", "content": "Hi"}],
@@ -280,38 +344,280 @@ async def test_connection(
         return False, f"连接失败: {err_msg[:100]}"
 
 
-async def complete_response(system: str, messages: list) -> str:
-    """非流式：聚合整段回复（用于面试复盘报告等）。"""
-    parts: list[str] = []
-    async for text in stream_response(system, messages):
-        parts.append(text)
-    return "".join(parts)
+async def complete_response(
+    system: str,
+    messages: list,
+    priority: str = provider_limits.BACKGROUND,
+    use_cache: bool = True,
+    prompt_version: str = "",
+    validate: Optional[Callable[[str], bool]] = None,
+    tags: Optional[llm_usage.UsageTags] = None,
+) -> str:
+    """
+    非流式：聚合整段回复（用于面试复盘报告等）；默认按后台任务排队。
+    开启 LLM_CACHE_ENABLED 时按 (provider, model, system, messages, prompt_version) 缓存，
+    use_cache=False 跳过缓存；validate 返回 False 的结果不写入缓存。
+    """
+    async def call() -> str:
+        parts: list[str] = []
+        async for text in stream_response(system, messages, priority, tags):
+            parts.append(text)
+        return "".join(parts)
+
+    if not (use_cache and llm_cache.ENABLED):
+        return await call()
+    settings = load_settings()
+    chain, _ = resolve_chain(settings)
+    if not chain:
+        # 未配置 Key 等提示语不进缓存
+        return await call()
+    primary = chain[0]
+    key = llm_cache.make_key(primary.provider, primary.model, system, messages, prompt_version)
+    return await llm_cache.cached_call(key, primary.provider, primary.model, prompt_version, call, validate)
+
+
+class _Target(NamedTuple):
+    provider: str
+    model: str
+    api_key: str
+
+
+def resolve_chain(settings: dict) -> Tuple[List[_Target], Optional[str]]:
+    """
+    主模型 + fallback_chain，去重并跳过未配置 Key / 不支持的 Provider。
+    返回 (候选列表, 主模型不可用时给用户的提示)。
+    """
+    entries = [{"provider": settings.get("provider", "anthropic"),
+                "model": settings.get("model", PROVIDERS["anthropic"]["default_model"])}]
+    entries += [e for e in settings.get("fallback_chain") or [] if isinstance(e, dict)]
+    chain: List[_Target] = []
+    seen = set()
+    warning = None
+    for i, entry in enumerate(entries):
+        provider = entry.get("provider", "")
+        pconfig = PROVIDERS.get(provider)
+        model = entry.get("model") or (pconfig or {}).get("default_model", "")
+        if (provider, model) in seen:
+            continue
+        seen.add((provider, model))
+        if not pconfig:
+            if i == 0:
+                warning = f"⚠️ 不支持的 Provider: {provider}"
+            continue
+        api_key = get_api_key(provider, settings)
+        if not api_key:
+            if i == 0:
+                warning = "⚠️ 未配置当前所选模型的 API Key，请点击左下角「模型」或右上角设置按钮填写。"
+            continue
+        chain.append(_Target(provider, model, api_key))
+    return chain, warning
+
+
+def _open_stream(
+    target: _Target, system: str, messages: list, usage: dict, settings: dict
+) -> AsyncGenerator[str, None]:
+    pconfig = PROVIDERS[target.provider]
+    if pconfig["type"] == "mock":
+        return mock_llm.stream_mock(target.model, system, messages, mock_llm.mock_config(settings), usage)
+    if pconfig["type"] == "anthropic":
+        return _stream_anthropic(target.api_key, target.model, system, messages, usage)
+    return _stream_openai_compat(
+        pconfig["base_url"], target.api_key, target.model, system, messages,
+        usage, pconfig.get("stream_usage", True),
+    )
+
+
+class _Attempt:
+    """
+    一次对某个候选的调用：后台任务先在该 Provider 的调度队列排队，拿到名额后等待首个非空片段，
+    其余片段由胜出方继续读取。排队时间不计入首 token 超时。
+    """
+
+    def __init__(self, target: _Target, system: str, messages: list, settings: dict,
+                 priority: str, tags: llm_usage.UsageTags, hedged: bool = False, probe: bool = False):
+        self.target = target
+        self.tags = tags
+        self.usage: dict = {}
+        self.agen = _open_stream(target, system, messages, self.usage, settings)
+        self.record = provider_health.start_attempt(target.provider, target.model, hedged, priority, probe)
+        self.limiter = provider_limits.limiter_for(target.provider, settings)
+        self.priority = priority
+        self.tokens = provider_limits.estimate_tokens(system, messages)
+        self.permit: Optional[provider_limits.Permit] = None
+        self.first = asyncio.ensure_future(self._start())
+
+    async def _start(self) -> Optional[str]:
+        self.permit = await self.limiter.acquire(self.priority, self.tokens)
+        self.record.queue_ms = self.permit.wait_ms
+        return await asyncio.wait_for(self._first_chunk(), FIRST_TOKEN_TIMEOUT_S)
+
+    async def _first_chunk(self) -> Optional[str]:
+        while True:
+            try:
+                text = await self.agen.__anext__()
+            except StopAsyncIteration:
+                return None
+            if text:
+                self.record.first_token()
+                return text
+
+    def finish(self, outcome: str, error: Optional[BaseException] = None) -> None:
+        provider_health.finish_attempt(self.record, outcome, error)
+        estimated = self.usage.get("input_tokens") is None or self.usage.get("output_tokens") is None
+        input_tokens = self.usage.get("input_tokens")
+        if input_tokens is None:
+            input_tokens = self.tokens - provider_limits.OUTPUT_TOKEN_RESERVE
+        output_tokens = self.usage.get("output_tokens")
+        if output_tokens is None:
+            output_tokens = self.record.chars // provider_limits.CHARS_PER_TOKEN
+        if self.permit is not None:
+            self.limiter.release(self.permit, input_tokens + output_tokens)
+            self.permit = None
+        telemetry.observe_llm_attempt(
+            self.target.provider, self.record.outcome, self.record.ttft_ms, self.record.duration_ms, output_tokens
+        )
+        if self.record.queue_ms is None:
+            # 排队阶段就被取消/超时，没有真正请求上游
+            return
+        llm_usage.usage_writer.record({
+            "feature": self.tags.feature,
+            "provider": self.target.provider,
+            "model": self.target.model,
+            "job_id": self.tags.job_id,
+            "resume_id": self.tags.resume_id,
+            "priority": self.priority,
+            "outcome": self.record.outcome,
+            "hedged": int(self.record.hedged),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached_tokens": self.usage.get("cached_tokens") or 0,
+            "estimated": int(estimated),
+            "ttft_ms": self.record.ttft_ms,
+            "duration_ms": self.record.duration_ms,
+            "queue_ms": self.record.queue_ms,
+        })
+
+    async def abort(self, outcome: str, error: Optional[BaseException] = None) -> None:
+        if not self.first.done():
+            self.first.cancel()
+        await asyncio.gather(self.first, return_exceptions=True)
+        try:
+            await self.agen.aclose()
+        except Exception:
+            pass
+        self.finish(outcome, error)
+
+
+def _failure_outcome(exc: BaseException) -> str:
+    if isinstance(exc, provider_limits.ProviderQueueTimeout):
+        return "queue_timeout"
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    return "error"
+
+
+async def _acquire_first_token(
+    chain: List[_Target], system: str, messages: list, settings: dict, priority: str,
+    tags: llm_usage.UsageTags,
+) -> Tuple[Optional[_Attempt], Optional[str], Optional[BaseException]]:
+    """
+    按顺序（或对冲）启动候选，直到某个候选吐出首个片段。
+    返回 (胜出的调用, 首个片段, 最后一个错误)；全部失败时胜出者为 None。
+    """
+    pending = list(chain)
+    running: Dict[asyncio.Future, _Attempt] = {}
+    last_error: Optional[BaseException] = None
+    hedge_after_ms = int(settings.get("hedge_after_ms") or 0)
+    hedge_s = hedge_after_ms / 1000 if hedge_after_ms > 0 else None
+
+    def launch(hedged: bool = False) -> bool:
+        while pending:
+            target = pending.pop(0)
+            allowed, probe = provider_health.allow(target.provider)
+            if not allowed:
+                provider_health.record_skipped(target.provider, target.model, priority)
+                continue
+            attempt = _Attempt(target, system, messages, settings, priority, tags, hedged, probe)
+            running[attempt.first] = attempt
+            return True
+        return False
+
+    launch()
+    try:
+        while running:
+            timeout = hedge_s if hedge_s and len(running) == 1 and pending else None
+            done, _ = await asyncio.wait(running.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # 首 token 迟迟未到：并行启动下一个候选，谁先到用谁
+                launch(hedged=True)
+                continue
+            winner: Optional[_Attempt] = None
+            for fut in done:
+                attempt = running.pop(fut)
+                exc = fut.exception()
+                if exc is None and winner is None:
+                    winner = attempt
+                elif exc is None:
+                    await attempt.abort("cancelled")
+                else:
+                    await attempt.abort(_failure_outcome(exc), exc)
+                    last_error = exc
+            if winner is not None:
+                for attempt in list(running.values()):
+                    await attempt.abort("cancelled")
+                running.clear()
+                return winner, winner.first.result(), None
+            if not running:
+                launch()
+    finally:
+        # 客户端断开等情况下，收尾仍在等待首 token 的调用
+        for attempt in list(running.values()):
+            await attempt.abort("cancelled")
+    return None, None, last_error
 
 
 async def stream_response(
     system: str,
     messages: list,
+    priority: str = provider_limits.INTERACTIVE,
+    tags: Optional[llm_usage.UsageTags] = None,
 ) -> AsyncGenerator[str, None]:
-    """Load current settings and stream using the configured provider/model."""
+    """
+    Load current settings and stream from the first healthy provider in the failover chain.
+    priority: provider_limits.INTERACTIVE（对话、模拟面试轮次）或 BACKGROUND（报告、题库、评分卡等）。
+    tags: 用量记录标签（功能 / 岗位 / 简历），见 llm_usage。
+    """
     settings = load_settings()
-    provider = settings.get("provider", "anthropic")
-    model = settings.get("model", PROVIDERS["anthropic"]["default_model"])
-    api_key = get_api_key(provider, settings)
-
-    if not api_key:
-        yield "⚠️ 未配置当前所选模型的 API Key，请点击左下角「模型」或右上角设置按钮填写。"
+    chain, warning = resolve_chain(settings)
+    if not chain:
+        yield warning or "⚠️ 未配置当前所选模型的 API Key，请点击左下角「模型」或右上角设置按钮填写。"
         return
 
-    pconfig = PROVIDERS.get(provider)
-    if not pconfig:
-        yield f"⚠️ 不支持的 Provider: {provider}"
-        return
+    attempt, first, last_error = await _acquire_first_token(
+        chain, system, messages, settings, priority, tags or llm_usage.UsageTags()
+    )
+    if attempt is None:
+        if last_error is not None:
+            raise last_error
+        raise RuntimeError("所选模型及备用模型均已熔断，请稍后再试")
 
-    if pconfig["type"] == "anthropic":
-        async for text in _stream_anthropic(api_key, model, system, messages):
-            yield text
-    else:
-        async for text in _stream_openai_compat(
-            pconfig["base_url"], api_key, model, system, messages
-        ):
-            yield text
+    record = attempt.record
+    try:
+        if first is not None:
+            record.chars += len(first)
+            yield first
+            # 首 token 之后的失败无法无缝切换（已输出部分内容），直接向上抛出
+            async for text in attempt.agen:
+                record.chars += len(text)
+                yield text
+    except Exception as e:
+        attempt.finish("error", e)
+        raise
+    except BaseException:
+        attempt.finish("cancelled")
+        try:
+            await attempt.agen.aclose()
+        except Exception:
+            pass
+        raise
+    attempt.finish("ok")
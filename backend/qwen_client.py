@@ -1,9 +1,10 @@
 """
 通义千问（DashScope OpenAI 兼容模式）非流式单次对话，供简历解析等场景使用。
 """
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 
-from openai import OpenAI
+import llm_usage
 
 DASHSCOPE_COMPAT_BASE = "https://dashscope.aliyuncs.com/compatible-mode/v1"
 
@@ -15,21 +16,53 @@ def qwen_chat_completion(
     *,
     max_tokens: int = 8192,
     timeout: float = 120.0,
+    tags: Optional[llm_usage.UsageTags] = None,
 ) -> str:
     """
     同步调用 chat.completions，返回 assistant 文本。
     messages 可为多模态（含 image_url + text）。
+    传入 tags 时记录用量（非流式调用，首 token 时间即总耗时）。
     """
+    # 按需导入：只有简历背景解析会走到这里，API 进程启动时不必加载 openai SDK
+    from openai import OpenAI
+
     client = OpenAI(
         base_url=DASHSCOPE_COMPAT_BASE,
         api_key=api_key,
         timeout=timeout,
     )
-    resp = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        stream=False,
-        max_tokens=max_tokens,
-    )
+    t0 = time.perf_counter()
+    outcome = "error"
+    usage: Dict[str, Any] = {}
+    try:
+        resp = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=False,
+            max_tokens=max_tokens,
+        )
+        if resp.usage is not None:
+            usage = llm_usage.usage_from_openai(resp.usage)
+        outcome = "ok"
+    finally:
+        if tags is not None:
+            ms = round((time.perf_counter() - t0) * 1000, 1)
+            llm_usage.usage_writer.record({
+                "feature": tags.feature,
+                "provider": "qwen",
+                "model": model,
+                "job_id": tags.job_id,
+                "resume_id": tags.resume_id,
+                "priority": "interactive",
+                "outcome": outcome,
+                "hedged": 0,
+                "input_tokens": usage.get("input_tokens") or 0,
+                "output_tokens": usage.get("output_tokens") or 0,
+                "cached_tokens": usage.get("cached_tokens") or 0,
+                "estimated": int(not usage),
+                "ttft_ms": ms,
+                "duration_ms": ms,
+                "queue_ms": 0.0,
+            })
     choice = resp.choices[0].message
     return (choice.content or "").strip()
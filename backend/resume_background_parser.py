@@ -1,22 +1,23 @@
 """
-简历 PDF →「我的背景」用 Markdown：pypdf 抽字 + 通义文本模型整理；
-文本过少时 PyMuPDF 渲染页面 + 通义 VL 多模态识别。
+简历 PDF →「我的背景」用 Markdown：逐页抽字（pdf_text）+ 通义文本模型整理；
+文本过少时把扫描页渲染成图片、连同其余页已抽到的文字一起交给通义 VL 多模态识别。
 """
 import base64
-import io
-from typing import Optional, Tuple
+from typing import BinaryIO, List, Optional, Tuple
 
 from fastapi import HTTPException
 
+from llm_usage import UsageTags
+from pdf_text import extract_pdf_text, render_pages_png
 from providers import load_settings, get_api_key
 from qwen_client import qwen_chat_completion
 
 # 可调参数
-MAX_PDF_BYTES = 10 * 1024 * 1024  # 10MB
 MIN_TEXT_CHARS_FOR_LLM = 200  # 少于此认为需走 VL（扫描件等）
 MAX_VL_PAGES = 5
 QWEN_TEXT_MODEL = "qwen-long"  # 长简历；可改为 qwen-plus
 QWEN_VL_MODEL = "qwen-vl-plus"  # 多模态；DashScope 兼容模式可替换为 qwen2.5-vl 系列
+_USAGE_TAGS = UsageTags("resume_parse")
 
 # 与产品约定的「纯文本 + 段落分层」展示格式（emoji 大节 + 字段行 + • 列表）
 BACKGROUND_FORMAT_SPEC = """输出格式要求（必须严格遵守）：
@@ -42,31 +43,9 @@ SYSTEM_VL = f"""你是简历识别助手。用户会提供简历页面截图，
 信息不足处如实简略，不要编造。只输出正文。"""
 
 
-def _pypdf_extract(pdf_bytes: bytes) -> str:
-    from pypdf import PdfReader
-
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    parts = []
-    for page in reader.pages:
-        parts.append(page.extract_text() or "")
-    return "\n".join(parts).strip()
-
-
-def _pdf_pages_png_base64(pdf_bytes: bytes, max_pages: int) -> list:
-    import fitz  # PyMuPDF
-
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    try:
-        n = min(len(doc), max_pages)
-        out = []
-        for i in range(n):
-            page = doc.load_page(i)
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x 缩放提高清晰度
-            png_bytes = pix.tobytes("png")
-            out.append(base64.b64encode(png_bytes).decode("ascii"))
-        return out
-    finally:
-        doc.close()
+def _pdf_pages_png_base64(pdf_file: BinaryIO, pages: List[int]) -> list:
+    """pages：需要读图的页码（1 起），2x 缩放提高清晰度。"""
+    return [base64.b64encode(png).decode("ascii") for png in render_pages_png(pdf_file, pages)]
 
 
 def _messages_text_path(raw_text: str) -> list:
@@ -76,7 +55,8 @@ def _messages_text_path(raw_text: str) -> list:
     ]
 
 
-def _messages_vl_path(images_b64: list) -> list:
+def _messages_vl_path(images_b64: list, raw_text: str = "") -> list:
+    """raw_text：非扫描页已抽到的文字，与扫描页图片一起给模型，避免文字页内容丢失。"""
     parts = []
     for b64 in images_b64:
         parts.append(
@@ -85,23 +65,28 @@ def _messages_vl_path(images_b64: list) -> list:
                 "image_url": {"url": f"data:image/png;base64,{b64}"},
             }
         )
+    if raw_text.strip():
+        parts.append(
+            {
+                "type": "text",
+                "text": f"以下是简历中其余页面已抽取的文字：\n\n---\n\n{raw_text[:120000]}\n\n---",
+            }
+        )
     parts.append(
         {
             "type": "text",
-            "text": "请根据以上简历页面图片，按系统说明中的「纯文本 + emoji 大节」格式输出候选人背景信息正文。",
+            "text": "请根据以上简历页面图片与文字，按系统说明中的「纯文本 + emoji 大节」格式输出候选人背景信息正文。",
         }
     )
     return [{"role": "system", "content": SYSTEM_VL}, {"role": "user", "content": parts}]
 
 
-def parse_resume_pdf_to_background(pdf_bytes: bytes) -> Tuple[str, str, Optional[str]]:
+def parse_resume_pdf_to_background(pdf_file: BinaryIO) -> Tuple[str, str, Optional[str]]:
     """
+    pdf_file：已通过大小校验的上传文件对象（见 upload_limits.open_upload）。
     返回 (整理后的 Markdown 正文, parser 标记, 可选 warning)。
     需要通义 API Key；未配置则抛 HTTPException。
     """
-    if len(pdf_bytes) > MAX_PDF_BYTES:
-        raise HTTPException(status_code=400, detail=f"PDF 文件过大，请小于 {MAX_PDF_BYTES // (1024 * 1024)}MB")
-
     settings = load_settings()
     api_key = get_api_key("qwen", settings)
     if not api_key.strip():
@@ -110,31 +95,42 @@ def parse_resume_pdf_to_background(pdf_bytes: bytes) -> Tuple[str, str, Optional
             detail="未配置通义千问 API Key：请在「模型设置」中填写通义千问 Key，或使用环境变量 DASHSCOPE_API_KEY",
         )
 
-    raw = _pypdf_extract(pdf_bytes)
+    extracted = extract_pdf_text(pdf_file)
+    raw = extracted.text
+    scanned = extracted.scanned_pages
     warning: Optional[str] = None
 
     if len(raw) >= MIN_TEXT_CHARS_FOR_LLM:
+        if scanned:
+            pages = "、".join(str(p) for p in scanned)
+            warning = f"第 {pages} 页为扫描页，未能抽取文字，整理结果可能缺少这些页的内容。"
         messages = _messages_text_path(raw)
         try:
-            out = qwen_chat_completion(api_key, QWEN_TEXT_MODEL, messages, max_tokens=8192, timeout=180.0)
+            out = qwen_chat_completion(
+                api_key, QWEN_TEXT_MODEL, messages, max_tokens=8192, timeout=180.0, tags=_USAGE_TAGS
+            )
         except Exception as e:
             raise HTTPException(status_code=502, detail=f"通义模型整理简历失败: {str(e)[:300]}") from e
         if not out.strip():
             raise HTTPException(status_code=502, detail="通义模型返回空内容，请重试或更换模型")
-        return out, "pypdf+qwen_text", warning
+        return out, f"{extracted.engine}+qwen_text", warning
 
-    # 文本过少：多模态读图
+    # 文本过少：多模态读图，只送扫描页（逐页判断），文字页的内容以文本随图片一起发送
+    vl_pages = (scanned or [p.page for p in extracted.pages])[:MAX_VL_PAGES]
+    page_text = "\n\n".join(p.text for p in extracted.pages if p.page not in vl_pages and p.text)
     try:
-        images_b64 = _pdf_pages_png_base64(pdf_bytes, MAX_VL_PAGES)
+        images_b64 = _pdf_pages_png_base64(pdf_file, vl_pages)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"PDF 转图失败: {str(e)[:200]}") from e
 
     if not images_b64:
         raise HTTPException(status_code=400, detail="PDF 无可用页面")
 
-    messages = _messages_vl_path(images_b64)
+    messages = _messages_vl_path(images_b64, page_text)
     try:
-        out = qwen_chat_completion(api_key, QWEN_VL_MODEL, messages, max_tokens=8192, timeout=180.0)
+        out = qwen_chat_completion(
+            api_key, QWEN_VL_MODEL, messages, max_tokens=8192, timeout=180.0, tags=_USAGE_TAGS
+        )
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"通义多模态识别简历失败: {str(e)[:300]}") from e
 
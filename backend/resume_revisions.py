@@ -0,0 +1,228 @@
+"""
+简历修订历史：快照 + 压缩差异存储。
+
+- 每份简历的修订号从 1 递增；每 SNAPSHOT_EVERY 版存一份 zlib 压缩的全文快照，其余版本只存相对上一版的
+  行级差异（复制区间 / 新增行），同样 zlib 压缩；差异压缩后不比快照小一半时直接存快照；
+- 取出任意版本：找到不晚于它的最近快照，依次应用之后的差异，最多 SNAPSHOT_EVERY - 1 次；
+- 列表只查元数据列，不读 data；
+- 清理：保留最近 KEEP 版（0 不限）并删除超过 MAX_AGE_DAYS 天的（0 不限），最新一版始终保留；
+  被保留的最早一版若是差异，先改写为快照，保证链条完整。
+"""
+from __future__ import annotations
+
+import difflib
+import hashlib
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import orjson
+from sqlalchemy import func
+from sqlalchemy.orm import Session, defer
+
+import models
+
+# 可调参数（环境变量可覆盖）
+SNAPSHOT_EVERY = max(1, int(os.environ.get("RESUME_REVISION_SNAPSHOT_EVERY", "10")))
+KEEP = int(os.environ.get("RESUME_REVISION_KEEP", "200"))
+MAX_AGE_DAYS = int(os.environ.get("RESUME_REVISION_MAX_AGE_DAYS", "0"))
+# 差异压缩后超过快照大小的该比例时，直接存快照（大改写时差异没有意义，还会拉长链条）
+DELTA_MAX_RATIO = 0.5
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+_R = models.ResumeRevision
+# 同一进程内串行分配修订号；多进程并发时由 (resume_id, revision) 唯一约束兜底
+_lock = threading.Lock()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def content_sha(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _pack_snapshot(content: str) -> bytes:
+    return zlib.compress(content.encode("utf-8"), 9)
+
+
+def make_delta(base: str, target: str) -> list:
+    """行级差异：[起, 止] 表示复制 base 的行区间，字符串表示插入的文本。"""
+    a = base.splitlines(keepends=True)
+    b = target.splitlines(keepends=True)
+    ops: list = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(b[j1:j2]))
+    return ops
+
+
+def apply_delta(base: str, ops: list) -> str:
+    lines = base.splitlines(keepends=True)
+    out: List[str] = []
+    for op in ops:
+        if isinstance(op, str):
+            out.append(op)
+        else:
+            out.extend(lines[op[0]:op[1]])
+    return "".join(out)
+
+
+def _unpack(row: models.ResumeRevision, base: Optional[str]) -> str:
+    raw = zlib.decompress(row.data)
+    if row.kind == SNAPSHOT:
+        return raw.decode("utf-8")
+    return apply_delta(base or "", orjson.loads(raw))
+
+
+def _latest(db: Session, resume_id: int) -> Optional[models.ResumeRevision]:
+    return (
+        db.query(_R)
+        .options(defer(_R.data))
+        .filter(_R.resume_id == resume_id)
+        .order_by(_R.revision.desc())
+        .first()
+    )
+
+
+def checkout(db: Session, resume_id: int, revision: int) -> Optional[str]:
+    """还原指定版本全文；版本不存在时返回 None。"""
+    snapshot_rev = (
+        db.query(func.max(_R.revision))
+        .filter(_R.resume_id == resume_id, _R.kind == SNAPSHOT, _R.revision <= revision)
+        .scalar()
+    )
+    if snapshot_rev is None:
+        return None
+    rows = (
+        db.query(_R)
+        .filter(_R.resume_id == resume_id, _R.revision >= snapshot_rev, _R.revision <= revision)
+        .order_by(_R.revision.asc())
+        .all()
+    )
+    if not rows or rows[-1].revision != revision:
+        return None
+    content: Optional[str] = None
+    for row in rows:
+        content = _unpack(row, content)
+    return content
+
+
+def record(
+    db: Session,
+    resume_id: int,
+    content: str,
+    source: str = "edit",
+    note: Optional[str] = None,
+    previous: Optional[str] = None,
+) -> Optional[models.ResumeRevision]:
+    """
+    追加一版并提交；与最新一版内容相同时不记录，返回 None。
+    previous 为调用方已知的上一版全文（如更新前的 Resume.content），哈希一致时省去一次还原。
+    """
+    with _lock:
+        sha = content_sha(content)
+        latest = _latest(db, resume_id)
+        if latest is not None and latest.content_sha == sha:
+            return None
+
+        snapshot_data = _pack_snapshot(content)
+        kind, data = SNAPSHOT, snapshot_data
+        if latest is not None:
+            last_snapshot = (
+                db.query(func.max(_R.revision))
+                .filter(_R.resume_id == resume_id, _R.kind == SNAPSHOT)
+                .scalar()
+            ) or 0
+            if latest.revision + 1 - last_snapshot < SNAPSHOT_EVERY:
+                if previous is None or content_sha(previous) != latest.content_sha:
+                    previous = checkout(db, resume_id, latest.revision)
+                if previous is not None:
+                    delta_data = zlib.compress(orjson.dumps(make_delta(previous, content)), 9)
+                    if len(delta_data) <= len(snapshot_data) * DELTA_MAX_RATIO:
+                        kind, data = DELTA, delta_data
+
+        row = _R(
+            resume_id=resume_id,
+            revision=(latest.revision if latest else 0) + 1,
+            kind=kind,
+            data=data,
+            size_bytes=len(data),
+            content_length=len(content),
+            content_sha=sha,
+            source=source,
+            note=(note or None) and note[:500],
+            created_at=_now(),
+        )
+        db.add(row)
+        db.commit()
+        if KEEP > 0 and row.revision > KEEP:
+            prune(db, resume_id, keep=KEEP, max_age_days=MAX_AGE_DAYS)
+        return row
+
+
+def ensure_initial(db: Session, resume: models.Resume) -> None:
+    """旧数据没有任何修订时，先把当前内容记为第 1 版，避免首次编辑前的版本丢失。"""
+    if _latest(db, resume.id) is None and resume.content is not None:
+        record(db, resume.id, resume.content, source="initial")
+
+
+def list_revisions(db: Session, resume_id: int) -> List[models.ResumeRevision]:
+    """只加载元数据列（data 延迟加载，不会被读取）。"""
+    return (
+        db.query(_R)
+        .options(defer(_R.data))
+        .filter(_R.resume_id == resume_id)
+        .order_by(_R.revision.desc())
+        .all()
+    )
+
+
+def storage_bytes(db: Session, resume_id: int) -> int:
+    return db.query(func.coalesce(func.sum(_R.size_bytes), 0)).filter(_R.resume_id == resume_id).scalar() or 0
+
+
+def prune(db: Session, resume_id: int, keep: int = KEEP, max_age_days: int = MAX_AGE_DAYS) -> int:
+    """删除超出保留数量或过旧的修订，返回删除条数；最新一版总是保留。"""
+    latest = _latest(db, resume_id)
+    if latest is None:
+        return 0
+    cutoff = 0
+    if keep > 0:
+        cutoff = max(cutoff, latest.revision - keep + 1)
+    if max_age_days > 0:
+        since = _now() - timedelta(days=max_age_days)
+        oldest_recent = (
+            db.query(func.min(_R.revision))
+            .filter(_R.resume_id == resume_id, _R.created_at >= since)
+            .scalar()
+        )
+        cutoff = max(cutoff, oldest_recent if oldest_recent is not None else latest.revision)
+    first = (
+        db.query(_R)
+        .filter(_R.resume_id == resume_id, _R.revision >= cutoff)
+        .order_by(_R.revision.asc())
+        .first()
+    )
+    if first is None or cutoff <= 1:
+        return 0
+    if first.kind == DELTA:
+        # 先在删除前还原出全文，把保留下来的第一版改写为快照
+        content = checkout(db, resume_id, first.revision)
+        first.kind = SNAPSHOT
+        first.data = _pack_snapshot(content or "")
+        first.size_bytes = len(first.data)
+    n = (
+        db.query(_R)
+        .filter(_R.resume_id == resume_id, _R.revision < first.revision)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return n
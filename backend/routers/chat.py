@@ -1,15 +1,32 @@
 import json
+import os
+from typing import Optional, Tuple
+
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from database import get_db
+from database import SessionLocal, get_db
+from export_cache import export_cache
+from json_response import RawJSONResponse, dumps_text
 import models
+import resume_revisions
 import schemas
+from llm_usage import UsageTags
 from providers import stream_response, load_settings, PROVIDERS
+from job_artifacts import compact_job_context
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
+# 面试模拟 / 复盘 / 评分卡使用的 JD 形式：compact（精简版，默认）或 raw（原文）
+JOB_PROMPT_CONTEXT = os.environ.get("JOB_PROMPT_CONTEXT", "compact")
+# 服务端保存简历（save_resume）时，简历块结束后最多再转发多少字符的说明文字，超出即停止读取模型输出（-1 不限）
+RESUME_TAIL_MAX_CHARS = int(os.environ.get("CHAT_RESUME_TAIL_MAX_CHARS", "1500"))
+
+RESUME_START = "===RESUME_START==="
+RESUME_END = "===RESUME_END==="
+
 SYSTEM_PROMPT = """# 角色定义
 
 你是一位拥有 10 年以上经验的资深职业规划师和简历顾问，曾服务于 BAT、字节、美团、华为等头部企业的 HR 及猎头团队。你深刻理解招聘方的筛选逻辑，擅长将候选人的真实经历转化为最能打动面试官的表达方式。
@@ -128,11 +145,122 @@ SYSTEM_PROMPT = """# 角色定义
 6. **合规与反歧视**：禁止基于年龄、性别、婚育、民族、宗教、地域、残障等受保护属性进行价值判断或筛选建议；若用户提及此类信息，仅可提醒“应聚焦岗位胜任力与可验证证据”"""
 
 
+class ResumeBlockScanner:
+    """
+    流式识别 ===RESUME_START=== / ===RESUME_END=== 之间的简历正文。
+    每个分片只检查新到的文本，外加上一分片末尾可能被截断的标记前缀，不重复扫描已输出的内容。
+    stop_after_block=True 时，简历块闭合后继续监视是否又出现 START 标记（模型在重复输出简历）：
+    可能是标记开头的尾巴先暂存不转发，确认出现标记时只转发标记之前的文字并置 restarted。
+    """
+
+    def __init__(self, stop_after_block: bool = False):
+        self.stop_after_block = stop_after_block
+        self.state = "before"
+        self._carry = ""
+        self._body: list = []
+        # 简历块闭合后暂存的、可能是下一个 START 标记开头的文字
+        self._held = ""
+        # 简历块闭合后已转发的字符数
+        self.tail_chars = 0
+        self.restarted = False
+
+    def feed(self, chunk: str) -> Tuple[str, Optional[str]]:
+        """送入一个分片，返回 (可立即转发的文本, 在该分片内闭合的简历正文或 None)。"""
+        if self.state == "before":
+            window = self._carry + chunk
+            i = window.find(RESUME_START)
+            if i < 0:
+                self._carry = window[-(len(RESUME_START) - 1):]
+                return chunk, None
+            self.state = "inside"
+            offset = i + len(RESUME_START) - len(self._carry)
+            self._carry = ""
+            return self._feed_inside(chunk, offset)
+        if self.state == "inside":
+            return self._feed_inside(chunk, 0)
+        return self._feed_after(chunk), None
+
+    def flush(self) -> str:
+        """流正常结束时取回暂存的文字。"""
+        held, self._held = self._held, ""
+        self.tail_chars += len(held)
+        return held
+
+    def _feed_inside(self, chunk: str, offset: int) -> Tuple[str, Optional[str]]:
+        piece = chunk[offset:]
+        window = self._carry + piece
+        j = window.find(RESUME_END)
+        if j < 0:
+            self._body.append(piece)
+            self._carry = window[-(len(RESUME_END) - 1):]
+            return chunk, None
+        body = "".join(self._body) + piece
+        content = body[: len(body) - len(window) + j].strip()
+        end = offset + j + len(RESUME_END) - len(self._carry)
+        self.state = "after"
+        self._body = []
+        self._carry = ""
+        return chunk[:end] + self._feed_after(chunk[end:]), content
+
+    def _feed_after(self, text: str) -> str:
+        if self.restarted:
+            return ""
+        if not self.stop_after_block:
+            self.tail_chars += len(text)
+            return text
+        window = self._held + text
+        i = window.find(RESUME_START)
+        if i >= 0:
+            self.restarted = True
+            out, self._held = window[:i], ""
+        else:
+            k = _partial_marker_len(window, RESUME_START)
+            out, self._held = window[: len(window) - k], window[len(window) - k:]
+        self.tail_chars += len(out)
+        return out
+
+
+def _partial_marker_len(text: str, marker: str) -> int:
+    """text 结尾与 marker 开头重合的最长长度（不含完整标记）。"""
+    for k in range(min(len(text), len(marker) - 1), 0, -1):
+        if marker.startswith(text[-k:]):
+            return k
+    return 0
+
+
+def _save_resume_block(resume_id: int, content: str) -> Optional[dict]:
+    """把对话中生成的简历写回简历并记为 chat 修订；简历不存在时返回 None。"""
+    # 请求级 Session 在流式响应期间可能已被关闭，这里单独开一个
+    db = SessionLocal()
+    try:
+        db_resume = db.query(models.Resume).filter(models.Resume.id == resume_id).first()
+        if not db_resume:
+            return None
+        revision = None
+        if content != db_resume.content:
+            previous = db_resume.content
+            resume_revisions.ensure_initial(db, db_resume)
+            db_resume.content = content
+            db.commit()
+            db.refresh(db_resume)
+            row = resume_revisions.record(db, resume_id, content, source="chat", previous=previous)
+            revision = row.revision if row else None
+            export_cache.invalidate_resume(resume_id)
+        return {
+            "revision": revision,
+            "resume": schemas.ResumeResponse.model_validate(db_resume).model_dump(mode="json"),
+        }
+    finally:
+        db.close()
+
+
 async def _generate(
     job_content: str,
     resume_content: str,
     messages: list,
     user_background: str = None,
+    tags: Optional[UsageTags] = None,
+    save_resume_id: Optional[int] = None,
 ):
     context_parts = [f"## 目标岗位信息\n\n{job_content}"]
     if resume_content:
@@ -145,8 +273,43 @@ async def _generate(
 
     api_messages = [{"role": m["role"], "content": m["content"]} for m in messages]
 
-    async for text in stream_response(system_with_context, api_messages):
-        yield f"data: {json.dumps({'type': 'text', 'content': text})}\n\n"
+    # 只有服务端保存简历时才提前结束：此时简历已落库，之后的输出价值有限
+    stop_early = bool(save_resume_id)
+    scanner = ResumeBlockScanner(stop_after_block=stop_early)
+    stream = stream_response(system_with_context, api_messages, tags=tags)
+    try:
+        async for chunk in stream:
+            text, block = scanner.feed(chunk)
+            # 简历块之后：模型开始重复输出简历，或说明文字超出上限，截断并停止读取
+            truncated = None
+            if scanner.restarted:
+                truncated = "repeated_resume"
+            elif stop_early and 0 <= RESUME_TAIL_MAX_CHARS < scanner.tail_chars:
+                text = text[: len(text) - (scanner.tail_chars - RESUME_TAIL_MAX_CHARS)]
+                truncated = "tail_limit"
+            if text:
+                yield f"data: {json.dumps({'type': 'text', 'content': text})}\n\n"
+            if block is not None:
+                event = {"type": "resume", "content": block, "saved": False, "revision": None, "resume": None}
+                if save_resume_id and block:
+                    try:
+                        saved = await run_in_threadpool(_save_resume_block, save_resume_id, block)
+                    except Exception as e:
+                        yield f"data: {json.dumps({'type': 'error', 'message': f'简历保存失败: {str(e)[:200]}'})}\n\n"
+                    else:
+                        if saved is not None:
+                            event.update(saved, saved=True)
+                yield f"data: {json.dumps(event)}\n\n"
+            if truncated:
+                yield f"data: {json.dumps({'type': 'truncated', 'reason': truncated})}\n\n"
+                break
+        else:
+            rest = scanner.flush()
+            if rest:
+                yield f"data: {json.dumps({'type': 'text', 'content': rest})}\n\n"
+    finally:
+        # 提前结束时关闭上游流，释放模型连接与调度名额（用量记录为 cancelled）
+        await stream.aclose()
 
     yield f"data: {json.dumps({'type': 'done'})}\n\n"
 
@@ -163,6 +326,16 @@ def _build_job_content(db_job) -> str:
     return db_job.content or ""
 
 
+def _build_job_prompt_context(db: Session, db_job) -> str:
+    """每轮都要携带 JD 的提示词用：优先精简版（LLM 摘要或分段后的职责/要求），无法分段时回退原文。
+    简历定制对话仍用原文，便于对齐 JD 原始措辞与关键词。"""
+    if JOB_PROMPT_CONTEXT == "compact":
+        compact = compact_job_context(db, db_job)
+        if compact:
+            return compact
+    return _build_job_content(db_job)
+
+
 @router.post("/stream")
 async def chat_stream(request: schemas.ChatRequest, db: Session = Depends(get_db)):
     db_job = db.query(models.Job).filter(models.Job.id == request.job_id).first()
@@ -180,6 +353,8 @@ async def chat_stream(request: schemas.ChatRequest, db: Session = Depends(get_db
             resume_content=resume_content,
             messages=messages,
             user_background=request.user_background,
+            tags=UsageTags("chat", request.job_id, request.resume_id),
+            save_resume_id=db_resume.id if request.save_resume and db_resume else None,
         ),
         media_type="text/event-stream",
         headers={
@@ -209,6 +384,12 @@ def get_current_provider():
     }
 
 
+def _conversation_response(key: str, value: int, stored_messages: str) -> RawJSONResponse:
+    """messages 列存的就是 JSON 数组文本，直接拼进响应体，省去 json.loads 再序列化。"""
+    body = b'{"%s":%d,"messages":%s}' % (key.encode(), value, (stored_messages or "[]").encode("utf-8"))
+    return RawJSONResponse(body)
+
+
 @router.get("/conversations/{resume_id}")
 def get_conversation(resume_id: int, db: Session = Depends(get_db)):
     """Get conversation for a resume. Returns empty messages if none saved."""
@@ -219,7 +400,7 @@ def get_conversation(resume_id: int, db: Session = Depends(get_db)):
     )
     if not db_conv:
         return {"resume_id": resume_id, "messages": []}
-    return {"resume_id": resume_id, "messages": json.loads(db_conv.messages)}
+    return _conversation_response("resume_id", resume_id, db_conv.messages)
 
 
 @router.post("/conversations")
@@ -232,11 +413,11 @@ def save_conversation(body: schemas.ConversationSave, db: Session = Depends(get_
         .first()
     )
     if db_conv:
-        db_conv.messages = json.dumps(messages, ensure_ascii=False)
+        db_conv.messages = dumps_text(messages)
     else:
         db_conv = models.Conversation(
             resume_id=resume_id,
-            messages=json.dumps(messages, ensure_ascii=False),
+            messages=dumps_text(messages),
         )
         db.add(db_conv)
     db.commit()
@@ -253,7 +434,7 @@ def get_job_conversation(job_id: int, db: Session = Depends(get_db)):
     )
     if not db_conv:
         return {"job_id": job_id, "messages": []}
-    return {"job_id": job_id, "messages": json.loads(db_conv.messages)}
+    return _conversation_response("job_id", job_id, db_conv.messages)
 
 
 @router.post("/job-conversations")
@@ -269,11 +450,11 @@ def save_job_conversation(body: schemas.JobConversationSave, db: Session = Depen
         .first()
     )
     if db_conv:
-        db_conv.messages = json.dumps(messages, ensure_ascii=False)
+        db_conv.messages = dumps_text(messages)
     else:
         db_conv = models.JobConversation(
             job_id=job_id,
-            messages=json.dumps(messages, ensure_ascii=False),
+            messages=dumps_text(messages),
         )
         db.add(db_conv)
     db.commit()
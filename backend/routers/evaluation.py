@@ -9,8 +9,9 @@ from sqlalchemy.orm import Session
 from database import get_db
 import models
 import schemas
+from llm_usage import UsageTags
 from providers import complete_response
-from routers.chat import _build_job_content
+from routers.chat import _build_job_prompt_context
 
 router = APIRouter(prefix="/api/evaluation", tags=["evaluation"])
 
@@ -127,6 +128,13 @@ def _normalize_scorecard(data: Dict[str, Any]) -> schemas.EvaluationScorecardRes
     )
 
 
+def _is_json_object(raw: str) -> bool:
+    try:
+        return isinstance(json.loads(_strip_code_fence(raw)), dict)
+    except ValueError:
+        return False
+
+
 @router.post("/scorecard", response_model=schemas.EvaluationScorecardResponse)
 async def generate_scorecard(request: schemas.EvaluationScorecardRequest, db: Session = Depends(get_db)):
     db_job = db.query(models.Job).filter(models.Job.id == request.job_id).first()
@@ -137,7 +145,7 @@ async def generate_scorecard(request: schemas.EvaluationScorecardRequest, db: Se
         raise HTTPException(status_code=404, detail="Resume not found")
 
     parts = [
-        f"## 岗位 JD\n\n{_build_job_content(db_job)}",
+        f"## 岗位 JD\n\n{_build_job_prompt_context(db, db_job)}",
         f"## 候选人简历\n\n{db_resume.content or ''}",
     ]
     if request.user_background:
@@ -152,7 +160,13 @@ async def generate_scorecard(request: schemas.EvaluationScorecardRequest, db: Se
     )
 
     try:
-        raw = await complete_response(EVAL_SYSTEM_PROMPT, [{"role": "user", "content": user_msg}])
+        raw = await complete_response(
+            EVAL_SYSTEM_PROMPT,
+            [{"role": "user", "content": user_msg}],
+            use_cache=not request.no_cache,
+            validate=_is_json_object,
+            tags=UsageTags("scorecard", request.job_id, request.resume_id),
+        )
         data = json.loads(_strip_code_fence(raw))
         if not isinstance(data, dict):
             raise ValueError("invalid json object")
@@ -1,23 +1,22 @@
+import asyncio
 import io
 import os
 import re
-from typing import Optional
-
-from docx import Document
-from docx.shared import Pt, Cm
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import cm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import HRFlowable, Paragraph, SimpleDocTemplate, Spacer
+import time
+import zipfile
+from typing import AsyncIterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 
 from database import get_db
+from export_cache import content_hash, etag_for, etag_matches, export_cache, make_key
+from export_pool import ExportQueueFull, export_pool
+from export_render import RENDERER_VERSION, render_markdown
 import models
+from schemas import ExportBundleRequest
 
 router = APIRouter(prefix="/api/export", tags=["export"])
 
@@ -27,18 +26,81 @@ def _clean_content(content: str) -> str:
     return re.sub(r"===RESUME_END===\n?", "", content)
 
 
-@router.get("/markdown/{resume_id}")
-def export_markdown(resume_id: int, db: Session = Depends(get_db)):
+def _get_resume_or_404(db: Session, resume_id: int) -> models.Resume:
     db_resume = db.query(models.Resume).filter(models.Resume.id == resume_id).first()
     if not db_resume:
         raise HTTPException(status_code=404, detail="Resume not found")
+    return db_resume
+
+
+async def _render_cached(
+    content: str, resume_id: int, fmt: str, font_size: int, margin_cm: float
+) -> Tuple[bytes, bool, Optional[Tuple[float, float]]]:
+    """返回 (渲染结果, 是否命中缓存, (排队 ms, 渲染 ms) 或 None)。未命中时 PDF/Word 走导出进程池。"""
+    key = make_key(content_hash(content), fmt, font_size, margin_cm, RENDERER_VERSION)
+    data = export_cache.get(key)
+    if data is not None:
+        return data, True, None
+    timing = None
+    if fmt == "md":
+        data = render_markdown(content)
+    else:
+        data, queue_wait_ms, render_ms = await export_pool.render(fmt, content, font_size, margin_cm)
+        timing = (queue_wait_ms, render_ms)
+    export_cache.put(key, data, resume_id=resume_id)
+    return data, False, timing
+
+
+async def _export_response(
+    request: Request,
+    db: Session,
+    db_resume: models.Resume,
+    fmt: str,
+    font_size: int,
+    margin_cm: float,
+    media_type: str,
+    disposition: str,
+) -> Response:
+    """按（内容哈希, 格式, 版式参数, 渲染器版本）命中渲染缓存；ETag 另含下载文件名，If-None-Match 匹配时直接 304。
+    未命中时 PDF/Word 交给导出进程池渲染，队列已满返回 429。"""
     content = _clean_content(db_resume.content or "")
-    buffer = io.BytesIO(content.encode("utf-8"))
+    resume_id = db_resume.id
+    # 等待渲染期间不占用数据库连接（并发导出时会耗尽连接池）
+    db.close()
+    key = make_key(content_hash(content), fmt, font_size, margin_cm, RENDERER_VERSION)
+    etag = etag_for(key, disposition)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        data, hit, timing = await _render_cached(content, resume_id, fmt, font_size, margin_cm)
+    except ExportQueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail="导出任务繁忙，请稍后重试",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    headers["X-Export-Cache"] = "hit" if hit else "miss"
+    if timing:
+        headers["Server-Timing"] = f"queue;dur={timing[0]:.1f}, render;dur={timing[1]:.1f}"
+    headers["Content-Disposition"] = disposition
+    return Response(content=data, media_type=media_type, headers=headers)
+
+
+@router.get("/markdown/{resume_id}")
+async def export_markdown(resume_id: int, request: Request, db: Session = Depends(get_db)):
+    db_resume = _get_resume_or_404(db, resume_id)
     filename = _safe_filename(db_resume.title, "md", f"resume_{resume_id}.md")
-    return StreamingResponse(
-        buffer,
+    return await _export_response(
+        request,
+        db,
+        db_resume,
+        fmt="md",
+        font_size=0,
+        margin_cm=0.0,
         media_type="text/markdown; charset=utf-8",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        disposition=_content_disposition("attachment", filename),
     )
 
 
@@ -51,138 +113,59 @@ def _safe_filename(title: Optional[str], suffix: str, fallback: str) -> str:
     return fallback
 
 
-def _strip_md_inline(text: str) -> str:
-    """Remove markdown bold/italic/code from text for Word export."""
-    s = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
-    s = re.sub(r"\*(.*?)\*", r"\1", s)
-    s = re.sub(r"_(.*?)_", r"\1", s)
-    s = re.sub(r"__(.*?)__", r"\1", s)
-    s = re.sub(r"`(.*?)`", r"\1", s)
-    return s
-
-
-def md_to_pdf_content(md_text: str, font_size: int = 10):
-    """font_size: 9, 10, 11, 12 (body text base)."""
-    font_path_regular = None
-    font_candidates = [
-        # Windows
-        os.path.expandvars(r"%WINDIR%\Fonts\msyh.ttc"),
-        os.path.expandvars(r"%WINDIR%\Fonts\msyhbd.ttc"),
-        os.path.expandvars(r"%WINDIR%\Fonts\simsun.ttc"),
-        "C:\\Windows\\Fonts\\msyh.ttc",
-        "C:\\Windows\\Fonts\\simsun.ttc",
-        # macOS
-        "/System/Library/Fonts/PingFang.ttc",
-        "/System/Library/Fonts/Supplemental/Songti.ttc",
-        "/Library/Fonts/Arial Unicode.ttf",
-        # Linux
-        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-        "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-    ]
-    for fp in font_candidates:
-        if not fp:
-            continue
-        normalized = os.path.normpath(os.path.expanduser(os.path.expandvars(fp)))
-        if os.path.exists(normalized):
-            font_path_regular = normalized
-            break
-
-    if font_path_regular:
-        try:
-            pdfmetrics.registerFont(TTFont("ChineseFont", font_path_regular))
-            base_font = "ChineseFont"
-        except Exception:
-            base_font = "Helvetica"
-    else:
-        base_font = "Helvetica"
-
-    getSampleStyleSheet()
-    h1_size = max(14, font_size + 8)
-    h2_size = max(11, font_size + 3)
-    h3_size = max(10, font_size + 1)
-    style_h1 = ParagraphStyle("H1", fontName=base_font, fontSize=h1_size, spaceAfter=6, spaceBefore=10, textColor=colors.HexColor("#1a1a2e"), leading=h1_size + 4)
-    style_h2 = ParagraphStyle("H2", fontName=base_font, fontSize=h2_size, spaceAfter=4, spaceBefore=8, textColor=colors.HexColor("#16213e"), leading=h2_size + 4)
-    style_h3 = ParagraphStyle("H3", fontName=base_font, fontSize=h3_size, spaceAfter=3, spaceBefore=5, textColor=colors.HexColor("#0f3460"), leading=h3_size + 3)
-    style_body = ParagraphStyle("Body", fontName=base_font, fontSize=font_size, spaceAfter=2, spaceBefore=1, leading=font_size + 4, textColor=colors.HexColor("#333333"))
-    style_bullet = ParagraphStyle("Bullet", fontName=base_font, fontSize=font_size, spaceAfter=2, spaceBefore=1, leading=font_size + 4, leftIndent=15, textColor=colors.HexColor("#333333"))
-
-    story = []
-    for line in md_text.split("\n"):
-        stripped = re.sub(r"\*\*(.*?)\*\*", r"\1", line.rstrip())
-        stripped = re.sub(r"\*(.*?)\*", r"\1", stripped)
-        stripped = re.sub(r"`(.*?)`", r"\1", stripped)
-
-        if line.startswith("# "):
-            story.append(Paragraph(stripped[2:].strip(), style_h1))
-        elif line.startswith("## "):
-            story.append(Spacer(1, 0.1 * cm))
-            story.append(Paragraph(stripped[3:].strip(), style_h2))
-            story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor("#cccccc")))
-        elif line.startswith("### "):
-            story.append(Paragraph(stripped[4:].strip(), style_h3))
-        elif line.startswith("- ") or line.startswith("* "):
-            text = stripped[2:].strip()
-            if text:
-                story.append(Paragraph(f"• {text}", style_bullet))
-        elif line.strip() in ["---", "***"]:
-            story.append(HRFlowable(width="100%", thickness=0.3, color=colors.HexColor("#dddddd")))
-        elif not line.strip():
-            story.append(Spacer(1, 0.2 * cm))
-        elif stripped.strip():
-            story.append(Paragraph(stripped, style_body))
-
-    return story
+def _content_disposition(kind: str, filename: str) -> str:
+    """HTTP 头只能是 latin-1：中文文件名走 RFC 5987 的 filename*，filename 保留 ASCII 兜底。"""
+    ascii_name = filename.encode("ascii", "ignore").decode("ascii").strip()
+    suffix = filename.rsplit(".", 1)[-1] if "." in filename else ""
+    if not ascii_name or ascii_name.startswith("."):
+        ascii_name = f"resume.{suffix}" if suffix else "resume"
+    return f"{kind}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
 
 
 @router.get("/pdf/{resume_id}")
-def export_pdf(
+async def export_pdf(
     resume_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     font_size: int = 10,
     margin_cm: float = 2.0,
 ):
     """font_size: 9-12, margin_cm: 1.5, 2.0, 2.5"""
-    font_size = max(9, min(12, font_size))
-    margin_cm = max(1.0, min(3.0, margin_cm))
-    db_resume = db.query(models.Resume).filter(models.Resume.id == resume_id).first()
-    if not db_resume:
-        raise HTTPException(status_code=404, detail="Resume not found")
-
-    content = _clean_content(db_resume.content)
-    buffer = io.BytesIO()
-    m = margin_cm * cm
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=m, leftMargin=m, topMargin=m, bottomMargin=m)
-    doc.build(md_to_pdf_content(content, font_size))
-    buffer.seek(0)
-
-    filename = _safe_filename(db_resume.title, "pdf", f"resume_{resume_id}.pdf")
-    return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    return await _pdf_response(resume_id, request, db, font_size, margin_cm, "attachment")
 
 
 @router.get("/pdf-preview/{resume_id}")
-def preview_pdf(
+async def preview_pdf(
     resume_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     font_size: int = 10,
     margin_cm: float = 2.0,
 ):
-    response = export_pdf(resume_id, db, font_size, margin_cm)
-    filename = response.headers["Content-Disposition"].split('filename="')[-1].rstrip('"')
-    response.headers["Content-Disposition"] = f'inline; filename="{filename}"'
-    return response
+    return await _pdf_response(resume_id, request, db, font_size, margin_cm, "inline")
 
 
-def _add_paragraph_with_font(doc: Document, text: str, style_name: Optional[str] = None, font_pt: int = 11):
-    p = doc.add_paragraph(text, style=style_name)
-    for run in p.runs:
-        run.font.size = Pt(font_pt)
-    return p
+async def _pdf_response(resume_id: int, request: Request, db: Session, font_size: int, margin_cm: float, disposition: str) -> Response:
+    font_size = max(9, min(12, font_size))
+    margin_cm = max(1.0, min(3.0, margin_cm))
+    db_resume = _get_resume_or_404(db, resume_id)
+    filename = _safe_filename(db_resume.title, "pdf", f"resume_{resume_id}.pdf")
+    return await _export_response(
+        request,
+        db,
+        db_resume,
+        fmt="pdf",
+        font_size=font_size,
+        margin_cm=margin_cm,
+        media_type="application/pdf",
+        disposition=_content_disposition(disposition, filename),
+    )
 
 
 @router.get("/word/{resume_id}")
-def export_word(
+async def export_word(
     resume_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     font_size: int = 11,
     margin_cm: float = 2.0,
@@ -190,50 +173,151 @@ def export_word(
     """font_size: 10, 11, 12, 14 (pt). margin_cm: 1.5, 2.0, 2.5"""
     font_size = max(9, min(14, font_size))
     margin_cm = max(1.0, min(3.0, margin_cm))
-    db_resume = db.query(models.Resume).filter(models.Resume.id == resume_id).first()
-    if not db_resume:
-        raise HTTPException(status_code=404, detail="Resume not found")
+    db_resume = _get_resume_or_404(db, resume_id)
+    filename = _safe_filename(db_resume.title, "docx", f"resume_{resume_id}.docx")
+    return await _export_response(
+        request,
+        db,
+        db_resume,
+        fmt="docx",
+        font_size=font_size,
+        margin_cm=margin_cm,
+        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        disposition=_content_disposition("attachment", filename),
+    )
 
-    content = _clean_content(db_resume.content)
-    doc = Document()
-    for section in doc.sections:
-        section.top_margin = Cm(margin_cm)
-        section.bottom_margin = Cm(margin_cm)
-        section.left_margin = Cm(margin_cm)
-        section.right_margin = Cm(margin_cm)
-    for line in content.splitlines():
-        text = line.strip()
-        if not text:
-            doc.add_paragraph("")
-            continue
-        clean = _strip_md_inline(text)
-        h1_pt = min(22, font_size + 8)
-        h2_pt = min(16, font_size + 4)
-        h3_pt = min(14, font_size + 2)
-        if text.startswith("# "):
-            p = doc.add_heading(clean[2:].strip(), level=1)
-            for run in p.runs:
-                run.font.size = Pt(h1_pt)
-        elif text.startswith("## "):
-            p = doc.add_heading(clean[3:].strip(), level=2)
-            for run in p.runs:
-                run.font.size = Pt(h2_pt)
-        elif text.startswith("### "):
-            p = doc.add_heading(clean[4:].strip(), level=3)
-            for run in p.runs:
-                run.font.size = Pt(h3_pt)
-        elif text.startswith("- ") or text.startswith("* "):
-            _add_paragraph_with_font(doc, clean[2:].strip(), style="List Bullet", font_pt=font_size)
-        else:
-            _add_paragraph_with_font(doc, clean, font_pt=font_size)
-
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
 
-    filename = _safe_filename(db_resume.title, "docx", f"resume_{resume_id}.docx")
+# 批量导出：单次最多打包的简历数；同时在渲染的条目数（给单份导出留出进程池余量）
+BUNDLE_MAX_RESUMES = int(os.environ.get("EXPORT_BUNDLE_MAX_RESUMES", "50"))
+BUNDLE_CONCURRENCY = int(os.environ.get("EXPORT_BUNDLE_CONCURRENCY", str(max(1, export_pool.workers))))
+_BUNDLE_FORMATS = {"pdf": "pdf", "docx": "docx", "word": "docx", "md": "md", "markdown": "md"}
+
+
+class _ZipSink(io.RawIOBase):
+    """ZipFile 的不可 seek 输出端：写入的字节暂存，每写完一个条目就取走发给客户端。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _resolve_bundle_resumes(db: Session, body: ExportBundleRequest) -> List[models.Resume]:
+    if body.job_id is None and body.profile_id is None and not body.resume_ids:
+        raise HTTPException(status_code=400, detail="请指定 job_id、profile_id 或 resume_ids")
+    q = db.query(models.Resume)
+    if body.job_id is not None:
+        q = q.filter(models.Resume.job_id == body.job_id)
+    if body.profile_id is not None:
+        q = q.filter(models.Resume.background_profile_id == body.profile_id)
+    if body.resume_ids:
+        q = q.filter(models.Resume.id.in_(body.resume_ids))
+    resumes = q.order_by(models.Resume.id).all()
+    if not resumes:
+        raise HTTPException(status_code=404, detail="没有符合条件的简历")
+    if len(resumes) > BUNDLE_MAX_RESUMES:
+        raise HTTPException(status_code=400, detail=f"单次最多打包 {BUNDLE_MAX_RESUMES} 份简历")
+    return resumes
+
+
+async def _render_bundle_entry(
+    sem: asyncio.Semaphore, content: str, resume_id: int, fmt: str, font_size: int, margin_cm: float
+) -> bytes:
+    async with sem:
+        while True:
+            try:
+                data, _, _ = await _render_cached(content, resume_id, fmt, font_size, margin_cm)
+                return data
+            except ExportQueueFull as e:
+                # 进程池被单份导出占满时排队等待，而不是让整个压缩包失败
+                await asyncio.sleep(e.retry_after)
+
+
+async def _stream_bundle(entries: List[Tuple[str, str, int, str, int, float]]) -> AsyncIterator[bytes]:
+    """条目并行渲染，谁先完成先写入 ZIP 并立即发送；整个压缩包不在内存中拼装。"""
+    sem = asyncio.Semaphore(BUNDLE_CONCURRENCY)
+    tasks = {
+        asyncio.ensure_future(_render_bundle_entry(sem, content, rid, fmt, fs, m)): (name, fmt)
+        for name, content, rid, fmt, fs, m in entries
+    }
+    sink = _ZipSink()
+    errors: List[str] = []
+    try:
+        with zipfile.ZipFile(sink, "w") as zf:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name, fmt = tasks[task]
+                    try:
+                        data = task.result()
+                    except Exception as e:
+                        errors.append(f"{name}: {e}")
+                        continue
+                    info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                    # PDF / docx 本身已压缩，再 deflate 只浪费 CPU
+                    info.compress_type = zipfile.ZIP_DEFLATED if fmt == "md" else zipfile.ZIP_STORED
+                    zf.writestr(info, data)
+                    yield sink.drain()
+            if errors:
+                zf.writestr("导出失败.txt", "\n".join(errors))
+        yield sink.drain()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/bundle")
+def export_bundle(body: ExportBundleRequest, db: Session = Depends(get_db)):
+    """岗位 / 人物背景档案 / 指定 id 的简历批量导出为 ZIP（流式返回）。
+    formats 可多选 pdf / docx / md；已渲染过的组合直接复用导出缓存。"""
+    formats: List[str] = []
+    for f in body.formats or []:
+        fmt = _BUNDLE_FORMATS.get(f.lower())
+        if fmt is None:
+            raise HTTPException(status_code=400, detail=f"不支持的导出格式：{f}")
+        if fmt not in formats:
+            formats.append(fmt)
+    if not formats:
+        raise HTTPException(status_code=400, detail="请至少选择一种导出格式")
+    pdf_font_size = max(9, min(12, body.pdf_font_size))
+    word_font_size = max(9, min(14, body.word_font_size))
+    margin_cm = max(1.0, min(3.0, body.margin_cm))
+    layout = {"pdf": (pdf_font_size, margin_cm), "docx": (word_font_size, margin_cm), "md": (0, 0.0)}
+
+    entries = []
+    for r in _resolve_bundle_resumes(db, body):
+        content = _clean_content(r.content or "")
+        for fmt in formats:
+            # 同一岗位下标题常常相同，文件名带上简历 id 避免覆盖
+            name = f"{r.id}_" + _safe_filename(r.title, fmt, f"resume.{fmt}")
+            entries.append((name, content, r.id, fmt, *layout[fmt]))
+    db.close()
+
+    if body.job_id is not None:
+        filename = f"job_{body.job_id}_resumes.zip"
+    elif body.profile_id is not None:
+        filename = f"profile_{body.profile_id}_resumes.zip"
+    else:
+        filename = "resumes.zip"
     return StreamingResponse(
-        buffer,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        _stream_bundle(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": _content_disposition("attachment", filename)},
     )
+
+
+@router.get("/stats")
+def export_stats():
+    """导出进程池状态：在途任务数、拒绝次数、最近渲染耗时与排队等待分布（ms）。"""
+    return export_pool.stats()
@@ -9,11 +9,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_db, SessionLocal
 import models
 import schemas
-from providers import stream_response, complete_response
-from routers.chat import _build_job_content
+from llm_usage import UsageTags
+from provider_limits import BACKGROUND
+from providers import stream_response, complete_response, load_settings, resolve_chain
+from routers.chat import _build_job_content, _build_job_prompt_context
 from interview_question_bank import (
     BankQuestion,
     QUESTION_CATEGORIES,
@@ -22,6 +24,7 @@ from interview_question_bank import (
     sample_questionnaire,
 )
 from interview_bank_llm import generate_job_question_dicts
+from interview_coverage import CoverageSession, create_session, get_session
 
 router = APIRouter(prefix="/api/interview-sim", tags=["interview-sim"])
 
@@ -83,7 +86,14 @@ async def _stream_sim(
     messages: list,
     user_background: Optional[str],
     questionnaire_markdown: Optional[str] = None,
+    coverage: Optional[CoverageSession] = None,
+    tags: Optional[UsageTags] = None,
 ):
+    if coverage is not None:
+        # 题单覆盖度：按提交的历史更新后只注入剩余题目，题单随面试推进而变短
+        coverage.sync(messages)
+        questionnaire_markdown = coverage.remaining_markdown()
+
     context_parts = [f"## 目标岗位 JD\n\n{job_content}"]
     if resume_content:
         context_parts.append(f"## 候选人简历\n\n{resume_content}")
@@ -95,8 +105,13 @@ async def _stream_sim(
     system = f"{INTERVIEW_SIM_SYSTEM}\n\n---\n\n{context}"
 
     api_messages = [{"role": m["role"], "content": m["content"]} for m in messages]
-    async for text in stream_response(system, api_messages):
+    parts: List[str] = []
+    async for text in stream_response(system, api_messages, tags=tags):
+        parts.append(text)
         yield f"data: {json.dumps({'type': 'text', 'content': text})}\n\n"
+    if coverage is not None:
+        newly = coverage.sync(messages + [{"role": "assistant", "content": "".join(parts)}])
+        yield f"data: {json.dumps({'type': 'coverage', 'newly_covered': newly, **coverage.to_dict()})}\n\n"
     yield f"data: {json.dumps({'type': 'done'})}\n\n"
 
 
@@ -180,9 +195,19 @@ async def get_questionnaire(
             for q in items
         ],
         questionnaire_markdown=md,
+        session_id=create_session(items) if items else None,
     )
 
 
+@router.get("/coverage/{session_id}", response_model=schemas.QuestionCoverageResponse)
+async def get_question_coverage(session_id: str):
+    """本场题单覆盖进度（服务端按每轮面试官发言增量匹配）。"""
+    sess = get_session(session_id)
+    if sess is None:
+        raise HTTPException(status_code=404, detail="Interview session not found")
+    return schemas.QuestionCoverageResponse(**sess.to_dict())
+
+
 @router.get("/bank-preview", response_model=schemas.BankPreviewResponse)
 async def get_bank_preview(
     job_id: int,
@@ -285,6 +310,9 @@ async def generate_job_interview_bank(
             _build_job_content(db_job),
             db_resume.content or "",
             db_bg.content if db_bg else None,
+            # 追加模式下相同输入命中缓存只会得到同一批题，因此只在覆盖重生成时使用缓存
+            use_cache=request.replace and not request.no_cache,
+            tags=UsageTags("bank", request.job_id, request.resume_id),
         )
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"LLM 生成失败: {str(e)[:200]}")
@@ -367,11 +395,13 @@ async def interview_sim_stream(request: schemas.InterviewSimRequest, db: Session
 
     return StreamingResponse(
         _stream_sim(
-            job_content=_build_job_content(db_job),
+            job_content=_build_job_prompt_context(db, db_job),
             resume_content=db_resume.content or "",
             messages=messages,
             user_background=request.user_background,
             questionnaire_markdown=request.questionnaire_markdown,
+            coverage=get_session(request.session_id),
+            tags=UsageTags("interview_sim", request.job_id, request.resume_id),
         ),
         media_type="text/event-stream",
         headers={
@@ -382,8 +412,11 @@ async def interview_sim_stream(request: schemas.InterviewSimRequest, db: Session
     )
 
 
-@router.post("/report", response_model=schemas.InterviewReportResponse)
-async def interview_sim_report(request: schemas.InterviewReportRequest, db: Session = Depends(get_db)):
+INTERVIEW_REPORT_USER_MSG = "请根据以上材料生成面试复盘报告（Markdown）。直接输出报告正文，不要前言套话。"
+
+
+def _build_report_system(request: schemas.InterviewReportRequest, db: Session) -> str:
+    """校验岗位/简历并拼接复盘报告的系统提示；同步与流式两个接口共用。"""
     db_job = db.query(models.Job).filter(models.Job.id == request.job_id).first()
     if not db_job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -394,7 +427,7 @@ async def interview_sim_report(request: schemas.InterviewReportRequest, db: Sess
     if db_resume.job_id != request.job_id:
         raise HTTPException(status_code=400, detail="Resume does not belong to this job")
 
-    job_content = _build_job_content(db_job)
+    job_content = _build_job_prompt_context(db, db_job)
     resume_content = db_resume.content or ""
     transcript = _format_transcript([m.model_dump() for m in request.messages])
     if not transcript.strip():
@@ -409,10 +442,130 @@ async def interview_sim_report(request: schemas.InterviewReportRequest, db: Sess
         context_parts.append(f"## 候选人补充经历\n\n{request.user_background}")
 
     context = "\n\n---\n\n".join(context_parts)
-    system = f"{INTERVIEW_REPORT_SYSTEM}\n\n---\n\n{context}"
+    return f"{INTERVIEW_REPORT_SYSTEM}\n\n---\n\n{context}"
+
+
+def _can_save_report() -> bool:
+    """未配置可用模型时，模型输出只是「未配置 Key」之类的提示语，不作为报告入库。"""
+    chain, _ = resolve_chain(load_settings())
+    return bool(chain)
+
+
+def _save_interview_report(db: Session, job_id: int, resume_id: int, report_md: str) -> int:
+    """
+    复盘报告入库（evaluation_reports，report_type=interview_report），返回记录 id。
+    与该岗位/简历最近一份报告内容相同（如命中 LLM 缓存）时复用那一条，不重复插入。
+    """
+    content_json = json.dumps({"report": report_md}, ensure_ascii=False)
+    latest = (
+        db.query(models.EvaluationReport)
+        .filter(models.EvaluationReport.job_id == job_id)
+        .filter(models.EvaluationReport.resume_id == resume_id)
+        .filter(models.EvaluationReport.report_type == "interview_report")
+        .order_by(models.EvaluationReport.id.desc())
+        .first()
+    )
+    if latest is not None and latest.content_json == content_json:
+        return latest.id
+    row = models.EvaluationReport(
+        job_id=job_id,
+        resume_id=resume_id,
+        report_type="interview_report",
+        content_json=content_json,
+    )
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    return row.id
+
+
+def _report_from_row(row: models.EvaluationReport) -> schemas.InterviewReportResponse:
+    try:
+        data = json.loads(row.content_json or "{}")
+    except ValueError:
+        data = {}
+    report = data.get("report", "") if isinstance(data, dict) else ""
+    return schemas.InterviewReportResponse(report=report, report_id=row.id, created_at=row.created_at)
+
+
+async def _stream_report(system: str, job_id: int, resume_id: int, save: bool = True):
+    parts: List[str] = []
+    messages = [{"role": "user", "content": INTERVIEW_REPORT_USER_MSG}]
+    async for text in stream_response(system, messages, BACKGROUND, UsageTags("report", job_id, resume_id)):
+        parts.append(text)
+        yield f"data: {json.dumps({'type': 'text', 'content': text})}\n\n"
+
+    report_md = "".join(parts)
+    report_id = None
+    if save and report_md.strip():
+        # 请求级 Session 在流式响应期间可能已被关闭，这里单独开一个
+        db = SessionLocal()
+        try:
+            report_id = _save_interview_report(db, job_id, resume_id, report_md)
+        except Exception as e:
+            yield f"data: {json.dumps({'type': 'error', 'message': f'报告保存失败: {str(e)[:200]}'})}\n\n"
+        finally:
+            db.close()
+    yield f"data: {json.dumps({'type': 'done', 'report_id': report_id})}\n\n"
+
+
+@router.post("/report", response_model=schemas.InterviewReportResponse)
+async def interview_sim_report(request: schemas.InterviewReportRequest, db: Session = Depends(get_db)):
+    system = _build_report_system(request, db)
+    report_md = await complete_response(
+        system,
+        [{"role": "user", "content": INTERVIEW_REPORT_USER_MSG}],
+        use_cache=not request.no_cache,
+        tags=UsageTags("report", request.job_id, request.resume_id),
+    )
+    report_id = None
+    if _can_save_report() and report_md.strip():
+        report_id = _save_interview_report(db, request.job_id, request.resume_id, report_md)
 
-    user_msg = "请根据以上材料生成面试复盘报告（Markdown）。直接输出报告正文，不要前言套话。"
-    report_md = await complete_response(system, [{"role": "user", "content": user_msg}])
+    return schemas.InterviewReportResponse(report=report_md, report_id=report_id)
 
-    return schemas.InterviewReportResponse(report=report_md)
 
+@router.post("/report/stream")
+async def interview_sim_report_stream(request: schemas.InterviewReportRequest, db: Session = Depends(get_db)):
+    """流式生成复盘报告（SSE）；生成结束后入库，done 事件带 report_id。"""
+    system = _build_report_system(request, db)
+    return StreamingResponse(
+        _stream_report(system, request.job_id, request.resume_id, save=_can_save_report()),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/reports", response_model=List[schemas.InterviewReportListItem])
+def list_interview_reports(job_id: int, resume_id: Optional[int] = None, limit: int = 20, db: Session = Depends(get_db)):
+    """历史复盘报告列表（不含正文），重新打开时按 id 读取，无需再次调用 LLM。"""
+    limit = max(1, min(100, int(limit)))
+    q = (
+        db.query(models.EvaluationReport)
+        .filter(models.EvaluationReport.job_id == job_id)
+        .filter(models.EvaluationReport.report_type == "interview_report")
+    )
+    if resume_id is not None:
+        q = q.filter(models.EvaluationReport.resume_id == resume_id)
+    rows = q.order_by(models.EvaluationReport.created_at.desc()).limit(limit).all()
+    return [
+        schemas.InterviewReportListItem(id=r.id, job_id=r.job_id, resume_id=r.resume_id, created_at=r.created_at)
+        for r in rows
+    ]
+
+
+@router.get("/reports/{report_id}", response_model=schemas.InterviewReportResponse)
+def get_interview_report(report_id: int, db: Session = Depends(get_db)):
+    row = (
+        db.query(models.EvaluationReport)
+        .filter(models.EvaluationReport.id == report_id)
+        .filter(models.EvaluationReport.report_type == "interview_report")
+        .first()
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="Interview report not found")
+    return _report_from_row(row)
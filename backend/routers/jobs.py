@@ -5,6 +5,13 @@ import json
 from pathlib import Path
 
 from database import get_db
+from job_artifacts import (
+    SummaryUnavailable,
+    compact_job_context,
+    current_artifacts,
+    generate_job_summary,
+    refresh_job_artifacts,
+)
 import models
 import schemas
 
@@ -34,6 +41,7 @@ def create_job(job: schemas.JobCreate, db: Session = Depends(get_db)):
     db.add(db_job)
     db.commit()
     db.refresh(db_job)
+    refresh_job_artifacts(db, db_job)
     return db_job
 
 
@@ -55,9 +63,48 @@ def update_job(job_id: int, job: schemas.JobUpdate, db: Session = Depends(get_db
         setattr(db_job, field, value)
     db.commit()
     db.refresh(db_job)
+    if "content" in update_data:
+        # 按内容哈希判断，JD 未实际变化时不会重算
+        refresh_job_artifacts(db, db_job)
     return db_job
 
 
+def _artifact_response(db: Session, db_job: models.Job) -> schemas.JobArtifactResponse:
+    data, summary, digest = current_artifacts(db, db_job)
+    return schemas.JobArtifactResponse(
+        job_id=db_job.id,
+        content_hash=digest,
+        sections=data.get("sections") or {},
+        keywords=data.get("keywords") or [],
+        summary=summary,
+        compact=compact_job_context(db, db_job),
+    )
+
+
+@router.get("/{job_id}/artifacts", response_model=schemas.JobArtifactResponse)
+def get_job_artifacts(job_id: int, db: Session = Depends(get_db)):
+    """岗位 JD 的派生数据（分段、技能关键词、摘要）；不存在或已过期时在内存中即时重算（不写库）。"""
+    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not db_job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _artifact_response(db, db_job)
+
+
+@router.post("/{job_id}/artifacts/summary", response_model=schemas.JobArtifactResponse)
+async def generate_job_artifact_summary(job_id: int, db: Session = Depends(get_db)):
+    """调用当前模型生成精简版 JD（同一 JD 内容只生成一次），之后各提示词优先使用该摘要。"""
+    db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not db_job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        await generate_job_summary(db, db_job)
+    except SummaryUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"JD 摘要生成失败: {str(e)[:200]}")
+    return _artifact_response(db, db_job)
+
+
 @router.delete("/{job_id}")
 def delete_job(job_id: int, db: Session = Depends(get_db)):
     db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
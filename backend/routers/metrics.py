@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from database import get_db
+from llm_usage import usage_writer
+from providers import load_settings
+import models
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+_U = models.LLMUsage
+GROUP_COLUMNS = {
+    "feature": _U.feature,
+    "provider": _U.provider,
+    "model": _U.model,
+    "job_id": _U.job_id,
+    "resume_id": _U.resume_id,
+    "outcome": _U.outcome,
+    "day": func.date(_U.created_at),
+}
+
+
+def _cost(prices: Dict[str, dict], model: str, input_tokens: int, output_tokens: int, cached_tokens: int) -> Optional[float]:
+    """prices 为每百万 token 单价（币种由配置决定）；未配置该模型单价时返回 None。"""
+    price = prices.get(model)
+    if not price:
+        return None
+    cached_price = price.get("cached_input", price.get("input", 0))
+    uncached = max(0, input_tokens - cached_tokens)
+    return (
+        uncached * price.get("input", 0)
+        + cached_tokens * cached_price
+        + output_tokens * price.get("output", 0)
+    ) / 1_000_000
+
+
+@router.get("/usage")
+def get_usage(
+    group_by: str = "feature",
+    days: int = 7,
+    feature: Optional[str] = None,
+    provider: Optional[str] = None,
+    job_id: Optional[int] = None,
+    resume_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    LLM 用量聚合：按 feature / provider / model / job_id / resume_id / outcome / day 分组，
+    统计调用次数、失败次数、token 数、平均首 token 时间与耗时；配置了 prices 的模型附带费用。
+    """
+    group_col = GROUP_COLUMNS.get(group_by)
+    if group_col is None:
+        raise HTTPException(status_code=400, detail=f"group_by 仅支持：{', '.join(GROUP_COLUMNS)}")
+    # 让还在后台队列里的记录先落库
+    usage_writer.flush()
+
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=max(1, days))
+    q = db.query(
+        group_col.label("key"),
+        _U.model,
+        func.count(_U.id),
+        func.sum(case((_U.outcome != "ok", 1), else_=0)),
+        func.sum(_U.input_tokens),
+        func.sum(_U.output_tokens),
+        func.sum(_U.cached_tokens),
+        func.sum(_U.estimated),
+        func.avg(case((_U.outcome == "ok", _U.ttft_ms))),
+        func.max(case((_U.outcome == "ok", _U.ttft_ms))),
+        func.avg(case((_U.outcome == "ok", _U.duration_ms))),
+        func.avg(_U.queue_ms),
+    ).filter(_U.created_at >= since)
+    if feature:
+        q = q.filter(_U.feature == feature)
+    if provider:
+        q = q.filter(_U.provider == provider)
+    if job_id is not None:
+        q = q.filter(_U.job_id == job_id)
+    if resume_id is not None:
+        q = q.filter(_U.resume_id == resume_id)
+
+    prices = load_settings().get("prices") or {}
+    groups: Dict[object, dict] = {}
+    # 先按 (分组, 模型) 聚合，费用按模型单价计算后再合并到分组
+    for key, model, calls, errors, inp, out, cached, est, ttft_avg, ttft_max, dur_avg, queue_avg in q.group_by(group_col, _U.model):
+        g = groups.setdefault(key, {
+            group_by: key, "calls": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0,
+            "cached_tokens": 0, "estimated_calls": 0, "cost": 0.0, "unpriced_calls": 0,
+            "_ttft_sum": 0.0, "_dur_sum": 0.0, "_queue_sum": 0.0, "_ok": 0, "ttft_max_ms": None,
+        })
+        ok = calls - (errors or 0)
+        g["calls"] += calls
+        g["errors"] += errors or 0
+        g["input_tokens"] += inp or 0
+        g["output_tokens"] += out or 0
+        g["cached_tokens"] += cached or 0
+        g["estimated_calls"] += est or 0
+        g["_ttft_sum"] += (ttft_avg or 0) * ok
+        g["_dur_sum"] += (dur_avg or 0) * ok
+        g["_queue_sum"] += (queue_avg or 0) * calls
+        g["_ok"] += ok
+        if ttft_max is not None:
+            g["ttft_max_ms"] = max(g["ttft_max_ms"] or 0, ttft_max)
+        cost = _cost(prices, model, inp or 0, out or 0, cached or 0)
+        if cost is None:
+            g["unpriced_calls"] += calls
+        else:
+            g["cost"] += cost
+
+    rows = []
+    for g in groups.values():
+        ok = g.pop("_ok")
+        g["avg_ttft_ms"] = round(g.pop("_ttft_sum") / ok, 1) if ok else None
+        g["avg_duration_ms"] = round(g.pop("_dur_sum") / ok, 1) if ok else None
+        g["avg_queue_ms"] = round(g.pop("_queue_sum") / g["calls"], 1) if g["calls"] else None
+        g["cost"] = round(g["cost"], 6)
+        rows.append(g)
+    rows.sort(key=lambda r: r["input_tokens"] + r["output_tokens"], reverse=True)
+
+    totals = {
+        k: sum(r[k] for r in rows)
+        for k in ("calls", "errors", "input_tokens", "output_tokens", "cached_tokens", "estimated_calls", "unpriced_calls")
+    }
+    totals["cost"] = round(sum(r["cost"] for r in rows), 6)
+    return {"group_by": group_by, "since": since.isoformat(), "groups": rows, "totals": totals}
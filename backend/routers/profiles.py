@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+import profiling
+
+router = APIRouter(prefix="/api/profiles", tags=["profiles"])
+
+_FORMATS = {"tree": ".txt", "folded": ".folded"}
+
+
+@router.get("")
+def list_request_profiles():
+    """已保存的单请求剖析（新的在前）；请求带 X-Profile: 1 头或 ?_profile=1 参数时生成。"""
+    return {"enabled": profiling.ENABLED, "dir": str(profiling.PROFILE_DIR), "profiles": profiling.list_profiles()}
+
+
+@router.get("/{profile_id}")
+def get_request_profile(profile_id: str, format: str = "tree"):
+    """format=tree 为调用树文本；format=folded 为折叠栈，可导入 speedscope 或 flamegraph.pl 生成火焰图。"""
+    suffix = _FORMATS.get(format)
+    if suffix is None:
+        raise HTTPException(status_code=400, detail="format 仅支持 tree / folded")
+    path = profiling.profile_path(profile_id, suffix)
+    if path is None:
+        raise HTTPException(status_code=404, detail="剖析记录不存在")
+    return PlainTextResponse(
+        path.read_text(encoding="utf-8"),
+        headers={"Content-Disposition": f'inline; filename="{path.name}"'},
+    )
+
+
+@router.delete("")
+def clear_request_profiles():
+    return {"deleted": profiling.delete_profiles()}
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from database import get_db
+from export_cache import export_cache
 import models
+import resume_revisions
 import schemas
 
 router = APIRouter(prefix="/api/resumes", tags=["resumes"])
@@ -62,6 +64,7 @@ def create_resume(resume: schemas.ResumeCreate, db: Session = Depends(get_db)):
     db.add(db_resume)
     db.commit()
     db.refresh(db_resume)
+    resume_revisions.record(db, db_resume.id, db_resume.content, source="create")
     return db_resume
 
 
@@ -89,10 +92,17 @@ def update_resume(resume_id: int, resume: schemas.ResumeUpdate, db: Session = De
     if not db_resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     update_data = resume.model_dump(exclude_unset=True)
+    content_changed = "content" in update_data and update_data["content"] != db_resume.content
+    previous = db_resume.content
+    if content_changed:
+        resume_revisions.ensure_initial(db, db_resume)
     for field, value in update_data.items():
         setattr(db_resume, field, value)
     db.commit()
     db.refresh(db_resume)
+    if content_changed:
+        resume_revisions.record(db, resume_id, db_resume.content, source="edit", previous=previous)
+        export_cache.invalidate_resume(resume_id)
     return db_resume
 
 
@@ -103,4 +113,64 @@ def delete_resume(resume_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Resume not found")
     db.delete(db_resume)
     db.commit()
+    export_cache.invalidate_resume(resume_id)
     return {"message": "Resume deleted"}
+
+
+def _get_resume_or_404(db: Session, resume_id: int) -> models.Resume:
+    db_resume = db.query(models.Resume).filter(models.Resume.id == resume_id).first()
+    if not db_resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    return db_resume
+
+
+@router.get("/{resume_id}/revisions", response_model=schemas.ResumeRevisionListResponse)
+def list_resume_revisions(resume_id: int, db: Session = Depends(get_db)):
+    """修订列表只返回元数据（不解压内容），按修订号倒序。"""
+    db_resume = _get_resume_or_404(db, resume_id)
+    resume_revisions.ensure_initial(db, db_resume)
+    return {
+        "resume_id": resume_id,
+        "storage_bytes": resume_revisions.storage_bytes(db, resume_id),
+        "revisions": resume_revisions.list_revisions(db, resume_id),
+    }
+
+
+@router.get("/{resume_id}/revisions/{revision}", response_model=schemas.ResumeRevisionContentResponse)
+def get_resume_revision(resume_id: int, revision: int, db: Session = Depends(get_db)):
+    _get_resume_or_404(db, resume_id)
+    content = resume_revisions.checkout(db, resume_id, revision)
+    if content is None:
+        raise HTTPException(status_code=404, detail="修订不存在或已被清理")
+    return {"resume_id": resume_id, "revision": revision, "content": content}
+
+
+@router.post("/{resume_id}/revisions/{revision}/restore", response_model=schemas.ResumeResponse)
+def restore_resume_revision(resume_id: int, revision: int, db: Session = Depends(get_db)):
+    """把简历内容恢复到指定修订，恢复本身记为一个新修订（历史不会被改写）。"""
+    db_resume = _get_resume_or_404(db, resume_id)
+    content = resume_revisions.checkout(db, resume_id, revision)
+    if content is None:
+        raise HTTPException(status_code=404, detail="修订不存在或已被清理")
+    if content != db_resume.content:
+        previous = db_resume.content
+        resume_revisions.ensure_initial(db, db_resume)
+        db_resume.content = content
+        db.commit()
+        db.refresh(db_resume)
+        resume_revisions.record(db, resume_id, content, source="restore", note=f"恢复自修订 {revision}", previous=previous)
+        export_cache.invalidate_resume(resume_id)
+    return db_resume
+
+
+@router.post("/{resume_id}/revisions/prune", response_model=schemas.ResumeRevisionPruneResponse)
+def prune_resume_revisions(
+    resume_id: int,
+    keep: int = Query(resume_revisions.KEEP, ge=0),
+    max_age_days: int = Query(resume_revisions.MAX_AGE_DAYS, ge=0),
+    db: Session = Depends(get_db),
+):
+    """清理旧修订：保留最近 keep 版（0 不限）、删除早于 max_age_days 天的（0 不限），最新一版始终保留。"""
+    _get_resume_or_404(db, resume_id)
+    deleted = resume_revisions.prune(db, resume_id, keep=keep, max_age_days=max_age_days)
+    return {"deleted": deleted, "storage_bytes": resume_revisions.storage_bytes(db, resume_id)}
@@ -1,7 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
 
+import llm_cache
+import mock_llm
+import provider_health
+import provider_limits
 from providers import PROVIDERS, get_api_key, load_settings, save_settings, sync_env_file, test_connection
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
@@ -13,10 +17,29 @@ class SettingsTest(BaseModel):
     api_key: Optional[str] = None
 
 
+class FallbackEntry(BaseModel):
+    provider: str
+    model: Optional[str] = None
+
+
+class RateLimit(BaseModel):
+    max_in_flight: Optional[int] = None
+    rpm: Optional[int] = None
+    tpm: Optional[int] = None
+
+
 class SettingsUpdate(BaseModel):
     provider: str
     model: str
     api_keys: Optional[Dict[str, str]] = None
+    # 不传则保持原值
+    fallback_chain: Optional[List[FallbackEntry]] = None
+    hedge_after_ms: Optional[int] = None
+    rate_limits: Optional[Dict[str, RateLimit]] = None
+    # 模型 id → {"input": 单价, "cached_input": 单价, "output": 单价}，每百万 token
+    prices: Optional[Dict[str, Dict[str, float]]] = None
+    # Mock Provider 行为（ttft_ms / tokens_per_s / response_tokens / error_rate / error_mode / seed）
+    mock: Optional[Dict[str, Any]] = None
 
 
 @router.get("")
@@ -31,10 +54,25 @@ def get_settings():
         "provider": settings["provider"],
         "model": settings["model"],
         "api_keys_set": masked,
+        "fallback_chain": settings.get("fallback_chain") or [],
+        "hedge_after_ms": settings.get("hedge_after_ms") or 0,
+        "rate_limits": settings.get("rate_limits") or {},
+        "prices": settings.get("prices") or {},
+        "mock": mock_llm.mock_config(settings) if mock_llm.ENABLED else None,
         "providers": PROVIDERS,
     }
 
 
+@router.get("/provider-health")
+def get_provider_health(limit: int = 50):
+    """各 Provider 熔断状态、调度队列（在途数、排队数、排队耗时）与最近的调用尝试。"""
+    return {
+        "breakers": provider_health.breaker_states(),
+        "queues": provider_limits.queue_states(),
+        "attempts": provider_health.recent_attempts(max(1, min(limit, provider_health.MAX_ATTEMPT_RECORDS))),
+    }
+
+
 @router.post("/test")
 async def test_api_connection(body: SettingsTest):
     """Test if the configured API key can connect successfully."""
@@ -51,6 +89,31 @@ def update_settings(body: SettingsUpdate):
     settings = load_settings()
     settings["provider"] = body.provider
     settings["model"] = body.model
+    if body.fallback_chain is not None:
+        unknown = [e.provider for e in body.fallback_chain if e.provider not in PROVIDERS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"不支持的 Provider: {', '.join(unknown)}")
+        settings["fallback_chain"] = [
+            {"provider": e.provider, "model": e.model or PROVIDERS[e.provider]["default_model"]}
+            for e in body.fallback_chain
+        ]
+    if body.hedge_after_ms is not None:
+        settings["hedge_after_ms"] = max(0, body.hedge_after_ms)
+    if body.rate_limits is not None:
+        unknown = [p for p in body.rate_limits if p not in PROVIDERS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"不支持的 Provider: {', '.join(unknown)}")
+        settings["rate_limits"] = {
+            p: {k: max(0, v) for k, v in limit.model_dump(exclude_none=True).items()}
+            for p, limit in body.rate_limits.items()
+        }
+    if body.prices is not None:
+        settings["prices"] = body.prices
+    if body.mock is not None:
+        try:
+            settings["mock"] = mock_llm.clean_mock_settings(body.mock)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     to_sync = {}
     if body.api_keys:
@@ -76,3 +139,9 @@ def clear_api_key(provider: str):
         save_settings(settings)
         sync_env_file({provider: ""})
     return {"message": f"API key for {provider} cleared"}
+
+
+@router.delete("/llm-cache")
+def clear_llm_cache():
+    """清空 complete_response 的响应缓存。"""
+    return {"message": "LLM cache cleared", "deleted": llm_cache.clear()}
@@ -1,19 +1,45 @@
+import asyncio
 import io
+import json
+import os
 import re
-from typing import Optional
+from typing import BinaryIO, List, Optional
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from jd_dedup import JobDedupIndex
+from job_artifacts import refresh_job_artifacts
+import models
+from ocr_pool import OcrQueueFull, ocr_pool
+from pdf_text import extract_pdf_text
 from resume_background_parser import parse_resume_pdf_to_background
+from upload_limits import EXTRACT_MAX_BYTES, PARSE_JOB_MAX_BYTES, RESUME_PDF_MAX_BYTES, open_upload
 
 router = APIRouter(prefix="/api/uploads", tags=["uploads"])
 
+# 批量导入 JD：单次最多文件数、同时解析的文件数
+IMPORT_MAX_FILES = int(os.environ.get("IMPORT_JOBS_MAX_FILES", "50"))
+IMPORT_CONCURRENCY = int(os.environ.get("IMPORT_JOBS_CONCURRENCY", "4"))
+
+
+class PdfPageInfo(BaseModel):
+    page: int
+    chars: int
+    scanned: bool
+    ms: float
+    engine: str
+
 
 class TextExtractResponse(BaseModel):
     filename: str
     text: str
     parser: str
+    # 仅 PDF：逐页抽取耗时、字数与是否扫描页（扫描页已单独 OCR）
+    pages: Optional[List[PdfPageInfo]] = None
 
 
 class ParseResumeBackgroundResponse(BaseModel):
@@ -30,29 +56,22 @@ class JobParseResponse(BaseModel):
     source: str
 
 
-def _extract_from_pdf(content: bytes) -> str:
-    from pypdf import PdfReader
+def _extract_from_pdf(fp: BinaryIO) -> str:
+    return extract_pdf_text(fp, ocr_scanned=True).text
 
-    reader = PdfReader(io.BytesIO(content))
-    parts = []
-    for page in reader.pages:
-        parts.append(page.extract_text() or "")
-    return "\n".join(parts).strip()
 
-
-def _extract_from_docx(content: bytes) -> str:
+def _extract_from_docx(fp: BinaryIO) -> str:
     from docx import Document
 
-    doc = Document(io.BytesIO(content))
+    doc = Document(fp)
     return "\n".join(p.text for p in doc.paragraphs if p.text).strip()
 
 
-def _ocr_from_image(content: bytes) -> str:
-    from PIL import Image
-    import pytesseract
+_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
 
-    image = Image.open(io.BytesIO(content))
-    return pytesseract.image_to_string(image, lang="chi_sim+eng").strip()
+def _ocr_from_image(fp: BinaryIO) -> str:
+    return ocr_pool.ocr_sync(fp.read())
 
 
 def _extract_from_plain_text(content: bytes) -> str:
@@ -67,19 +86,41 @@ def _extract_from_plain_text(content: bytes) -> str:
     return content.decode("utf-8", errors="replace").strip()
 
 
-def extract_text_from_file(filename: str, content: bytes):
+def extract_text_from_file(filename: str, fp: BinaryIO):
+    """fp：可 seek 的二进制文件对象（上传的临时文件），解析器直接从中读取。"""
     lower = filename.lower()
     if lower.endswith((".txt", ".md", ".markdown")):
-        return _extract_from_plain_text(content), "text_plain"
+        return _extract_from_plain_text(fp.read()), "text_plain"
     if lower.endswith(".pdf"):
-        return _extract_from_pdf(content), "pdf"
+        return _extract_from_pdf(fp), "pdf"
     if lower.endswith(".doc") or lower.endswith(".docx"):
-        return _extract_from_docx(content), "word"
-    if lower.endswith((".png", ".jpg", ".jpeg", ".bmp", ".webp")):
-        return _ocr_from_image(content), "ocr"
+        return _extract_from_docx(fp), "word"
+    if lower.endswith(_IMAGE_SUFFIXES):
+        return _ocr_from_image(fp), "ocr"
     raise HTTPException(status_code=400, detail="仅支持 PDF/Word/图片/纯文本(.txt、.md) 文件")
 
 
+async def extract_text_from_upload(filename: str, fp: BinaryIO):
+    """异步接口用：图片交给 OCR 进程池（切片并行 + 缓存），其余格式在线程池中解析，不阻塞事件循环。
+    返回 (文本, parser, PDF 逐页信息或 None)；OCR 队列已满（图片或 PDF 扫描页）时转为 429。"""
+    lower = filename.lower()
+    try:
+        if lower.endswith(_IMAGE_SUFFIXES):
+            return await ocr_pool.ocr(fp.read()), "ocr", None
+        if lower.endswith(".pdf"):
+            # 扫描页的 OCR 同样占用 OCR 队列
+            result = await run_in_threadpool(extract_pdf_text, fp, True)
+            return result.text, "pdf", result.page_report()
+    except OcrQueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail="图片识别任务繁忙，请稍后重试",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    text, parser = await run_in_threadpool(extract_text_from_file, filename, fp)
+    return text, parser, None
+
+
 def _parse_job_fields(text: str) -> JobParseResponse:
     lines = [line.strip() for line in text.splitlines() if line.strip()]
     title = ""
@@ -113,11 +154,8 @@ async def parse_resume_background(file: UploadFile = File(...)):
     if not name.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="仅支持 PDF 简历文件")
 
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="上传文件为空")
-
-    text, parser, warning = parse_resume_pdf_to_background(content)
+    fp = open_upload(file, RESUME_PDF_MAX_BYTES)
+    text, parser, warning = parse_resume_pdf_to_background(fp)
     return ParseResumeBackgroundResponse(
         filename=file.filename or "resume.pdf",
         text=text,
@@ -128,29 +166,191 @@ async def parse_resume_background(file: UploadFile = File(...)):
 
 @router.post("/extract", response_model=TextExtractResponse)
 async def extract_text(file: UploadFile = File(...)):
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="上传文件为空")
+    fp = open_upload(file, EXTRACT_MAX_BYTES)
     try:
-        text, parser = extract_text_from_file(file.filename or "", content)
+        text, parser, pages = await extract_text_from_upload(file.filename or "", fp)
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"文件解析失败: {exc}") from exc
 
     if not text:
         raise HTTPException(status_code=400, detail="未提取到文本，请检查文件清晰度")
 
-    return TextExtractResponse(filename=file.filename or "", text=text, parser=parser)
+    return TextExtractResponse(filename=file.filename or "", text=text, parser=parser, pages=pages)
 
 
 @router.post("/parse-job", response_model=JobParseResponse)
 async def parse_job(file: UploadFile = File(...)):
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="上传文件为空")
+    fp = open_upload(file, PARSE_JOB_MAX_BYTES)
     try:
-        text, _ = extract_text_from_file(file.filename or "", content)
+        text, _, _ = await extract_text_from_upload(file.filename or "", fp)
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"JD解析失败: {exc}") from exc
     if not text:
         raise HTTPException(status_code=400, detail="未提取到JD文本")
     return _parse_job_fields(text)
+
+
+async def _extract_with_retry(filename: str, fp: BinaryIO):
+    """批量导入用：OCR 队列满时按 Retry-After 等待重试，而不是让该文件失败。"""
+    while True:
+        try:
+            return await extract_text_from_upload(filename, fp)
+        except HTTPException as e:
+            if e.status_code != 429:
+                raise
+            fp.seek(0)
+            await asyncio.sleep(int((e.headers or {}).get("Retry-After", "1")))
+
+
+def _load_job_index() -> JobDedupIndex:
+    index = JobDedupIndex()
+    db = SessionLocal()
+    try:
+        for job_id, content in db.query(models.Job.id, models.Job.content).all():
+            index.add(job_id, content or "")
+    finally:
+        db.close()
+    return index
+
+
+def _insert_jobs(rows: List[dict]) -> List[int]:
+    """全部新岗位在同一个事务中写入；任一失败则整体回滚。"""
+    db = SessionLocal()
+    try:
+        jobs = [models.Job(**row) for row in rows]
+        db.add_all(jobs)
+        db.flush()
+        for job in jobs:
+            refresh_job_artifacts(db, job, commit=False)
+        db.commit()
+        return [j.id for j in jobs]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def _import_jobs_stream(items: list, competency_profile: str, dry_run: bool):
+    """每个文件解析完成即推送一条 file 事件（new / duplicate / error），最后一次性入库并推送 done。"""
+    tasks: List[asyncio.Future] = []
+    # 正在线程中解析的文件序号：这些任务即使取消，线程里的解析仍会继续读文件
+    extracting: set = set()
+    try:
+        index = await run_in_threadpool(_load_job_index)
+        sem = asyncio.Semaphore(max(1, IMPORT_CONCURRENCY))
+
+        async def process(i: int, filename: str, fp: Optional[BinaryIO], error: Optional[str]):
+            if error:
+                return i, filename, None, error
+            async with sem:
+                extracting.add(i)
+                try:
+                    text, _, _ = await _extract_with_retry(filename, fp)
+                except HTTPException as e:
+                    return i, filename, None, str(e.detail)
+                except Exception as e:
+                    return i, filename, None, f"JD解析失败: {e}"
+                finally:
+                    extracting.discard(i)
+            if not text:
+                return i, filename, None, "未提取到JD文本"
+            return i, filename, text, None
+
+        tasks = [asyncio.ensure_future(process(*item)) for item in items]
+        new_rows: List[dict] = []
+        new_files: List[dict] = []
+        for coro in asyncio.as_completed(tasks):
+            i, filename, text, error = await coro
+            event = {"type": "file", "index": i, "filename": filename}
+            if error:
+                event.update(status="error", detail=error)
+                yield f"data: {json.dumps(event)}\n\n"
+                continue
+            fields = _parse_job_fields(text)
+            event.update(title=fields.title, company=fields.company)
+            match = index.find(text)
+            if match is not None:
+                # ref 为 int 表示已有岗位 id，为 str 表示同批中先导入的文件
+                dup = {"job_id": match.ref} if isinstance(match.ref, int) else {"filename": match.ref}
+                event.update(status="duplicate", exact=match.exact, similarity=match.similarity, duplicate_of=dup)
+            else:
+                index.add(filename, text)
+                event.update(status="new")
+                new_rows.append(
+                    {
+                        "title": fields.title,
+                        "company": fields.company,
+                        "content": fields.content,
+                        "competency_profile": competency_profile,
+                        "status": "pending",
+                    }
+                )
+                new_files.append({"index": i, "filename": filename, "title": fields.title})
+            yield f"data: {json.dumps(event)}\n\n"
+
+        created = new_files
+        if new_rows and not dry_run:
+            try:
+                ids = await run_in_threadpool(_insert_jobs, new_rows)
+            except Exception as e:
+                yield f"data: {json.dumps({'type': 'error', 'message': f'岗位入库失败: {e}'})}\n\n"
+                return
+            created = [{**f, "job_id": job_id} for f, job_id in zip(new_files, ids)]
+        done = {
+            "type": "done",
+            "dry_run": dry_run,
+            "created": created,
+            "total": len(items),
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+    finally:
+        # 客户端断开时：取消还在排队的解析，等已在线程中解析的文件跑完，再关闭文件
+        for item, task in zip(items, tasks):
+            if item[0] not in extracting:
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for _, _, fp, _ in items:
+            if fp is not None:
+                fp.close()
+
+
+@router.post("/import-jobs")
+async def import_jobs(
+    files: List[UploadFile] = File(...),
+    competency_profile: str = Form("default"),
+    dry_run: bool = Form(False),
+):
+    """
+    批量导入 JD（PDF / Word / 图片 / 纯文本，可混合）：并行解析，逐文件 SSE 推送进度；
+    与已有岗位及同批文件做完全重复 / 近似重复检测，新岗位在同一事务中写入。
+    dry_run=true 时只解析与查重，不入库。
+    """
+    if len(files) > IMPORT_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"单次最多导入 {IMPORT_MAX_FILES} 个文件")
+    items = []
+    for i, file in enumerate(files):
+        filename = file.filename or f"file_{i + 1}"
+        try:
+            fp = open_upload(file, PARSE_JOB_MAX_BYTES)
+        except HTTPException as e:
+            items.append((i, filename, None, str(e.detail)))
+            continue
+        # 接口返回后 FastAPI 会关闭上传文件，而解析在流式响应中进行：
+        # 先接管底层临时文件（留一个空占位给 FastAPI 关闭），由流结束时自行关闭
+        file.file = io.BytesIO()
+        items.append((i, filename, fp, None))
+
+    return StreamingResponse(
+        _import_jobs_stream(items, competency_profile, dry_run),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -39,6 +39,17 @@ class JobResponse(JobBase):
         from_attributes = True
 
 
+class JobArtifactResponse(BaseModel):
+    job_id: int
+    content_hash: str
+    # 分段：overview / responsibilities / requirements / bonus / other → 条目列表
+    sections: Dict[str, List[str]]
+    keywords: List[str]
+    summary: Optional[str] = None
+    # 面试模拟 / 复盘 / 评分卡提示词实际使用的精简 JD（分段失败时为 None，回退原文）
+    compact: Optional[str] = None
+
+
 class ResumeBase(BaseModel):
     title: Optional[str] = None
     content: str
@@ -68,6 +79,40 @@ class ResumeResponse(ResumeBase):
         from_attributes = True
 
 
+class ResumeRevisionItem(BaseModel):
+    revision: int
+    # snapshot（全文快照）/ delta（相对上一版的差异）
+    kind: str
+    size_bytes: int
+    content_length: int
+    content_sha: str
+    # create / edit / chat / restore / initial
+    source: str
+    note: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ResumeRevisionListResponse(BaseModel):
+    resume_id: int
+    # 所有修订压缩后的总存储字节数
+    storage_bytes: int
+    revisions: List[ResumeRevisionItem]
+
+
+class ResumeRevisionContentResponse(BaseModel):
+    resume_id: int
+    revision: int
+    content: str
+
+
+class ResumeRevisionPruneResponse(BaseModel):
+    deleted: int
+    storage_bytes: int
+
+
 class ConversationCreate(BaseModel):
     resume_id: int
 
@@ -87,6 +132,8 @@ class ChatRequest(BaseModel):
     job_id: int
     messages: List[MessageItem]
     user_background: Optional[str] = None
+    # 为 true 时服务端在简历块闭合时直接写回 resume_id 对应简历（记为 chat 修订），并在 resume 事件中返回
+    save_resume: bool = False
 
 
 class InterviewSimRequest(BaseModel):
@@ -97,6 +144,8 @@ class InterviewSimRequest(BaseModel):
     user_background: Optional[str] = None
     # 本场抽样题单 Markdown，每轮请求一并传入以无状态推进
     questionnaire_markdown: Optional[str] = None
+    # 抽样题单时返回的会话 id；传入后服务端追踪题目覆盖并只注入剩余题目（会话失效时回退到 questionnaire_markdown）
+    session_id: Optional[str] = None
 
 
 class QuestionnaireItemResponse(BaseModel):
@@ -109,6 +158,20 @@ class QuestionnaireResponse(BaseModel):
     categories_used: List[str]
     items: List[QuestionnaireItemResponse]
     questionnaire_markdown: str
+    # 题单覆盖度追踪会话，模拟面试每轮请求带上
+    session_id: Optional[str] = None
+
+
+class CoveredQuestion(BaseModel):
+    id: str
+    turn: int
+
+
+class QuestionCoverageResponse(BaseModel):
+    total: int
+    covered: List[CoveredQuestion]
+    remaining: List[str]
+    turns_seen: int
 
 
 class JobInterviewBankMetaResponse(BaseModel):
@@ -122,6 +185,8 @@ class GenerateInterviewBankRequest(BaseModel):
     background_profile_id: int
     # True：生成前清空该岗位已有专属题；False：在原有基础上追加
     replace: bool = False
+    # True：跳过 LLM 响应缓存，强制重新生成
+    no_cache: bool = False
 
 
 class GenerateInterviewBankResponse(BaseModel):
@@ -198,6 +263,7 @@ class EvaluationScorecardRequest(BaseModel):
     resume_id: int
     transcript: Optional[str] = None
     user_background: Optional[str] = None
+    no_cache: bool = False
 
 
 class EvaluationScorecardResponse(BaseModel):
@@ -224,10 +290,33 @@ class InterviewReportRequest(BaseModel):
     resume_id: int
     messages: List[MessageItem]
     user_background: Optional[str] = None
+    no_cache: bool = False
 
 
 class InterviewReportResponse(BaseModel):
     report: str
+    # 已入库的复盘报告 id（evaluation_reports，report_type=interview_report）
+    report_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
+class InterviewReportListItem(BaseModel):
+    id: int
+    job_id: int
+    resume_id: Optional[int] = None
+    created_at: datetime
+
+
+class ExportBundleRequest(BaseModel):
+    # 三选一（可组合）：岗位下全部简历 / 某人物背景档案的全部简历 / 指定简历 id
+    job_id: Optional[int] = None
+    profile_id: Optional[int] = None
+    resume_ids: Optional[List[int]] = None
+    # pdf / docx / md，可多选
+    formats: List[str] = ["pdf"]
+    pdf_font_size: int = 10
+    word_font_size: int = 11
+    margin_cm: float = 2.0
 
 
 class ConversationResponse(BaseModel):
@@ -0,0 +1,228 @@
+"""
+前端静态资源（frontend/dist）：预压缩 + 内容协商 + 缓存头。
+
+- 压缩：优先使用构建产物旁的 .br / .gz 文件（如 `python static_assets.py ../frontend/dist` 或构建插件生成），
+  没有时在首次请求时压缩并缓存在内存（总量上限 STATIC_COMPRESS_CACHE_MB）；brotli 需安装 `brotli` 包，未安装只提供 gzip；
+- 协商：按 Accept-Encoding（含 q 值）选 br > gzip > 原文，响应带 Vary: Accept-Encoding，各编码使用不同 ETag；
+- 缓存：/assets 挂载（immutable_hashed=True）下文件名带内容哈希的资源（Vite 的 /assets/*-<hash>.js）为 `max-age=1 年, immutable`；
+  dist 根目录的文件（favicon、apple-touch-icon.png 等固定文件名）与其余资源一律 no-cache 并靠 ETag 304；
+- index.html 常驻内存（连同压缩版本），每次请求只 stat 一次判断是否重新构建过，If-None-Match 命中返回 304。
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import stat
+import sys
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from compression import available_encodings, compress, negotiate
+from export_cache import etag_matches
+
+# 可调参数（环境变量可覆盖）
+MEMORY_CACHE_BYTES = int(float(os.environ.get("STATIC_COMPRESS_CACHE_MB", "32")) * 1024 * 1024)
+MIN_COMPRESS_BYTES = 1024
+# 静态资源只压缩一次，取最高压缩率
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+COMPRESSIBLE_SUFFIXES = frozenset({".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".wasm", ".ico"})
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+# Vite 默认产物名：name-<8 位以上 base64url 哈希>.ext；哈希段须含数字或大写字母，排除 my-component.css 这类普通单词
+HASHED_NAME_RE = re.compile(r"[-.](?=[A-Za-z0-9_-]*[0-9A-Z])[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+
+def _compressible(path: str, size: int) -> bool:
+    return size >= MIN_COMPRESS_BYTES and os.path.splitext(path)[1].lower() in COMPRESSIBLE_SUFFIXES
+
+
+def cache_control_for(path: str, immutable_hashed: bool = True) -> str:
+    """只有构建工具产出的目录（/assets）才信任文件名哈希；根目录的 android-chrome-192x192.png 之类也会匹配到正则。"""
+    if immutable_hashed and HASHED_NAME_RE.search(os.path.basename(path)):
+        return IMMUTABLE_CACHE
+    return REVALIDATE_CACHE
+
+
+class _CompressedCache:
+    """首次请求时压缩的结果：键含 mtime 与大小，文件重新构建后自然失效；按字节数 LRU 淘汰。"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._items: "OrderedDict[tuple, Optional[bytes]]" = OrderedDict()
+
+    def get(self, key: tuple):
+        if key not in self._items:
+            return False, None
+        self._items.move_to_end(key)
+        return True, self._items[key]
+
+    def put(self, key: tuple, value: Optional[bytes]) -> None:
+        size = len(value) if value else 0
+        if size > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        self.total -= len(old) if old else 0
+        self._items[key] = value
+        self.total += size
+        while self.total > self.max_bytes and self._items:
+            _, evicted = self._items.popitem(last=False)
+            self.total -= len(evicted) if evicted else 0
+
+
+_compressed_cache = _CompressedCache(MEMORY_CACHE_BYTES)
+
+
+async def _encoded_body(full_path: str, stat_result: os.stat_result, encoding: str) -> Tuple[Optional[str], Optional[bytes]]:
+    """返回 (预压缩文件路径, None) 或 (None, 内存中的压缩字节)；压缩收益不足时返回 (None, None)。"""
+    sibling = full_path + _SUFFIX[encoding]
+    try:
+        sib_stat = os.stat(sibling)
+        if stat.S_ISREG(sib_stat.st_mode) and sib_stat.st_mtime >= stat_result.st_mtime:
+            return sibling, None
+    except OSError:
+        pass
+    if encoding not in available_encodings():
+        return None, None
+
+    key = (full_path, stat_result.st_mtime_ns, stat_result.st_size, encoding)
+    found, body = _compressed_cache.get(key)
+    if not found:
+        def _read_and_compress() -> Optional[bytes]:
+            with open(full_path, "rb") as f:
+                raw = f.read()
+            packed = compress(raw, encoding, GZIP_LEVEL, BROTLI_QUALITY)
+            # 压缩后仍超过原文 90% 的（已压缩格式）不值得，直接发原文
+            return packed if len(packed) < len(raw) * 0.9 else None
+
+        body = await run_in_threadpool(_read_and_compress)
+        _compressed_cache.put(key, body)
+    return None, body
+
+
+class CompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles + 压缩协商 + 缓存头；Range 请求与不可压缩的文件按原样返回。
+    immutable_hashed=True 仅用于构建产物目录：带哈希的文件名返回 immutable 长缓存，否则一律 no-cache + ETag。
+    """
+
+    def __init__(self, *args, immutable_hashed: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_hashed = immutable_hashed
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        cache_control = cache_control_for(path, self.immutable_hashed)
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            if response.status_code == 304:
+                response.headers["Cache-Control"] = cache_control
+            return response
+
+        response.headers["Cache-Control"] = cache_control
+        full_path, stat_result = str(response.path), response.stat_result
+        if stat_result is None or not _compressible(full_path, stat_result.st_size):
+            return response
+        response.headers["Vary"] = "Accept-Encoding"
+        request_headers = Headers(scope=scope)
+        if "range" in request_headers:
+            return response
+
+        # br 可能只有构建时生成的 .br 文件（未安装 brotli 包），拿不到时退回 gzip
+        accept = request_headers.get("accept-encoding", "")
+        offered: Tuple[str, ...] = ("br", "gzip")
+        while True:
+            encoding = negotiate(accept, offered)
+            if encoding is None:
+                return response
+            sibling, body = await _encoded_body(full_path, stat_result, encoding)
+            if sibling is not None or body is not None:
+                break
+            offered = tuple(e for e in offered if e != encoding)
+
+        etag = response.headers["etag"].rstrip('"') + f'-{encoding}"'
+        headers = {
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+            "ETag": etag,
+            "Last-Modified": response.headers["last-modified"],
+            "Content-Encoding": encoding,
+        }
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            headers.pop("Content-Encoding")
+            return Response(status_code=304, headers=headers)
+        if sibling is not None:
+            return FileResponse(sibling, media_type=response.media_type, headers=headers)
+        return Response(body, media_type=response.media_type, headers=headers)
+
+
+class SpaIndex:
+    """index.html 常驻内存：原文与各压缩版本及 ETag 在文件变化（重新构建）时才重建。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime_ns: Optional[int] = None
+        self._variants: Dict[Optional[str], Tuple[bytes, str]] = {}
+
+    def _load(self) -> None:
+        st = os.stat(self.path)
+        if st.st_mtime_ns == self._mtime_ns:
+            return
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()[:16]
+        variants: Dict[Optional[str], Tuple[bytes, str]] = {None: (raw, f'"{digest}"')}
+        for enc in available_encodings():
+            variants[enc] = (compress(raw, enc, GZIP_LEVEL, BROTLI_QUALITY), f'"{digest}-{enc}"')
+        self._variants = variants
+        self._mtime_ns = st.st_mtime_ns
+
+    def response(self, headers: Headers) -> Response:
+        self._load()
+        encoding = negotiate(headers.get("accept-encoding", ""), available_encodings())
+        body, etag = self._variants[encoding]
+        out = {"Cache-Control": REVALIDATE_CACHE, "Vary": "Accept-Encoding", "ETag": etag}
+        if etag_matches(headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=out)
+        if encoding is not None:
+            out["Content-Encoding"] = encoding
+        return Response(body, media_type="text/html", headers=out)
+
+
+def precompress_dir(directory: str) -> List[str]:
+    """构建后预压缩：为可压缩文件生成 .gz（装了 brotli 时另生成 .br），跳过已是最新的文件。"""
+    written = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            full = os.path.join(root, name)
+            if name.endswith((".gz", ".br")) or not _compressible(full, os.path.getsize(full)):
+                continue
+            with open(full, "rb") as f:
+                raw = f.read()
+            for enc in available_encodings():
+                target = full + _SUFFIX[enc]
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(full):
+                    continue
+                packed = compress(raw, enc, GZIP_LEVEL, BROTLI_QUALITY)
+                if len(packed) >= len(raw) * 0.9:
+                    continue
+                with open(target, "wb") as f:
+                    f.write(packed)
+                written.append(target)
+    return written
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
+    for p in precompress_dir(target):
+        print(p)
@@ -0,0 +1,283 @@
+"""
+进程内指标：Counter / Gauge / Histogram，以 Prometheus 文本格式在 /metrics 导出，不依赖外部服务或第三方库。
+
+- HTTP：按路由模板统计请求耗时（SSE 单独统计流时长与在途数）；
+- 运行时：事件循环延迟、线程池占用（anyio 默认 limiter）、SQL 查询次数与耗时（SQLAlchemy 事件钩子）；
+- 业务热路径：导出渲染、PDF 抽字、OCR、LLM 首 token 时间与输出速度（由各模块调用 observe 上报）。
+记录一次观测只是加锁后更新几个数字；METRICS_ENABLED=0 时不注册中间件与钩子。
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 可调参数（环境变量可覆盖）
+ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+LOOP_LAG_INTERVAL_S = float(os.environ.get("EVENT_LOOP_LAG_INTERVAL_S", "0.5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+RATE_BUCKETS = (1, 5, 10, 20, 40, 80, 160, 320)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_label_str(self.labelnames, labels)} {_fmt(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels → [各桶计数..., +Inf 计数, 总和]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 2)
+            row[idx] += 1
+            row[-1] += value
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(labels, list(row)) for labels, row in self._values.items()]
+        for labels, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += n
+                le = 'le="%s"' % _fmt(bound)
+                yield f"{self.name}_bucket{_label_str(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_str(self.labelnames, labels)} {_fmt(row[-1])}"
+            yield f"{self.name}_count{_label_str(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        # 抓取前调用的采集函数：把线程池占用、调度队列等瞬时值写入对应 Gauge
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn: Callable[[], None]) -> None:
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception:
+                # 采集失败不影响其余指标输出
+                pass
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route (SSE excluded)", ("method", "route", "status")))
+HTTP_IN_FLIGHT = registry.register(Gauge("http_requests_in_flight", "HTTP requests being served"))
+SSE_IN_FLIGHT = registry.register(Gauge("sse_streams_in_flight", "Open server-sent event streams", ("route",)))
+SSE_DURATION = registry.register(Histogram(
+    "sse_stream_duration_seconds", "Server-sent event stream lifetime", ("route",), SLOW_BUCKETS))
+LOOP_LAG = registry.register(Histogram(
+    "event_loop_lag_seconds", "Event loop scheduling delay", (), (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+THREADPOOL_IN_USE = registry.register(Gauge("threadpool_tokens_in_use", "Busy worker threads in the default threadpool"))
+THREADPOOL_TOTAL = registry.register(Gauge("threadpool_tokens_total", "Size of the default threadpool"))
+DB_QUERY = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("operation",), DB_BUCKETS))
+EXPORT_RENDER = registry.register(Histogram(
+    "export_render_seconds", "PDF / Word render time", ("format",), SLOW_BUCKETS))
+EXPORT_QUEUE_WAIT = registry.register(Histogram(
+    "export_queue_wait_seconds", "Time an export waited for a render worker", ("format",)))
+PDF_EXTRACT = registry.register(Histogram(
+    "pdf_extract_seconds", "PDF text extraction time per document", ("engine",), SLOW_BUCKETS))
+OCR_DURATION = registry.register(Histogram(
+    "ocr_seconds", "Image OCR time (cache misses only)", ("mode",), SLOW_BUCKETS))
+LLM_TTFT = registry.register(Histogram(
+    "llm_time_to_first_token_seconds", "LLM time to first token", ("provider",), SLOW_BUCKETS))
+LLM_TOKENS_PER_SECOND = registry.register(Histogram(
+    "llm_output_tokens_per_second", "LLM output speed after the first token", ("provider",), RATE_BUCKETS))
+LLM_ATTEMPTS = registry.register(Counter("llm_attempts_total", "LLM provider attempts by outcome", ("provider", "outcome")))
+LLM_QUEUE_DEPTH = registry.register(Gauge("llm_queue_depth", "LLM calls waiting for a provider slot", ("provider", "priority")))
+LLM_IN_FLIGHT = registry.register(Gauge("llm_in_flight", "LLM calls holding a provider slot", ("provider",)))
+
+
+def observe_llm_attempt(provider: str, outcome: str, ttft_ms: Optional[float],
+                        duration_ms: Optional[float], output_tokens: int) -> None:
+    LLM_ATTEMPTS.inc((provider, outcome))
+    if outcome != "ok" or ttft_ms is None:
+        return
+    LLM_TTFT.observe(ttft_ms / 1000, (provider,))
+    streaming_s = ((duration_ms or 0) - ttft_ms) / 1000
+    if output_tokens > 0 and streaming_s > 0:
+        LLM_TOKENS_PER_SECOND.observe(output_tokens / streaming_s, (provider,))
+
+
+def _collect_threadpool() -> None:
+    from anyio.to_thread import current_default_thread_limiter
+
+    limiter = current_default_thread_limiter()
+    THREADPOOL_IN_USE.set(limiter.borrowed_tokens)
+    THREADPOOL_TOTAL.set(limiter.total_tokens)
+
+
+def _collect_llm_queues() -> None:
+    from provider_limits import queue_states
+
+    for provider, state in queue_states().items():
+        LLM_IN_FLIGHT.set(state["in_flight"], (provider,))
+        for priority, n in state["queued"].items():
+            LLM_QUEUE_DEPTH.set(n, (provider, priority))
+
+
+registry.add_collector(_collect_threadpool)
+registry.add_collector(_collect_llm_queues)
+
+
+def instrument_engine(engine) -> None:
+    """SQLAlchemy 事件钩子：按语句类型（SELECT / INSERT / ...）统计执行耗时。"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_query_t0")
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+        head = statement.lstrip()[:8].split(None, 1)
+        op = head[0].upper() if head else "OTHER"
+        if op not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+            op = "OTHER"
+        DB_QUERY.observe(elapsed, (op,))
+
+
+async def monitor_event_loop_lag(interval: float = LOOP_LAG_INTERVAL_S) -> None:
+    """定时 sleep，实际唤醒时间超出预期的部分即事件循环被阻塞的时长。"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件：路由模板作为标签（未匹配的路径统一记为 unmatched，避免标签基数膨胀）。"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        t0 = time.perf_counter()
+        status = "500"
+        sse_route: Optional[str] = None
+
+        def route_of() -> str:
+            route = scope.get("route")
+            return getattr(route, "path", None) or "unmatched"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, sse_route
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        sse_route = route_of()
+                        SSE_IN_FLIGHT.inc((sse_route,))
+                        break
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - t0
+            if sse_route is not None:
+                SSE_IN_FLIGHT.dec((sse_route,))
+                SSE_DURATION.observe(elapsed, (sse_route,))
+            else:
+                HTTP_DURATION.observe(elapsed, (scope["method"], route_of(), status))
@@ -0,0 +1,89 @@
+"""
+上传大小限制：按接口配置上限，在请求体读入之前就拒绝超限上传。
+
+- Content-Length 已声明且超限：直接 413，不读取请求体；
+- 未声明（分块传输）或声明不实：边接收边计数，超过上限立即中断并返回 413；
+- 通过检查的文件由 Starlette 解析为 SpooledTemporaryFile（超过 1MB 自动落盘），
+  接口直接把该文件对象交给解析器，不再 `await file.read()` 整体读入内存。
+"""
+from __future__ import annotations
+
+import os
+from typing import BinaryIO, Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 可调参数（环境变量可覆盖，单位 MB）
+EXTRACT_MAX_BYTES = int(float(os.environ.get("UPLOAD_EXTRACT_MAX_MB", "20")) * 1024 * 1024)
+PARSE_JOB_MAX_BYTES = int(float(os.environ.get("UPLOAD_PARSE_JOB_MAX_MB", "10")) * 1024 * 1024)
+RESUME_PDF_MAX_BYTES = int(float(os.environ.get("UPLOAD_RESUME_PDF_MAX_MB", "10")) * 1024 * 1024)
+# 批量导入：整个请求体的上限（单个文件仍受 PARSE_JOB_MAX_BYTES 限制）
+IMPORT_JOBS_MAX_BYTES = int(float(os.environ.get("UPLOAD_IMPORT_JOBS_MAX_MB", "100")) * 1024 * 1024)
+# multipart 边界、字段头等额外开销
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# 接口路径 → 上传大小上限（字节；单文件接口即单个文件上限）
+UPLOAD_LIMITS: Dict[str, int] = {
+    "/api/uploads/extract": EXTRACT_MAX_BYTES,
+    "/api/uploads/parse-job": PARSE_JOB_MAX_BYTES,
+    "/api/uploads/parse-resume-background": RESUME_PDF_MAX_BYTES,
+    "/api/uploads/import-jobs": IMPORT_JOBS_MAX_BYTES,
+}
+
+
+def _too_large_detail(limit: int) -> str:
+    return f"上传文件过大，请小于 {limit / (1024 * 1024):g}MB"
+
+
+class UploadLimitMiddleware:
+    """纯 ASGI 中间件：只拦截 UPLOAD_LIMITS 中登记的 POST 接口，其余请求原样透传。"""
+
+    def __init__(self, app: ASGIApp, limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.limits = UPLOAD_LIMITS if limits is None else limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        limit = self.limits.get(scope["path"].rstrip("/"))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        body_limit = limit + MULTIPART_OVERHEAD_BYTES
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > body_limit:
+            response = JSONResponse({"detail": _too_large_detail(limit)}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > body_limit:
+                    # 在表单解析过程中抛出，FastAPI 会原样转为 413 响应
+                    raise HTTPException(status_code=413, detail=_too_large_detail(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def open_upload(file: UploadFile, max_bytes: int) -> BinaryIO:
+    """校验单个文件大小并返回已定位到开头的文件对象（内存或临时文件，不复制）。"""
+    size = file.size
+    if size is None:
+        file.file.seek(0, os.SEEK_END)
+        size = file.file.tell()
+    if size > max_bytes:
+        raise HTTPException(status_code=413, detail=_too_large_detail(max_bytes))
+    if size == 0:
+        raise HTTPException(status_code=400, detail="上传文件为空")
+    file.file.seek(0)
+    return file.file
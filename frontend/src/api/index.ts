@@ -86,6 +86,14 @@ export const deleteResume = async (id: number): Promise<void> => {
 };
 
 // Chat streaming
+/** 服务端识别到完整简历块时推送；saveResume 为 true 且保存成功时 saved=true、resume 为更新后的简历 */
+export interface ChatResumeEvent {
+  content: string;
+  saved: boolean;
+  revision: number | null;
+  resume: Resume | null;
+}
+
 export const streamChat = async (
   jobId: number,
   resumeId: number,
@@ -94,6 +102,9 @@ export const streamChat = async (
   onDone: () => void,
   onError: (err: Error) => void,
   userBackground?: string,
+  onResume?: (event: ChatResumeEvent) => void,
+  saveResume = false,
+  onTruncated?: (reason: string) => void,
 ): Promise<void> => {
   try {
     const res = await fetch(`${BASE_URL}/chat/stream`, {
@@ -104,6 +115,7 @@ export const streamChat = async (
         resume_id: resumeId,
         messages,
         user_background: userBackground,
+        save_resume: saveResume,
       }),
     });
 
@@ -129,6 +141,10 @@ export const streamChat = async (
             const data = JSON.parse(line.slice(6));
             if (data.type === 'text') {
               onChunk(data.content);
+            } else if (data.type === 'resume') {
+              onResume?.(data);
+            } else if (data.type === 'truncated') {
+              onTruncated?.(data.reason);
             } else if (data.type === 'done') {
               onDone();
             }
@@ -153,6 +169,8 @@ export interface QuestionnaireApiResponse {
   categories_used: string[];
   items: QuestionnaireItem[];
   questionnaire_markdown: string;
+  /** 题单覆盖度追踪会话；模拟面试每轮带上，服务端只注入剩余题目 */
+  session_id?: string | null;
 }
 
 export const fetchQuestionCategories = async (): Promise<{ categories: string[] }> => {
@@ -333,6 +351,15 @@ export const deleteJobInterviewQuestion = async (params: {
 };
 
 /** 面试模拟：流式，输出格式含 <<<REACTION>>> / <<<SPEECH>>> */
+/** 题单覆盖度：每轮面试官发言结束后由 coverage 事件推送，也可 GET /interview-sim/coverage/{session_id} 获取 */
+export interface InterviewCoverage {
+  total: number;
+  covered: Array<{ id: string; turn: number }>;
+  remaining: string[];
+  turns_seen: number;
+  newly_covered?: string[];
+}
+
 export const streamInterviewSim = async (
   jobId: number,
   resumeId: number,
@@ -342,6 +369,8 @@ export const streamInterviewSim = async (
   onError: (err: Error) => void,
   userBackground?: string,
   questionnaireMarkdown?: string | null,
+  sessionId?: string | null,
+  onCoverage?: (coverage: InterviewCoverage) => void,
 ): Promise<void> => {
   try {
     const body: Record<string, unknown> = {
@@ -353,6 +382,9 @@ export const streamInterviewSim = async (
     if (questionnaireMarkdown && questionnaireMarkdown.trim()) {
       body.questionnaire_markdown = questionnaireMarkdown.trim();
     }
+    if (sessionId) {
+      body.session_id = sessionId;
+    }
     const res = await fetch(`${BASE_URL}/interview-sim/stream`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
@@ -384,6 +416,8 @@ export const streamInterviewSim = async (
             const data = JSON.parse(line.slice(6));
             if (data.type === 'text') {
               onChunk(data.content);
+            } else if (data.type === 'coverage') {
+              onCoverage?.(data);
             } else if (data.type === 'done') {
               onDone();
             }
@@ -421,6 +455,69 @@ export const fetchInterviewReport = async (params: {
   return res.json();
 };
 
+/** 复盘报告：流式生成；done 事件携带已入库的 report_id */
+export const streamInterviewReport = async (
+  params: {
+    jobId: number;
+    resumeId: number;
+    messages: Message[];
+    userBackground?: string;
+  },
+  onChunk: (text: string) => void,
+  onDone: (reportId: number | null) => void,
+  onError: (err: Error) => void,
+): Promise<void> => {
+  try {
+    const res = await fetch(`${BASE_URL}/interview-sim/report/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        job_id: params.jobId,
+        resume_id: params.resumeId,
+        messages: params.messages,
+        user_background: params.userBackground,
+      }),
+    });
+
+    if (!res.ok) {
+      const errText = await res.text().catch(() => '');
+      throw new Error(errText || 'Report request failed');
+    }
+
+    const reader = res.body?.getReader();
+    if (!reader) throw new Error('No response body');
+
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() || '';
+
+      for (const line of lines) {
+        if (line.startsWith('data: ')) {
+          try {
+            const data = JSON.parse(line.slice(6));
+            if (data.type === 'text') {
+              onChunk(data.content);
+            } else if (data.type === 'done') {
+              onDone(data.report_id ?? null);
+            }
+          } catch {
+            // ignore
+          }
+        }
+      }
+    }
+  } catch (err) {
+    onError(err instanceof Error ? err : new Error(String(err)));
+  }
+};
+
 export interface EvaluationScorecardApiResponse {
   overall_score: number;
   overall_summary: string;
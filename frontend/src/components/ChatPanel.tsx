@@ -4,6 +4,7 @@ import ReactMarkdown from 'react-markdown';
 import remarkGfm from 'remark-gfm';
 import { Message, Resume, CurrentProvider } from '../types';
 import { streamChat, createResume, updateResume, fetchConversation, saveConversation, fetchJobConversation, saveJobConversation } from '../api';
+import type { ChatResumeEvent } from '../api';
 import { addInterviewNote } from '../utils/interviewNotes';
 import {
   findChatMessageContext,
@@ -152,6 +153,9 @@ export function ChatPanel({ jobId, jobTitle, jobCompany, resumeId, onResumeCreat
     setStreaming(true);
     setStreamingContent('');
     let fullContent = '';
+    // 已有简历时由服务端在简历块闭合时直接保存为新修订，省去结束后再整份 PUT 回去
+    const saveOnServer = !!currentResumeIdRef.current;
+    let serverResume: ChatResumeEvent | null = null;
 
     await streamChat(
       jobId,
@@ -169,7 +173,9 @@ export function ChatPanel({ jobId, jobTitle, jobCompany, resumeId, onResumeCreat
         let resumeIdToSave = currentResumeIdRef.current;
         const askedResumeLike = /简历|resume|优化|润色|改写|更新/.test(userText.toLowerCase());
         if (resumeContent) {
-          if (currentResumeIdRef.current) {
+          if (serverResume?.saved && serverResume.resume) {
+            onResumeUpdated(serverResume.resume);
+          } else if (currentResumeIdRef.current) {
             onResumeUpdated(await updateResume(currentResumeIdRef.current, { content: resumeContent }));
           } else {
             const activeProfile = bg.activeProfileId != null
@@ -204,6 +210,9 @@ export function ChatPanel({ jobId, jobTitle, jobCompany, resumeId, onResumeCreat
         setMessages(prev => [...prev, { role: 'assistant', content: `错误：${err.message}` }]);
       },
       bg.backgroundForChat || undefined,
+      event => { serverResume = event; },
+      saveOnServer,
+      () => showInfo('简历已保存，模型后续输出已提前结束。'),
     );
   }, [input, streaming, jobId, jobTitle, messages, bg.backgroundForChat, bg.profiles, bg.activeProfileId, onResumeCreated, onResumeUpdated]);
 
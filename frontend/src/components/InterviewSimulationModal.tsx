@@ -5,7 +5,7 @@ import remarkGfm from 'remark-gfm';
 import type { Message } from '../types';
 import {
   streamInterviewSim,
-  fetchInterviewReport,
+  streamInterviewReport,
   fetchEvaluationScorecard,
   fetchEvaluationScorecardHistory,
   fetchEvaluationScorecardHistoryDetail,
@@ -78,7 +78,9 @@ export function InterviewSimulationModal({
   const [questionnaireItems, setQuestionnaireItems] = useState<QuestionnaireItem[]>([]);
   const [questionnaireLoading, setQuestionnaireLoading] = useState(false);
   const [questionListOpen, setQuestionListOpen] = useState(true);
+  const [coveredIds, setCoveredIds] = useState<Set<string>>(new Set());
   const questionnaireMdRef = useRef('');
+  const questionnaireSessionRef = useRef<string | null>(null);
   const listEndRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef('');
   inputRef.current = input;
@@ -118,7 +120,9 @@ export function InterviewSimulationModal({
     setQuestionnaireItems([]);
     setQuestionnaireLoading(false);
     setQuestionListOpen(true);
+    setCoveredIds(new Set());
     questionnaireMdRef.current = '';
+    questionnaireSessionRef.current = null;
   }, [open, jobId, resumeId, backgroundProfileId]);
 
   useEffect(() => {
@@ -154,6 +158,8 @@ export function InterviewSimulationModal({
           },
           userBackground,
           questionnaireMdRef.current || null,
+          questionnaireSessionRef.current,
+          (coverage) => setCoveredIds(new Set(coverage.covered.map((c) => c.id))),
         );
       });
     },
@@ -174,7 +180,9 @@ export function InterviewSimulationModal({
         categories: preferredCategories && preferredCategories.length > 0 ? preferredCategories : undefined,
       });
       questionnaireMdRef.current = data.questionnaire_markdown;
+      questionnaireSessionRef.current = data.session_id ?? null;
       setQuestionnaireItems(data.items);
+      setCoveredIds(new Set());
     } catch (e) {
       handleApiError(e, '拉取本场题单失败');
       setQuestionnaireLoading(false);
@@ -191,7 +199,9 @@ export function InterviewSimulationModal({
       setStarted(false);
       setMessages([]);
       setQuestionnaireItems([]);
+      setCoveredIds(new Set());
       questionnaireMdRef.current = '';
+      questionnaireSessionRef.current = null;
     }
   };
 
@@ -215,20 +225,27 @@ export function InterviewSimulationModal({
     if (streaming || reportLoading || messages.length === 0) return;
     if (!confirm('确定结束本场模拟面试并生成复盘报告？')) return;
     setReportLoading(true);
-    try {
-      const { report } = await fetchInterviewReport({
+    setReportMd('');
+    setPhase('report');
+    let full = '';
+    await streamInterviewReport(
+      {
         jobId,
         resumeId,
         messages: toReportMessages(messages),
         userBackground,
-      });
-      setReportMd(report);
-      setPhase('report');
-    } catch (e) {
-      handleApiError(e, '生成报告失败');
-    } finally {
-      setReportLoading(false);
-    }
+      },
+      (chunk) => {
+        full += chunk;
+        setReportMd(full);
+      },
+      () => {},
+      (err) => {
+        handleApiError(err, '生成报告失败');
+        if (!full) setPhase('interview');
+      },
+    );
+    setReportLoading(false);
   };
 
   const handleCopyReport = async () => {
@@ -351,8 +368,9 @@ export function InterviewSimulationModal({
             <div className="flex items-center gap-2 flex-shrink-0">
               <button
                 type="button"
-                className="text-xs px-3 py-1.5 rounded-lg border border-gray-200 text-gray-700 hover:bg-gray-50"
+                className="text-xs px-3 py-1.5 rounded-lg border border-gray-200 text-gray-700 hover:bg-gray-50 disabled:opacity-50"
                 onClick={handleBackToInterview}
+                disabled={reportLoading}
               >
                 <ArrowLeft size={14} className="inline mr-1" />
                 返回对话
@@ -369,7 +387,7 @@ export function InterviewSimulationModal({
                 type="button"
                 className="text-xs px-3 py-1.5 rounded-lg border border-amber-300 text-amber-800 hover:bg-amber-50 disabled:opacity-50"
                 onClick={() => void handleGenerateScorecard()}
-                disabled={scorecardLoading}
+                disabled={scorecardLoading || reportLoading}
               >
                 {scorecardLoading ? <Loader2 size={14} className="inline mr-1 animate-spin" /> : null}
                 结构化评分卡
@@ -393,6 +411,11 @@ export function InterviewSimulationModal({
           <div className="flex-1 overflow-y-auto min-h-0 p-4 markdown-content bg-white">
             {reportMd ? (
               <ReactMarkdown remarkPlugins={[remarkGfm]}>{reportMd}</ReactMarkdown>
+            ) : reportLoading ? (
+              <p className="text-gray-500 text-sm">
+                <Loader2 size={14} className="inline mr-1 animate-spin" />
+                正在生成报告…
+              </p>
             ) : (
               <p className="text-gray-500 text-sm">暂无报告</p>
             )}
@@ -518,13 +541,15 @@ export function InterviewSimulationModal({
                           size={18}
                           className={`flex-shrink-0 text-amber-700 transition-transform ${questionListOpen ? '' : '-rotate-90'}`}
                         />
-                        本场题单（{questionnaireItems.length} 题）
+                        本场题单（{questionnaireItems.length} 题
+                        {coveredIds.size > 0 ? `，已问到 ${coveredIds.size} 题` : ''}）
                       </button>
                       {questionListOpen && (
                         <ol className="list-decimal pl-9 pr-3 pb-3 space-y-1.5 text-gray-800 text-xs leading-relaxed">
                           {questionnaireItems.map((q) => (
-                            <li key={q.id}>
+                            <li key={q.id} className={coveredIds.has(q.id) ? 'text-gray-400 line-through' : undefined}>
                               <span className="text-amber-900/85 font-medium">【{q.category}】</span> {q.text}
+                              {coveredIds.has(q.id) && <span className="ml-1 inline-block text-emerald-600">✓</span>}
                             </li>
                           ))}
                         </ol>
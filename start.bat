@@ -16,6 +16,7 @@ cd frontend
 call npm install --silent
 call npm run build
 cd ..
+python backend\static_assets.py frontend\dist > nul
 
 echo 🔧 启动后端，请用浏览器打开: http://localhost:8000
 cd backend
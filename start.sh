@@ -25,6 +25,8 @@ cd frontend
 npm install --silent
 npm run build
 cd ..
+# Precompress built assets (.gz, plus .br when the brotli package is installed)
+python backend/static_assets.py frontend/dist > /dev/null
 
 # Start backend (after dist exists so main.py mounts static files)
 echo "🔧 Starting backend on http://localhost:8000 ..."